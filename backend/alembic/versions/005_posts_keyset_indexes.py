@@ -0,0 +1,35 @@
+"""Keyset pagination indexes for latest (created_at, id) and hot (5*reply_count+score, created_at, id).
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-02-10
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY so the hot posts table stays writable while indexes build
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_created_at_id "
+            "ON posts (created_at DESC, id DESC)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_hot "
+            "ON posts ((5 * reply_count + score) DESC, created_at DESC, id DESC)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_posts_hot")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_posts_created_at_id")
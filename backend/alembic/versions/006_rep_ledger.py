@@ -0,0 +1,50 @@
+"""Append-only REP ledger (rep_ledger) folded into agents.reputation by a background aggregator.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-02-15
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rep_ledger",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("agent_id", sa.UUID(), nullable=False),
+        sa.Column("actor_agent_id", sa.UUID(), nullable=True),
+        sa.Column("source", sa.String(length=32), nullable=False),
+        sa.Column("ref_id", sa.UUID(), nullable=True),
+        sa.Column("delta", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("applied_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["agent_id"], ["agents.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_rep_ledger_agent_id", "rep_ledger", ["agent_id"], unique=False)
+    # Aggregator scans only unapplied rows
+    op.create_index(
+        "ix_rep_ledger_pending", "rep_ledger", ["id"], unique=False,
+        postgresql_where=sa.text("applied_at IS NULL"),
+    )
+    # Opening balances: reputation = 1.0 (initial) + sum(applied deltas) holds from here on
+    op.execute(
+        "INSERT INTO rep_ledger (agent_id, source, delta, applied_at) "
+        "SELECT id, 'opening', reputation - 1.0, now() FROM agents WHERE reputation <> 1.0"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_rep_ledger_pending", table_name="rep_ledger")
+    op.drop_index("ix_rep_ledger_agent_id", table_name="rep_ledger")
+    op.drop_table("rep_ledger")
@@ -0,0 +1,31 @@
+"""Partial index on votes still awaiting voter feedback, in keyset order (created_at, id).
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-02-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Only pending votes are indexed, so the daily run stays cheap as the votes table grows
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_votes_feedback_pending "
+            "ON votes (created_at, id) "
+            "WHERE voter_feedback_applied_at IS NULL AND target_author_rep_at_vote IS NOT NULL"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_votes_feedback_pending")
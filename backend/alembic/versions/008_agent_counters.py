@@ -0,0 +1,33 @@
+"""Denormalized agent counters: post_count, follower_count, following_count.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-02-20
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for name in ("post_count", "follower_count", "following_count"):
+        op.add_column("agents", sa.Column(name, sa.Integer(), nullable=False, server_default="0"))
+    op.execute("""
+        UPDATE agents SET
+            post_count = (SELECT count(*) FROM posts WHERE posts.author_agent_id = agents.id),
+            follower_count = (SELECT count(*) FROM follows WHERE follows.followee_id = agents.id),
+            following_count = (SELECT count(*) FROM follows WHERE follows.follower_id = agents.id)
+    """)
+
+
+def downgrade() -> None:
+    for name in ("following_count", "follower_count", "post_count"):
+        op.drop_column("agents", name)
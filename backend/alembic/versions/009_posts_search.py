@@ -0,0 +1,86 @@
+"""Post search: stored tsvector (trigger-maintained, batched backfill), GIN indexes on it and on tags.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-02-24
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 'simple' config: no stemming/stop words, so any language is indexed as-is. Keep in sync with
+# SEARCH_TS_CONFIG in app/api/posts.py.
+SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce({row}.title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(array_to_string({row}.tags, ' '), '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce({row}.content, '')), 'C')"
+)
+
+BACKFILL_BATCH = 5000
+
+
+def upgrade() -> None:
+    op.add_column("posts", sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True))
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION posts_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_DOCUMENT.format(row="NEW")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER posts_search_vector
+        BEFORE INSERT OR UPDATE OF title, content, tags ON posts
+        FOR EACH ROW EXECUTE FUNCTION posts_search_vector_update()
+    """)
+    # Backfill and index outside the migration transaction: short batches walked in id order (each
+    # one an index range scan, not a rescan for NULLs), CONCURRENTLY builds, so the posts table stays
+    # writable throughout. Rows inserted meanwhile already get their vector from the trigger.
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        after = None
+        while True:
+            last = conn.execute(sa.text(f"""
+                WITH batch AS (
+                    SELECT id FROM posts
+                    WHERE CAST(:after AS uuid) IS NULL OR id > CAST(:after AS uuid)
+                    ORDER BY id
+                    LIMIT {BACKFILL_BATCH}
+                ),
+                upd AS (
+                    UPDATE posts SET search_vector = {SEARCH_DOCUMENT.format(row="posts")}
+                    FROM batch
+                    WHERE posts.id = batch.id AND posts.search_vector IS NULL
+                )
+                SELECT id FROM batch ORDER BY id DESC LIMIT 1
+            """), {"after": after}).scalar()
+            if last is None:
+                break
+            after = str(last)
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_search_vector "
+            "ON posts USING gin (search_vector)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_tags "
+            "ON posts USING gin (tags)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_posts_tags")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_posts_search_vector")
+    op.execute("DROP TRIGGER IF EXISTS posts_search_vector ON posts")
+    op.execute("DROP FUNCTION IF EXISTS posts_search_vector_update()")
+    op.drop_column("posts", "search_vector")
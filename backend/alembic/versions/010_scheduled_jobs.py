@@ -0,0 +1,47 @@
+"""Scheduled job watermarks (scheduled_jobs) for the in-process REP task scheduler.
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-02-26
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scheduled_jobs",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("last_started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_success_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_duration_seconds", sa.Float(), nullable=True),
+        sa.Column("last_result", sa.Integer(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("run_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failure_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    # Decay / follower bonus runs already recorded in the ledger (tasks run after 006) start the
+    # watermarks. A cron run that wrote agents.reputation directly leaves no trace; such jobs are
+    # registered by the scheduler on first start as just run (app.tasks.scheduler._REGISTER_SQL)
+    op.execute("""
+        INSERT INTO scheduled_jobs (name, last_success_at)
+        SELECT CASE source WHEN 'decay' THEN 'monthly_decay' ELSE 'follower_bonus' END, max(created_at)
+        FROM rep_ledger
+        WHERE source IN ('decay', 'follower_bonus')
+        GROUP BY source
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("scheduled_jobs")
@@ -0,0 +1,77 @@
+"""Stored content preview for brief list views (trigger-maintained, batched backfill).
+
+content_preview holds the first PREVIEW_LEN characters (trailing whitespace trimmed, plus "…") when
+the content is longer than that, and stays NULL when the whole content fits: brief list queries read
+coalesce(content_preview, content) and never touch long content.
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-03-02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Characters kept in the preview (the list API's brief mode used to truncate to this in Python)
+PREVIEW_LEN = 400
+
+PREVIEW = (
+    "CASE WHEN char_length({row}.content) > " + str(PREVIEW_LEN) + " "
+    "THEN regexp_replace(left({row}.content, " + str(PREVIEW_LEN) + "), '\\s+$', '') || '…' END"
+)
+
+BACKFILL_BATCH = 5000
+
+
+def upgrade() -> None:
+    op.add_column("posts", sa.Column("content_preview", sa.Text(), nullable=True))
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION posts_content_preview_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.content_preview := {PREVIEW.format(row="NEW")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER posts_content_preview
+        BEFORE INSERT OR UPDATE OF content ON posts
+        FOR EACH ROW EXECUTE FUNCTION posts_content_preview_update()
+    """)
+    # New rows get their preview from the trigger; walk the existing ones in id order, in short
+    # transactions outside the migration's, so posts stays writable
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        after = None
+        while True:
+            last = conn.execute(sa.text(f"""
+                WITH batch AS (
+                    SELECT id FROM posts
+                    WHERE CAST(:after AS uuid) IS NULL OR id > CAST(:after AS uuid)
+                    ORDER BY id
+                    LIMIT {BACKFILL_BATCH}
+                ),
+                upd AS (
+                    UPDATE posts SET content_preview = {PREVIEW.format(row="posts")}
+                    FROM batch
+                    WHERE posts.id = batch.id AND char_length(posts.content) > {PREVIEW_LEN}
+                )
+                SELECT id FROM batch ORDER BY id DESC LIMIT 1
+            """), {"after": after}).scalar()
+            if last is None:
+                break
+            after = str(last)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS posts_content_preview ON posts")
+    op.execute("DROP FUNCTION IF EXISTS posts_content_preview_update()")
+    op.drop_column("posts", "content_preview")
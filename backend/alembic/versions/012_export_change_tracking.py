@@ -0,0 +1,111 @@
+"""Change tracking for incremental exports: trigger-maintained updated_at and export_deletions tombstones.
+
+updated_at is set on insert and whenever an exported column changes (score, reply_count, vote value,
+...), so an incremental pull by updated_at picks up rows changed since the last one. Columns the
+export does not carry (e.g. voter_feedback_applied_at) do not touch it. Existing rows take the
+migration time, so the first incremental pull afterwards sends them all once. Deleting a post,
+comment, vote or follow records its primary key in export_deletions.
+
+Revision ID: 012
+Revises: 011
+Create Date: 2025-03-03
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "012"
+down_revision: Union[str, None] = "011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Table -> exported columns that can change after insert
+TRACKED_COLUMNS = {
+    "posts": ("title", "content", "tags", "score", "reply_count"),
+    "comments": ("content", "score"),
+    "votes": ("value",),
+}
+
+# Table -> primary key columns recorded when a row is deleted
+DELETION_KEYS = {
+    "posts": ("id",),
+    "comments": ("id",),
+    "votes": ("id",),
+    "follows": ("follower_id", "followee_id"),
+}
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := now();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table, columns in TRACKED_COLUMNS.items():
+        # now() is stable: the default is stored once in the catalog, no table rewrite
+        op.add_column(
+            table,
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        )
+        changed = " OR ".join(f"OLD.{c} IS DISTINCT FROM NEW.{c}" for c in columns)
+        op.execute(f"""
+            CREATE TRIGGER {table}_touch_updated_at
+            BEFORE UPDATE OF {", ".join(columns)} ON {table}
+            FOR EACH ROW WHEN ({changed}) EXECUTE FUNCTION touch_updated_at()
+        """)
+
+    op.create_table(
+        "export_deletions",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("table_name", sa.String(length=32), nullable=False),
+        sa.Column("row_key", postgresql.JSONB(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_export_deletions_deleted_at_id", "export_deletions", ["deleted_at", "id"])
+    # Trigger arguments name the key columns: row_key = {"col": value, ...} of the deleted row
+    op.execute("""
+        CREATE OR REPLACE FUNCTION export_deletions_record() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO export_deletions (table_name, row_key)
+            SELECT TG_TABLE_NAME, jsonb_object_agg(k, to_jsonb(OLD) -> k)
+            FROM unnest(TG_ARGV) AS k;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    for table, keys in DELETION_KEYS.items():
+        args = ", ".join(f"'{k}'" for k in keys)
+        op.execute(f"""
+            CREATE TRIGGER {table}_export_deletions
+            AFTER DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION export_deletions_record({args})
+        """)
+
+    # Keyset order of the incremental export; built concurrently so the tables stay writable
+    with op.get_context().autocommit_block():
+        for table in TRACKED_COLUMNS:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_updated_at_id ON {table} (updated_at, id)"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in TRACKED_COLUMNS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_updated_at_id")
+    for table in DELETION_KEYS:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_export_deletions ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS export_deletions_record()")
+    op.drop_table("export_deletions")
+    for table in TRACKED_COLUMNS:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_touch_updated_at ON {table}")
+        op.drop_column(table, "updated_at")
+    op.execute("DROP FUNCTION IF EXISTS touch_updated_at()")
@@ -0,0 +1,26 @@
+"""Resume position for chunked exactly-once jobs (scheduled_jobs.resume_after_id).
+
+Revision ID: 013
+Revises: 012
+Create Date: 2025-03-04
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = "013"
+down_revision: Union[str, None] = "012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("scheduled_jobs", sa.Column("resume_after_id", postgresql.UUID(as_uuid=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("scheduled_jobs", "resume_after_id")
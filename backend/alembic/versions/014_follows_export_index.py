@@ -0,0 +1,30 @@
+"""Keyset index for the follows export: (created_at, follower_id, followee_id).
+
+Revision ID: 014
+Revises: 013
+Create Date: 2025-03-05
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "014"
+down_revision: Union[str, None] = "013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so follows stay writable
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_follows_created_at_keys "
+            "ON follows (created_at, follower_id, followee_id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_follows_created_at_keys")
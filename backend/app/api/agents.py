@@ -3,12 +3,15 @@ import secrets
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 
-from app.core.database import get_db
+from app.core import replica
+from app.core.database import get_db, after_commit
+from app.core.replica import get_read_db
 from app.core.security import hash_api_key
-from app.models import Agent, Post, Follow
+from app.models import Agent
 from app.schemas.agent import AgentRegisterIn, AgentRegisterOut, AgentPublic
+from app.services import site_stats
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
@@ -31,15 +34,18 @@ async def register_agent(
     db.add(agent)
     await db.flush()
     await db.refresh(agent)
+    after_commit(db, lambda: site_stats.incr(agents=1))
+    # Its first profile read must not miss the new row on a lagging replica
+    after_commit(db, lambda: replica.mark_write(key_hash))
     return AgentRegisterOut(agent_id=agent.id, api_key=raw_key)
 
 
 @router.get("/{agent_id}", response_model=AgentPublic)
 async def get_agent(
     agent_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Get public profile of an agent (for humans and other agents)."""
+    """Get public profile of an agent (for humans and other agents). Counters are columns on agents."""
     try:
         uid = UUID(agent_id)
     except ValueError:
@@ -48,11 +54,4 @@ async def get_agent(
     agent = result.scalar_one_or_none()
     if not agent:
         raise HTTPException(status_code=404, detail="agent_not_found")
-
-    pc = await db.execute(select(func.count()).select_from(Post).where(Post.author_agent_id == uid))
-    fc = await db.execute(select(func.count()).select_from(Follow).where(Follow.followee_id == uid))
-    post_count = pc.scalar() or 0
-    follower_count = fc.scalar() or 0
-
-    base = AgentPublic.model_validate(agent)
-    return base.model_copy(update={"post_count": post_count, "follower_count": follower_count})
+    return AgentPublic.model_validate(agent)
@@ -1,19 +1,31 @@
 """Comments API: create (agent), list by post (public). Pure REP v1: reply gives target ΔR = γ×(R_replier+1)^α."""
-from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query
+from uuid import UUID, uuid4
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, desc, func
 from sqlalchemy.orm import selectinload
 
-from app.core.database import get_db
+from app.core import response_cache
+from app.core.cursor import InvalidCursor, encode_cursor, decode_cursor, cursor_datetime, cursor_uuid
+from app.core.database import get_db, after_commit
+from app.core.json_response import json_response
+from app.core.replica import get_read_db
 from app.core.config import settings
 from app.api.deps import get_current_agent, rate_limit_comments
-from app.models import Comment, Post, Agent
+from app.models import Comment, Post, Agent, RepSource
 from app.schemas.comment import CommentCreateIn, CommentOut, CommentWithAuthor
-from app.services.reputation import delta_rep_reply_target, clamp_rep
+from app.services import comment_tree, hot_rank, rep_ledger, site_stats
+from app.services.reputation import delta_rep_reply_target
 
 router = APIRouter(prefix="/comments", tags=["comments"])
 
+# tree=true paging: opaque cursor for the next page of the requested level
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# List responses are built unvalidated (CommentWithAuthor.from_comment) and serialized by pydantic-core
+_COMMENT_LIST_ADAPTER = TypeAdapter(list[CommentWithAuthor])
+
 
 @router.post("", response_model=CommentOut)
 async def create_comment(
@@ -22,71 +34,150 @@ async def create_comment(
     agent: Agent = Depends(rate_limit_comments),
 ):
     """Create a comment (Agent only, rate limited)."""
-    # Verify post exists
-    r = await db.execute(select(Post).where(Post.id == body.post_id))
-    if not r.scalar_one_or_none():
+    # One read checks the post (and parent) and finds the reply target: parent comment author, else post author
+    row = (await db.execute(
+        select(Post.author_agent_id, Comment.author_agent_id)
+        .select_from(Post)
+        .outerjoin(Comment, (Comment.id == body.parent_comment_id) & (Comment.post_id == Post.id))
+        .where(Post.id == body.post_id)
+    )).one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail="post_not_found")
-    if body.parent_comment_id:
-        r2 = await db.execute(
-            select(Comment).where(
-                Comment.id == body.parent_comment_id,
-                Comment.post_id == body.post_id,
-            )
-        )
-        if not r2.scalar_one_or_none():
-            raise HTTPException(status_code=404, detail="parent_comment_not_found")
+    post_author_id, parent_author_id = row
+    if body.parent_comment_id and parent_author_id is None:
+        raise HTTPException(status_code=404, detail="parent_comment_not_found")
     comment = Comment(
+        id=uuid4(),
         post_id=body.post_id,
         parent_comment_id=body.parent_comment_id,
         author_agent_id=agent.id,
         content=body.content,
     )
     db.add(comment)
-    await db.flush()
 
     # Pure REP v1: reply gives target (post author or parent comment author) ΔR = γ×(R_replier+1)^α
-    target_agent_id: UUID | None = None
-    if body.parent_comment_id:
-        r2 = await db.execute(
-            select(Comment).where(
-                Comment.id == body.parent_comment_id,
-                Comment.post_id == body.post_id,
-            )
+    target_agent_id: UUID = parent_author_id if body.parent_comment_id else post_author_id
+    if target_agent_id != agent.id:
+        rep_replier = max(0.0, agent.reputation or 1.0)
+        d_target = delta_rep_reply_target(
+            settings.rep_gamma,
+            rep_replier,
+            settings.rep_alpha,
         )
-        parent = r2.scalar_one_or_none()
-        if parent:
-            target_agent_id = parent.author_agent_id
-    else:
-        rp = await db.execute(select(Post).where(Post.id == body.post_id))
-        post_row = rp.scalar_one_or_none()
-        if post_row:
-            target_agent_id = post_row.author_agent_id
-    if target_agent_id is not None and target_agent_id != agent.id:
-        ra = await db.execute(select(Agent).where(Agent.id == target_agent_id))
-        target_agent = ra.scalar_one_or_none()
-        if target_agent is not None:
-            rep_replier = max(0.0, agent.reputation or 1.0)
-            rep_target = max(0.0, target_agent.reputation or 1.0)
-            d_target = delta_rep_reply_target(
-                settings.rep_gamma,
-                rep_replier,
-                settings.rep_alpha,
-            )
-            target_agent.reputation = clamp_rep(rep_target + d_target)
-            await db.flush()
+        rep_ledger.record(db, target_agent_id, d_target, RepSource.reply, actor_id=agent.id, ref_id=comment.id)
+    await db.flush()
 
     # Keep post.reply_count in sync for fast list/hot sort (no per-request aggregation)
-    await db.execute(update(Post).where(Post.id == body.post_id).values(reply_count=Post.reply_count + 1))
+    ru = await db.execute(
+        update(Post)
+        .where(Post.id == body.post_id)
+        .values(reply_count=Post.reply_count + 1)
+        .returning(Post.score, Post.reply_count, Post.created_at, Post.tags, func.clock_timestamp())
+    )
+    counts = ru.one_or_none()
+    if counts is not None:
+        after_commit(db, lambda: hot_rank.update_post(body.post_id, *counts))
+        after_commit(db, lambda: response_cache.bump_version(response_cache.FEED_NAMESPACE))
+    after_commit(db, lambda: site_stats.incr(comments=1))
     await db.refresh(comment)
     return CommentOut.model_validate(comment)
 
 
+def _tree_cursor(parent_id: UUID | None, sort: str, after: comment_tree.CommentKey | None) -> str:
+    payload = {"k": "ctree", "p": parent_id, "s": sort, "a": None}
+    if after is not None:
+        payload["a"] = {"i": after.id, "c": after.created_at, "sc": after.score}
+    return encode_cursor(payload)
+
+
+def _decode_tree_cursor(cursor: str) -> tuple[UUID | None, str, comment_tree.CommentKey | None]:
+    c = decode_cursor(cursor, "ctree")
+    parent_id = cursor_uuid(c, "p") if c.get("p") else None
+    sort = c.get("s")
+    if sort not in comment_tree.SORTS:
+        raise InvalidCursor("invalid_cursor")
+    a = c.get("a")
+    after = None
+    if a is not None:
+        if not isinstance(a, dict) or not isinstance(a.get("sc"), int):
+            raise InvalidCursor("invalid_cursor")
+        after = comment_tree.CommentKey(
+            id=cursor_uuid(a, "i"), parent_id=parent_id, score=a["sc"], created_at=cursor_datetime(a, "c")
+        )
+    return parent_id, sort, after
+
+
+async def _list_comment_tree(
+    response: Response,
+    post_id: UUID,
+    sort: str,
+    depth: int,
+    limit: int,
+    cursor: str | None,
+    db: AsyncSession,
+) -> list[CommentWithAuthor]:
+    """Nested page of a post's comments. Skeleton (ids, parents, sort keys) of the whole thread is
+    read once and assembled in O(n); content and author names are loaded only for visible comments."""
+    parent_id, after = None, None
+    if cursor:
+        try:
+            parent_id, sort, after = _decode_tree_cursor(cursor)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="invalid_cursor")
+    order = (
+        (desc(Comment.score), Comment.created_at, Comment.id)
+        if sort == "score"
+        else (Comment.created_at, Comment.id)
+    )
+    skeleton = await db.execute(
+        select(Comment.id, Comment.parent_comment_id, Comment.score, Comment.created_at)
+        .where(Comment.post_id == post_id)
+        .order_by(*order)
+    )
+    children = comment_tree.build_children(
+        [comment_tree.CommentKey(id=i, parent_id=p, score=sc or 0, created_at=c) for i, p, sc, c in skeleton.all()]
+    )
+    nodes, has_more = comment_tree.assemble(children, parent_id, sort, limit, depth, after)
+    if has_more:
+        response.headers[NEXT_CURSOR_HEADER] = _tree_cursor(parent_id, sort, nodes[-1].key)
+    ids = comment_tree.visible_ids(nodes)
+    if not ids:
+        return []
+    result = await db.execute(
+        select(Comment).options(selectinload(Comment.author)).where(Comment.id.in_(ids))
+    )
+    by_id = {c.id: c for c in result.scalars().all()}
+
+    def render(node: comment_tree.TreeNode) -> CommentWithAuthor:
+        return CommentWithAuthor.from_comment(
+            by_id[node.id],
+            replies=[render(n) for n in node.replies if n.id in by_id],
+            reply_count=node.reply_count,
+            more_replies_cursor=_tree_cursor(node.id, sort, node.more_after) if node.has_more else None,
+        )
+
+    return [render(n) for n in nodes if n.id in by_id]
+
+
 @router.get("", response_model=list[CommentWithAuthor])
 async def list_comments_by_post(
+    response: Response,
     post_id: UUID = Query(..., description="Post ID to list comments for"),
-    db: AsyncSession = Depends(get_db),
+    tree: bool = Query(False, description="if true, return nested replies (paged per level)"),
+    sort: str = Query("time", description="tree=true: time (oldest first) | score (best first)"),
+    depth: int = Query(3, ge=1, le=10, description="tree=true: levels of replies to include"),
+    limit: int = Query(20, ge=1, le=100, description="tree=true: comments per level"),
+    cursor: str | None = Query(None, description="tree=true: X-Next-Cursor or a more_replies_cursor"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """List comments for a post (public). Flat list with author_name."""
+    """List comments for a post (public). Flat list with author_name.
+    tree=true: nested replies; each level is paged (X-Next-Cursor for the requested level,
+    more_replies_cursor on comments whose replies were cut by limit or depth)."""
+    if tree:
+        if sort not in comment_tree.SORTS:
+            raise HTTPException(status_code=400, detail="invalid_sort")
+        items = await _list_comment_tree(response, post_id, sort, depth, limit, cursor, db)
+        return json_response(_COMMENT_LIST_ADAPTER, items, response)
     result = await db.execute(
         select(Comment)
         .options(selectinload(Comment.author))
@@ -94,11 +185,4 @@ async def list_comments_by_post(
         .order_by(Comment.created_at)
     )
     comments = result.scalars().all()
-    return [
-        CommentWithAuthor(
-            **CommentOut.model_validate(c).model_dump(),
-            author_name=c.author.name,
-            replies=[],
-        )
-        for c in comments
-    ]
+    return json_response(_COMMENT_LIST_ADAPTER, [CommentWithAuthor.from_comment(c) for c in comments])
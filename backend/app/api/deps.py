@@ -1,14 +1,18 @@
 """FastAPI dependencies: auth, db, rate limit."""
 from uuid import UUID
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.core.database import get_db
+from app.core import replica
+from app.core.auth_cache import get_cached_agent, cache_agent, cache_invalid_key
+from app.core.database import get_db, after_commit
 from app.core.rate_limit import check_rate_limit
+from app.core.security import hash_api_key
 from app.core.config import settings
 from app.models import Agent
+from app.services import site_stats
 
 security = HTTPBearer(auto_error=False)
 # Allow Bearer token for Agent API
@@ -26,11 +30,16 @@ async def get_current_agent(
             headers={"WWW-Authenticate": "Bearer"},
         )
     token = credentials.credentials
-    # Find agent by verifying hash (we have to scan - or store api_key -> agent_id in Redis)
-    from app.core.security import hash_api_key
     key_hash = hash_api_key(token)
-    result = await db.execute(select(Agent).where(Agent.api_key_hash == key_hash))
-    agent = result.scalar_one_or_none()
+    # Identity cache first (api_key hash -> agent); negative hits skip Postgres entirely
+    hit, agent = await get_cached_agent(key_hash)
+    if not hit:
+        result = await db.execute(select(Agent).where(Agent.api_key_hash == key_hash))
+        agent = result.scalar_one_or_none()
+        if agent:
+            await cache_agent(key_hash, agent)
+        else:
+            await cache_invalid_key(key_hash)
     if not agent:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -40,37 +49,44 @@ async def get_current_agent(
     return agent
 
 
-async def rate_limit_posts(agent: Agent = Depends(get_current_agent)) -> Agent:
-    allowed, err = await check_rate_limit(
-        "posts",
-        str(agent.id),
-        settings.rate_limit_posts,
-        window_seconds=settings.rate_limit_posts_window_seconds,
+async def get_writing_agent(
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_bearer),
+    agent: Agent = Depends(get_current_agent),
+    db: AsyncSession = Depends(get_db),
+) -> Agent:
+    """get_current_agent for routes that write: once the write commits, the agent counts as active and
+    (read-your-writes) this key's public reads skip the replica for a while. Reads do neither."""
+    after_commit(db, lambda: site_stats.mark_active(agent.id))
+    if replica.enabled():
+        key_hash = hash_api_key(credentials.credentials)
+        after_commit(db, lambda: replica.mark_write(key_hash))
+    return agent
+
+
+async def _enforce_rate_limit(response: Response, key_prefix: str, agent: Agent, limit: int, window_seconds: int) -> None:
+    """Apply the per-agent limit; quota headers go on the response, or on the 429 when rejected."""
+    rl = await check_rate_limit(key_prefix, str(agent.id), limit, window_seconds=window_seconds)
+    if not rl.allowed:
+        raise HTTPException(status_code=429, detail=rl.error, headers=rl.headers())
+    response.headers.update(rl.headers())
+
+
+async def rate_limit_posts(response: Response, agent: Agent = Depends(get_writing_agent)) -> Agent:
+    await _enforce_rate_limit(
+        response, "posts", agent, settings.rate_limit_posts, settings.rate_limit_posts_window_seconds
     )
-    if not allowed:
-        raise HTTPException(status_code=429, detail=err)
     return agent
 
 
-async def rate_limit_comments(agent: Agent = Depends(get_current_agent)) -> Agent:
-    allowed, err = await check_rate_limit(
-        "comments",
-        str(agent.id),
-        settings.rate_limit_comments,
-        window_seconds=settings.rate_limit_comments_window_seconds,
+async def rate_limit_comments(response: Response, agent: Agent = Depends(get_writing_agent)) -> Agent:
+    await _enforce_rate_limit(
+        response, "comments", agent, settings.rate_limit_comments, settings.rate_limit_comments_window_seconds
     )
-    if not allowed:
-        raise HTTPException(status_code=429, detail=err)
     return agent
 
 
-async def rate_limit_votes(agent: Agent = Depends(get_current_agent)) -> Agent:
-    allowed, err = await check_rate_limit(
-        "votes",
-        str(agent.id),
-        settings.rate_limit_votes,
-        window_seconds=settings.rate_limit_votes_window_seconds,
+async def rate_limit_votes(response: Response, agent: Agent = Depends(get_writing_agent)) -> Agent:
+    await _enforce_rate_limit(
+        response, "votes", agent, settings.rate_limit_votes, settings.rate_limit_votes_window_seconds
     )
-    if not allowed:
-        raise HTTPException(status_code=429, detail=err)
     return agent
@@ -0,0 +1,49 @@
+"""Export API: streaming NDJSON dumps of posts, comments, votes, follows and deletions for warehouse mirroring.
+Requires X-Export-Token (settings.export_token); disabled when no token is configured."""
+import secrets
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services import export
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+EXPORT_UNTIL_HEADER = "X-Export-Until"
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@router.get("/{table}.ndjson")
+async def export_table(
+    table: str,
+    since: Optional[datetime] = Query(None, description="Only rows inserted or changed at or after since (previous export's X-Export-Until)"),
+    until: Optional[datetime] = Query(None, description="Only rows inserted or changed before until (default: now minus a short settle delay)"),
+    gzip: bool = Query(False, description="Gzip the stream (Content-Encoding: gzip)"),
+    x_export_token: Optional[str] = Header(None),
+):
+    """Stream every row of posts / comments / votes / follows / deletions as NDJSON, in change order (see
+    app.services.export). Constant memory; no long-lived transaction. Pass the X-Export-Until response
+    header as `since` for the next incremental pull; upsert rows by primary key and apply deletions."""
+    if not settings.export_token:
+        raise HTTPException(status_code=404, detail="export_disabled")
+    if not x_export_token or not secrets.compare_digest(x_export_token, settings.export_token):
+        raise HTTPException(status_code=403, detail="invalid_export_token")
+    if table not in export.EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail="unknown_export_table")
+    since, until = _aware(since), _aware(until) or export.default_until()
+    headers = {EXPORT_UNTIL_HEADER: until.isoformat()}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export.iter_ndjson(table, since, until, compress=gzip),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
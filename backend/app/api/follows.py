@@ -3,14 +3,16 @@ from uuid import UUID
 from datetime import datetime, timezone, timedelta
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.core.database import get_db
+from app.core.database import get_db, after_commit
 from app.core.config import settings
-from app.api.deps import get_current_agent
-from app.models import Agent, Follow, FollowRepEffect
+from app.api.deps import get_writing_agent
+from app.models import Agent, Follow, FollowRepEffect, RepSource
 from app.schemas.follow import FollowCreateIn, FollowOut
-from app.services.reputation import delta_rep_follow, clamp_rep
+from app.services import rep_ledger, site_stats, timeline
+from app.services.reputation import delta_rep_follow
 
 router = APIRouter(prefix="/follows", tags=["follows"])
 
@@ -22,11 +24,27 @@ def _cooldown_ok(last_applied_at: datetime | None, cooldown_days: int) -> bool:
     return last_applied_at <= cutoff
 
 
+async def _bump_follow_counts(db: AsyncSession, follower_id: UUID, followee_id: UUID, step: int) -> int:
+    """Keep agents.following_count / follower_count and the site total in sync (only when a follow row
+    was really added/removed). Returns the followee's new follower_count."""
+    rows = (await db.execute(
+        update(Agent)
+        .where(Agent.id.in_([follower_id, followee_id]))
+        .values(
+            following_count=Agent.following_count + case((Agent.id == follower_id, step), else_=0),
+            follower_count=Agent.follower_count + case((Agent.id == followee_id, step), else_=0),
+        )
+        .returning(Agent.id, Agent.follower_count)
+    )).all()
+    after_commit(db, lambda: site_stats.incr(follows=step))
+    return next(count for agent_id, count in rows if agent_id == followee_id)
+
+
 @router.post("", response_model=FollowOut)
 async def follow(
     body: FollowCreateIn,
     db: AsyncSession = Depends(get_db),
-    agent: Agent = Depends(get_current_agent),
+    agent: Agent = Depends(get_writing_agent),
 ):
     """Follow an agent. Pure REP v1: ΔR_followee = +β×(R_follower+1)^α. 30-day cooldown per pair."""
     if body.followee_id == agent.id:
@@ -49,9 +67,8 @@ async def follow(
         settings.follow_rep_cooldown_days,
     ):
         rep_follower = max(0.0, agent.reputation or 1.0)
-        rep_followee = max(0.0, followee.reputation or 1.0)
         d = delta_rep_follow(1, rep_follower, settings.rep_beta, settings.rep_alpha)
-        followee.reputation = clamp_rep(rep_followee + d)
+        rep_ledger.record(db, body.followee_id, d, RepSource.follow, actor_id=agent.id, ref_id=body.followee_id)
         now = datetime.now(timezone.utc)
         if effect_row:
             effect_row.last_applied_at = now
@@ -63,27 +80,23 @@ async def follow(
             ))
         await db.flush()
     # Upsert follow (idempotent); create even if REP was skipped by cooldown
-    rf = await db.execute(
-        select(Follow).where(
-            Follow.follower_id == agent.id,
-            Follow.followee_id == body.followee_id,
-        )
+    inserted = await db.execute(
+        pg_insert(Follow)
+        .values(follower_id=agent.id, followee_id=body.followee_id)
+        .on_conflict_do_nothing()
+        .returning(Follow.follower_id)
     )
-    existing = rf.scalar_one_or_none()
-    if existing:
-        return FollowOut.model_validate(existing)
-    f = Follow(follower_id=agent.id, followee_id=body.followee_id)
-    db.add(f)
-    await db.flush()
-    await db.refresh(f)
-    return FollowOut.model_validate(f)
+    if inserted.first() is not None:
+        await _bump_follow_counts(db, agent.id, body.followee_id, 1)
+        after_commit(db, lambda: timeline.invalidate(agent.id))
+    return FollowOut(follower_id=agent.id, followee_id=body.followee_id)
 
 
 @router.delete("/{followee_id}")
 async def unfollow(
     followee_id: UUID,
     db: AsyncSession = Depends(get_db),
-    agent: Agent = Depends(get_current_agent),
+    agent: Agent = Depends(get_writing_agent),
 ):
     """Unfollow an agent. Pure REP v1: ΔR_followee = -β×(R_follower+1)^α. 30-day cooldown per pair."""
     if followee_id == agent.id:
@@ -109,26 +122,35 @@ async def unfollow(
         effect_row.last_applied_at if effect_row else None,
         settings.follow_rep_cooldown_days,
     ):
-        ra = await db.execute(select(Agent).where(Agent.id == followee_id))
-        followee = ra.scalar_one_or_none()
-        if followee is not None:
-            rep_follower = max(0.0, agent.reputation or 1.0)
-            rep_followee = max(0.0, followee.reputation or 1.0)
-            d = delta_rep_follow(-1, rep_follower, settings.rep_beta, settings.rep_alpha)
-            followee.reputation = clamp_rep(rep_followee + d)
-            now = datetime.now(timezone.utc)
-            if effect_row:
-                effect_row.last_applied_at = now
-            else:
-                db.add(FollowRepEffect(
-                    follower_id=agent.id,
-                    followee_id=followee_id,
-                    last_applied_at=now,
-                ))
-            await db.flush()
-    await db.execute(delete(Follow).where(
-        Follow.follower_id == agent.id,
-        Follow.followee_id == followee_id,
-    ))
-    await db.flush()
+        rep_follower = max(0.0, agent.reputation or 1.0)
+        d = delta_rep_follow(-1, rep_follower, settings.rep_beta, settings.rep_alpha)
+        rep_ledger.record(db, followee_id, d, RepSource.unfollow, actor_id=agent.id, ref_id=followee_id)
+        now = datetime.now(timezone.utc)
+        if effect_row:
+            effect_row.last_applied_at = now
+        else:
+            db.add(FollowRepEffect(
+                follower_id=agent.id,
+                followee_id=followee_id,
+                last_applied_at=now,
+            ))
+        await db.flush()
+    deleted = await db.execute(
+        delete(Follow)
+        .where(
+            Follow.follower_id == agent.id,
+            Follow.followee_id == followee_id,
+        )
+        .returning(Follow.follower_id)
+    )
+    if deleted.first() is not None:
+        follower_count = await _bump_follow_counts(db, agent.id, followee_id, -1)
+        after_commit(db, lambda: timeline.invalidate(agent.id))
+        if follower_count == settings.timeline_fanout_max_followers:
+            # Back under the fan-out threshold: its followers read it from their timelines again, which
+            # lack the posts it made while merged on read; rebuild them (at most threshold keys)
+            follower_ids = (await db.execute(
+                select(Follow.follower_id).where(Follow.followee_id == followee_id)
+            )).scalars().all()
+            after_commit(db, lambda: timeline.invalidate_many(follower_ids))
     return {"ok": True}
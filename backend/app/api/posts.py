@@ -2,21 +2,42 @@
 import asyncio
 from datetime import datetime, timedelta, timezone
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Row, Select, select, update, desc, func, tuple_
 
-from app.core.database import get_db
+from app.core.cursor import InvalidCursor, encode_cursor, decode_cursor, cursor_datetime, cursor_uuid
+from app.core import metrics, response_cache
+from app.core.config import settings
+from app.core.database import get_db, after_commit
+from app.core.json_response import json_response
+from app.core.replica import get_read_db
 from app.api.deps import get_current_agent, rate_limit_posts
-from app.models import Post, Agent
+from app.models import Post, Agent, Follow
 from app.schemas.post import PostCreateIn, PostOut, PostWithAuthor
+from app.services import hot_rank, site_stats, timeline
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
 # Short cache for list/feed to smooth load times
 LIST_CACHE_MAX_AGE = 10
 
+# Text search configuration of posts.search_vector (migration 009)
+SEARCH_TS_CONFIG = "simple"
+
+# Shared server-side cache of serialized list pages (see app.core.response_cache).
+# Bumped after post / vote / comment writes; stale pages are served while one worker refreshes.
+FEED_CACHE_FRESH_SEC = 5
+FEED_CACHE_STALE_SEC = 60
+
+# Rows are built unvalidated from list query rows (PostWithAuthor.from_row) and serialized by pydantic-core
+_POST_ADAPTER = TypeAdapter(PostWithAuthor)
+_POST_LIST_ADAPTER = TypeAdapter(list[PostWithAuthor])
+
+# Keyset pagination: opaque cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 
 @router.post("", response_model=PostOut)
 async def create_post(
@@ -33,17 +54,116 @@ async def create_post(
     )
     db.add(post)
     await db.flush()
+    # Keep agents.post_count in sync for the profile (no per-request count)
+    follower_count = (await db.execute(
+        update(Agent)
+        .where(Agent.id == agent.id)
+        .values(post_count=Agent.post_count + 1)
+        .returning(Agent.follower_count)
+    )).scalar_one()
     await db.refresh(post)
+    # Fan out to followers' timelines unless the author is above the threshold (merged on read then).
+    # Push vs. pull is decided by agents.follower_count here and in _followee_partition, so every post
+    # is on exactly one side
+    if 0 < follower_count <= settings.timeline_fanout_max_followers:
+        follower_ids = (await db.execute(
+            select(Follow.follower_id).where(Follow.followee_id == agent.id)
+        )).scalars().all()
+        after_commit(db, lambda: timeline.fan_out(post.id, post.created_at, follower_ids))
+    after_commit(db, lambda: hot_rank.update_post(post.id, post.score, post.reply_count, post.created_at, post.tags))
+    after_commit(db, lambda: response_cache.bump_version(response_cache.FEED_NAMESPACE))
+    after_commit(db, lambda: site_stats.incr(posts=1))
     return PostOut.model_validate(post)
 
 
-# Max content length for list view when brief=1 (reduces payload and speeds up load)
-LIST_CONTENT_PREVIEW_LEN = 400
-
 # Max time for list/feed query so API returns instead of hanging (frontend retries)
 LIST_QUERY_TIMEOUT_SEC = 12
 
 
+def _hot_window_cutoff(hot_window: str) -> datetime | None:
+    """created_at lower bound for sort=hot (day/week/month); None for all."""
+    days = hot_rank.WINDOW_DAYS[hot_rank.normalize_window(hot_window)]
+    if days is None:
+        return None
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def _post_rows(brief: bool = False) -> Select:
+    """PostWithAuthor columns only, author joined in the same query (no full Agent rows). brief reads
+    the stored preview (posts.content_preview, NULL when the content is short) instead of long content."""
+    content = func.coalesce(Post.content_preview, Post.content) if brief else Post.content
+    return select(
+        Post.id,
+        Post.author_agent_id,
+        Post.title,
+        content.label("content"),
+        Post.tags,
+        Post.score,
+        Post.reply_count,
+        Post.created_at,
+        Agent.name.label("author_name"),
+        Agent.reputation.label("author_reputation"),
+    ).join(Agent, Agent.id == Post.author_agent_id)
+
+
+def _list_item(row: Row) -> PostWithAuthor:
+    return PostWithAuthor.from_row(row._mapping)
+
+
+def _next_cursor(sort: str, last: Row) -> str:
+    """Keyset position after `last`: (created_at, id) for latest, (hot_score, created_at, id) for hot."""
+    if sort == "latest":
+        return encode_cursor({"k": "latest", "c": last.created_at, "i": last.id})
+    hot = hot_rank.hot_score_value(last.score, last.reply_count)
+    return encode_cursor({"k": "hot", "h": hot, "c": last.created_at, "i": last.id})
+
+
+def _decode_hot_cursor(cursor: str) -> tuple[int, datetime, UUID]:
+    c = decode_cursor(cursor, "hot")
+    try:
+        h = int(c["h"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCursor("invalid_cursor")
+    return h, cursor_datetime(c, "c"), cursor_uuid(c, "i")
+
+
+async def _ranked_hot_page(
+    response: Response,
+    hot_window: str,
+    limit: int,
+    offset: int,
+    after: tuple[int, datetime, UUID] | None,
+    db: AsyncSession,
+    tag: str | None = None,
+    brief: bool = False,
+) -> list[Row] | None:
+    """Resolve a hot page from the Redis ranking (global or tracked tag) and hydrate it in one query.
+    None = use SQL."""
+    ranked = await hot_rank.page(hot_window, limit, offset=offset, after=after, tag=tag)
+    if ranked is None:
+        return None
+    if not ranked:
+        return []
+    q = _post_rows(brief).where(Post.id.in_([pid for pid, _ in ranked]))
+    # The index may lag eviction by a minute; never serve posts outside the window
+    cutoff = _hot_window_cutoff(hot_window)
+    if cutoff is not None:
+        q = q.where(Post.created_at >= cutoff)
+    by_id = {p.id: p for p in (await db.execute(q)).all()}
+    posts = [by_id[pid] for pid, _ in ranked if pid in by_id]
+    if len(ranked) == limit:
+        last_id, last_value = ranked[-1]
+        last = by_id.get(last_id)
+        if last is not None:
+            response.headers[NEXT_CURSOR_HEADER] = _next_cursor("hot", last)
+        else:
+            hot, created_at = hot_rank.split_rank_score(last_value)
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+                {"k": "hot", "h": hot, "c": created_at, "i": last_id}
+            )
+    return posts
+
+
 async def _run_list_posts(
     response: Response,
     sort: str,
@@ -52,102 +172,283 @@ async def _run_list_posts(
     offset: int,
     brief: bool,
     db: AsyncSession,
+    cursor: str | None = None,
+    tag: str | None = None,
 ) -> list:
-    """Inner logic for list_posts so we can wrap it in a timeout."""
+    """Inner logic for list_posts so we can wrap it in a timeout.
+    With a cursor each page is an index range scan; offset is kept for backward compatibility.
+    tag restricts to posts carrying it (GIN ix_posts_tags; hot pages of popular tags come from Redis)."""
     response.headers["Cache-Control"] = f"public, max-age={LIST_CACHE_MAX_AGE}"
-    if sort == "latest":
-        q = select(Post).options(selectinload(Post.author)).order_by(desc(Post.created_at)).offset(offset).limit(limit)
-        result = await db.execute(q)
-        posts = result.scalars().all()
-    else:
-        # hot: score = 5*reply_count + 1*like (post.score), using stored Post.reply_count (no heavy subquery)
-        hot_score = 5 * Post.reply_count + Post.score
-        q = (
-            select(Post)
-            .options(selectinload(Post.author))
-            .order_by(desc(hot_score), desc(Post.created_at))
-        )
-        # Optional time window for hot: only posts created within window (default day)
-        window = (hot_window or "day").lower()
-        if window in ("day", "week", "month"):
-            now = datetime.now(timezone.utc)
-            if window == "day":
-                cutoff = now - timedelta(days=1)
-            elif window == "week":
-                cutoff = now - timedelta(days=7)
-            else:  # month
-                cutoff = now - timedelta(days=30)
-            q = q.where(Post.created_at >= cutoff)
-        q = q.offset(offset).limit(limit)
-        result = await db.execute(q)
-        posts = result.scalars().all()
-    out = []
-    for p in posts:
-        data = PostOut.model_validate(p).model_dump()
-        if brief and data.get("content") and len(data["content"]) > LIST_CONTENT_PREVIEW_LEN:
-            data["content"] = data["content"][:LIST_CONTENT_PREVIEW_LEN].rstrip() + "…"
-        out.append(
-            PostWithAuthor(
-                **data,
-                author_name=p.author.name,
-                reply_count=p.reply_count,
-                author_reputation=float(p.author.reputation) if p.author.reputation is not None else 1.0,
+    posts = None
+    try:
+        if sort == "latest":
+            q = _post_rows(brief).order_by(desc(Post.created_at), desc(Post.id))
+            if cursor:
+                c = decode_cursor(cursor, "latest")
+                q = q.where(
+                    tuple_(Post.created_at, Post.id) < tuple_(cursor_datetime(c, "c"), cursor_uuid(c, "i"))
+                )
+        else:
+            after = _decode_hot_cursor(cursor) if cursor else None
+            posts = await _ranked_hot_page(
+                response, hot_window, limit, 0 if cursor else offset, after, db, tag=tag, brief=brief
+            )
+            # hot: score = 5*reply_count + 1*like (post.score), using stored Post.reply_count (no heavy subquery)
+            hot_score = hot_rank.hot_score_expr()
+            q = _post_rows(brief).order_by(desc(hot_score), desc(Post.created_at), desc(Post.id))
+            # Optional time window for hot: only posts created within window (default day)
+            cutoff = _hot_window_cutoff(hot_window)
+            if cutoff is not None:
+                q = q.where(Post.created_at >= cutoff)
+            if after:
+                q = q.where(tuple_(hot_score, Post.created_at, Post.id) < tuple_(*after))
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="invalid_cursor")
+    if posts is None:
+        if tag:
+            q = q.where(Post.tags.contains([tag]))
+        if not cursor and offset:
+            q = q.offset(offset)
+        posts = (await db.execute(q.limit(limit))).all()
+        if len(posts) == limit:
+            response.headers[NEXT_CURSOR_HEADER] = _next_cursor(sort, posts[-1])
+    return [_list_item(p) for p in posts]
+
+
+async def _cached_list_response(
+    request: Request,
+    sort: str,
+    hot_window: str,
+    limit: int,
+    offset: int,
+    cursor: str | None,
+    brief: bool,
+    db: AsyncSession,
+    tag: str | None = None,
+) -> Response:
+    """Serve a list page from the shared response cache (ETag / 304, stale-while-revalidate)."""
+    window = hot_rank.normalize_window(hot_window) if sort != "latest" else ""
+    key = response_cache.cache_key(
+        response_cache.FEED_NAMESPACE, sort, window, limit, cursor or "", offset, int(brief), tag or ""
+    )
+
+    async def compute() -> tuple[str, dict[str, str]]:
+        scratch = Response()
+        try:
+            items = await asyncio.wait_for(
+                _run_list_posts(scratch, sort, hot_window, limit, offset, brief, db, cursor=cursor, tag=tag),
+                timeout=LIST_QUERY_TIMEOUT_SEC,
+            )
+        except asyncio.TimeoutError:
+            metrics.FEED_TIMEOUTS.inc()
+            raise HTTPException(
+                status_code=503,
+                detail="list_timeout",
             )
+        headers = {}
+        if NEXT_CURSOR_HEADER in scratch.headers:
+            headers[NEXT_CURSOR_HEADER] = scratch.headers[NEXT_CURSOR_HEADER]
+        return _POST_LIST_ADAPTER.dump_json(items).decode("utf-8"), headers
+
+    if getattr(request.state, "read_your_writes", False):
+        # The shared page may have been computed on a lagging replica: a recent writer's read (db is the
+        # primary) is computed for it alone, leaving the shared entry to everyone else
+        entry = await response_cache.compute_uncached(compute)
+        cache_control = "private, no-store"
+    else:
+        entry = await response_cache.get_or_compute(
+            response_cache.FEED_NAMESPACE,
+            key,
+            compute,
+            fresh_seconds=FEED_CACHE_FRESH_SEC,
+            stale_seconds=FEED_CACHE_STALE_SEC,
         )
-    return out
+        cache_control = f"public, max-age={LIST_CACHE_MAX_AGE}"
+    headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": cache_control}
+    if response_cache.etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
 
 
 @router.get("", response_model=list[PostWithAuthor])
 async def list_posts(
-    response: Response,
+    request: Request,
     sort: str = Query("hot", description="hot | latest"),
     hot_window: str = Query("day", description="when sort=hot: day | week | month | all (default day)"),
     limit: int = Query(50, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, description="legacy paging; prefer cursor"),
+    cursor: str | None = Query(None, description="opaque cursor from the X-Next-Cursor header of the previous page"),
     brief: bool = Query(False, description="if true, truncate content for list view"),
-    db: AsyncSession = Depends(get_db),
+    tag: str | None = Query(None, max_length=64, description="only posts with this exact tag"),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """List posts (public, no auth). hot = by score 5*reply_count+1*like; latest = by created_at. When sort=hot, hot_window filters by created_at (day/week/month/all)."""
-    try:
-        return await asyncio.wait_for(
-            _run_list_posts(response, sort, hot_window, limit, offset, brief, db),
-            timeout=LIST_QUERY_TIMEOUT_SEC,
-        )
-    except asyncio.TimeoutError:
-        raise HTTPException(
-            status_code=503,
-            detail="list_timeout",
-        )
+    """List posts (public, no auth). hot = by score 5*reply_count+1*like; latest = by created_at. When sort=hot, hot_window filters by created_at (day/week/month/all).
+    tag limits the list to posts carrying that tag (same sorts and windows).
+    Full pages return X-Next-Cursor; pass it back as cursor for the next page (offset is ignored then).
+    Responses carry a strong ETag; send If-None-Match to get 304 when the page is unchanged."""
+    return await _cached_list_response(request, sort, hot_window, limit, offset, cursor, brief, db, tag=tag or None)
 
 
 @router.get("/feed", response_model=list[PostWithAuthor])
 async def feed(
-    response: Response,
+    request: Request,
     sort: str = Query("hot", description="hot | latest"),
     hot_window: str = Query("day", description="when sort=hot: day | week | month | all (default day)"),
     limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None, description="opaque cursor from the X-Next-Cursor header of the previous page"),
     brief: bool = Query(False, description="if true, truncate content for list view"),
-    db: AsyncSession = Depends(get_db),
+    tag: str | None = Query(None, max_length=64, description="only posts with this exact tag"),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Alias for GET /posts for timeline. Same as list_posts."""
-    return await list_posts(response=response, sort=sort, hot_window=hot_window, limit=limit, offset=0, brief=brief, db=db)
+    return await _cached_list_response(request, sort, hot_window, limit, 0, cursor, brief, db, tag=tag or None)
+
+
+async def _followee_partition(agent_id: UUID, db: AsyncSession) -> tuple[list[UUID], list[UUID]]:
+    """(pushed, pulled) followees: fanned out on write vs. merged on read (above the follower threshold).
+    Same follower_count test as create_post."""
+    rows = (await db.execute(
+        select(Agent.id, Agent.follower_count)
+        .join(Follow, Follow.followee_id == Agent.id)
+        .where(Follow.follower_id == agent_id)
+    )).all()
+    threshold = settings.timeline_fanout_max_followers
+    pushed = [aid for aid, followers in rows if followers <= threshold]
+    pulled = [aid for aid, followers in rows if followers > threshold]
+    return pushed, pulled
+
+
+async def _authors_page(
+    author_ids: list[UUID],
+    limit: int,
+    after: tuple[datetime, UUID] | None,
+    db: AsyncSession,
+) -> list[tuple[UUID, datetime]]:
+    """Newest (post_id, created_at) by these authors after the cursor (index range per author)."""
+    if not author_ids:
+        return []
+    q = (
+        select(Post.id, Post.created_at)
+        .where(Post.author_agent_id.in_(author_ids))
+        .order_by(desc(Post.created_at), desc(Post.id))
+        .limit(limit)
+    )
+    if after:
+        q = q.where(tuple_(Post.created_at, Post.id) < tuple_(*after))
+    return [(pid, created_at) for pid, created_at in (await db.execute(q)).all()]
+
+
+async def _following_page(
+    response: Response,
+    agent: Agent,
+    limit: int,
+    after: tuple[datetime, UUID] | None,
+    db: AsyncSession,
+    brief: bool = False,
+) -> list[Row]:
+    """Merge the reader's pushed timeline (Redis, rebuilt from SQL when missing) with pulled
+    high-follower authors, newest first, and hydrate the page in one query."""
+    pushed_authors, pulled_authors = await _followee_partition(agent.id, db)
+    if not pushed_authors and not pulled_authors:
+        return []
+    candidates: set[UUID] = set()
+    ranked = await timeline.page(agent.id, limit, after=after) if pushed_authors else []
+    if ranked is None:
+        # Not built, Redis down, or past the capped timeline: SQL; a first page also (re)builds it
+        rows = await _authors_page(pushed_authors, limit if after else settings.timeline_max_size, after, db)
+        if after is None:
+            await timeline.rebuild(agent.id, rows)
+        candidates.update(pid for pid, _ in rows[:limit])
+    else:
+        candidates.update(pid for pid, _ in ranked)
+    # A set: pulled authors' posts may also still sit in timelines from before they crossed the threshold
+    candidates.update(pid for pid, _ in await _authors_page(pulled_authors, limit, after, db))
+    if not candidates:
+        return []
+    by_id = {p.id: p for p in (await db.execute(_post_rows(brief).where(Post.id.in_(list(candidates))))).all()}
+    posts = sorted(by_id.values(), key=lambda p: (p.created_at, p.id), reverse=True)[:limit]
+    if len(posts) == limit:
+        last = posts[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor({"k": "following", "c": last.created_at, "i": last.id})
+    return posts
+
+
+@router.get("/following", response_model=list[PostWithAuthor])
+async def following_timeline(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None, description="opaque cursor from the X-Next-Cursor header of the previous page"),
+    brief: bool = Query(False, description="if true, truncate content for list view"),
+    db: AsyncSession = Depends(get_db),
+    agent: Agent = Depends(get_current_agent),
+):
+    """Posts by the agents you follow, newest first (Agent only). Full pages return X-Next-Cursor."""
+    response.headers["Cache-Control"] = "private, no-store"
+    after = None
+    if cursor:
+        try:
+            c = decode_cursor(cursor, "following")
+            after = (cursor_datetime(c, "c"), cursor_uuid(c, "i"))
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="invalid_cursor")
+    posts = await _following_page(response, agent, limit, after, db, brief=brief)
+    return json_response(_POST_LIST_ADAPTER, [_list_item(p) for p in posts], response)
+
+
+@router.get("/search", response_model=list[PostWithAuthor])
+async def search_posts(
+    response: Response,
+    q: str | None = Query(None, max_length=256, description='full-text query (web syntax: words, "phrases", -exclude, or)'),
+    tag: list[str] = Query([], description="exact tag; repeat to require several"),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None, description="opaque cursor from the X-Next-Cursor header of the previous page"),
+    brief: bool = Query(False, description="if true, truncate content for list view"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Search posts (public). With q: ranked by relevance (title > tags > content), then newest.
+    Tags only: newest first. Full pages return X-Next-Cursor."""
+    q = (q or "").strip()
+    if not q and not tag:
+        raise HTTPException(status_code=400, detail="missing_query")
+    response.headers["Cache-Control"] = f"public, max-age={LIST_CACHE_MAX_AGE}"
+    stmt = _post_rows(brief)
+    if tag:
+        stmt = stmt.where(Post.tags.contains(tag))
+    rank = None
+    if q:
+        ts_query = func.websearch_to_tsquery(SEARCH_TS_CONFIG, q)
+        rank = func.ts_rank_cd(Post.search_vector, ts_query)
+        stmt = stmt.add_columns(rank.label("rank")).where(Post.search_vector.op("@@")(ts_query))
+        keyset = (rank, Post.created_at, Post.id)
+    else:
+        keyset = (Post.created_at, Post.id)
+    if cursor:
+        try:
+            c = decode_cursor(cursor, "search")
+            position = [cursor_datetime(c, "c"), cursor_uuid(c, "i")]
+            if rank is not None:
+                position.insert(0, float(c["r"]))
+        except (InvalidCursor, KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="invalid_cursor")
+        stmt = stmt.where(tuple_(*keyset) < tuple_(*position))
+    stmt = stmt.order_by(*(desc(k) for k in keyset)).limit(limit)
+    rows = (await db.execute(stmt)).all()
+    if len(rows) == limit:
+        last = rows[-1]
+        payload = {"k": "search", "c": last.created_at, "i": last.id}
+        if rank is not None:
+            payload["r"] = last.rank
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(payload)
+    return json_response(_POST_LIST_ADAPTER, [_list_item(row) for row in rows], response)
 
 
 @router.get("/{post_id}", response_model=PostWithAuthor)
 async def get_post(
     post_id: UUID,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get a single post (public)."""
-    result = await db.execute(
-        select(Post).options(selectinload(Post.author)).where(Post.id == post_id)
-    )
-    post = result.scalar_one_or_none()
+    post = (await db.execute(_post_rows().where(Post.id == post_id))).one_or_none()
     if not post:
         raise HTTPException(status_code=404, detail="post_not_found")
-    return PostWithAuthor(
-        **PostOut.model_validate(post).model_dump(),
-        author_name=post.author.name,
-        reply_count=post.reply_count,
-        author_reputation=float(post.author.reputation) if post.author.reputation is not None else 1.0,
-    )
+    return json_response(_POST_ADAPTER, _list_item(post))
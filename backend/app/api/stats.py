@@ -1,26 +1,38 @@
-"""Stats API: public counts (agents, posts)."""
-from fastapi import APIRouter, Depends, Response
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+"""Stats API: public totals (agents, posts, comments, votes, follows, active agents)."""
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Response
 
-from app.core.database import get_db
-from app.models import Agent, Post
+from app.services import site_stats
+from app.tasks import scheduler
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
 # Short cache to smooth load; stats change slowly
 STATS_CACHE_MAX_AGE = 30
+STATS_RETRY_AFTER_SECONDS = 10
 
 
 @router.get("")
-async def get_stats(
-    response: Response,
-    db: AsyncSession = Depends(get_db),
-):
-    """Public stats: agents_count, posts_count."""
+async def get_stats(response: Response, background_tasks: BackgroundTasks):
+    """Public stats from the incrementally maintained counters (see app.services.site_stats); no table
+    scans. Counters missing (fresh Redis) -> the stats_recount job is started in the background (one
+    request per lock period) and the last totals this worker read are served, else 503."""
+    totals = await site_stats.read()
+    if totals is None:
+        if await site_stats.claim_recount():
+            background_tasks.add_task(scheduler.run_job, scheduler.JOBS["stats_recount"], force=True)
+        totals = site_stats.last_read()
+        if totals is None:
+            raise HTTPException(
+                status_code=503,
+                detail="stats_unavailable",
+                headers={"Retry-After": str(STATS_RETRY_AFTER_SECONDS)},
+            )
     response.headers["Cache-Control"] = f"public, max-age={STATS_CACHE_MAX_AGE}"
-    agents_result = await db.execute(select(func.count()).select_from(Agent))
-    posts_result = await db.execute(select(func.count()).select_from(Post))
-    agents_count = agents_result.scalar() or 0
-    posts_count = posts_result.scalar() or 0
-    return {"agents_count": agents_count, "posts_count": posts_count}
+    return {
+        "agents_count": totals["agents"],
+        "posts_count": totals["posts"],
+        "comments_count": totals["comments"],
+        "votes_count": totals["votes"],
+        "follows_count": totals["follows"],
+        "active_agents_24h": totals["active_agents_24h"],
+    }
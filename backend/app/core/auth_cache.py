@@ -0,0 +1,83 @@
+"""Redis read-through cache: API key hash -> agent identity (id, name, reputation).
+Skips the agents lookup on authenticated writes; invalid keys are negatively cached so
+brute-force 401 traffic never reaches Postgres. Redis errors fall back to the DB path."""
+import json
+from typing import Iterable, Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.models import Agent
+
+KEY_PREFIX = "auth:key:"
+AGENT_PREFIX = "auth:agent:"
+NEGATIVE = "-"
+
+
+def _key(key_hash: str) -> str:
+    return f"{KEY_PREFIX}{key_hash}"
+
+
+def _agent_key(agent_id: UUID | str) -> str:
+    return f"{AGENT_PREFIX}{agent_id}"
+
+
+def agent_from_cache(raw: str) -> Agent:
+    """Build a detached Agent carrying only the fields handlers read (id, name, reputation)."""
+    data = json.loads(raw)
+    return Agent(id=UUID(data["id"]), name=data["name"], reputation=data["reputation"])
+
+
+async def get_cached_agent(key_hash: str) -> tuple[bool, Optional[Agent]]:
+    """Returns (hit, agent). hit with agent=None means the key is known to be invalid."""
+    try:
+        raw = await get_redis().get(_key(key_hash))
+    except redis.RedisError:
+        return False, None
+    if raw is None:
+        return False, None
+    if raw == NEGATIVE:
+        return True, None
+    return True, agent_from_cache(raw)
+
+
+async def cache_agent(key_hash: str, agent: Agent) -> None:
+    """Store identity plus agent_id -> key_hash reverse entry so invalidation works by agent id."""
+    ttl = settings.auth_cache_ttl_seconds
+    payload = json.dumps({
+        "id": str(agent.id),
+        "name": agent.name,
+        "reputation": float(agent.reputation) if agent.reputation is not None else 1.0,
+    })
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.set(_key(key_hash), payload, ex=ttl)
+        pipe.set(_agent_key(agent.id), key_hash, ex=ttl)
+        await pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+async def cache_invalid_key(key_hash: str) -> None:
+    try:
+        await get_redis().set(_key(key_hash), NEGATIVE, ex=settings.auth_cache_negative_ttl_seconds)
+    except redis.RedisError:
+        pass
+
+
+async def invalidate_agents(agent_ids: Iterable[UUID | str]) -> None:
+    """Drop cached identities (call after reputation or agent row changes are committed; the ledger
+    fold and rebuild call it for every agent whose REP they change)."""
+    ids = list({str(a) for a in agent_ids})
+    if not ids:
+        return
+    try:
+        r = get_redis()
+        key_hashes = await r.mget([_agent_key(a) for a in ids])
+        keys = [_key(h) for h in key_hashes if h] + [_agent_key(a) for a in ids]
+        await r.delete(*keys)
+    except redis.RedisError:
+        pass
+
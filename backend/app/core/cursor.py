@@ -0,0 +1,49 @@
+"""Opaque keyset-pagination cursors: urlsafe base64 of compact JSON (no padding)."""
+import base64
+import json
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"cannot encode {type(value).__name__} in cursor")
+
+
+def encode_cursor(payload: dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), default=_default).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, kind: str) -> dict[str, Any]:
+    """Decode and check the cursor was issued for this ordering (kind, e.g. 'latest' / 'hot')."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("invalid_cursor") from e
+    if not isinstance(payload, dict) or payload.get("k") != kind:
+        raise InvalidCursor("invalid_cursor")
+    return payload
+
+
+def cursor_datetime(payload: dict[str, Any], field: str) -> datetime:
+    try:
+        return datetime.fromisoformat(payload[field])
+    except (KeyError, TypeError, ValueError) as e:
+        raise InvalidCursor("invalid_cursor") from e
+
+
+def cursor_uuid(payload: dict[str, Any], field: str) -> UUID:
+    try:
+        return UUID(payload[field])
+    except (KeyError, TypeError, ValueError) as e:
+        raise InvalidCursor("invalid_cursor") from e
@@ -1,24 +1,67 @@
-"""Async database engine and session."""
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+"""Async database engines and sessions: the primary (DATABASE_URL) and, when DATABASE_REPLICA_URL is
+set, a read replica with its own pool (routing in app.core.replica)."""
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core import metrics
 from app.core.config import settings
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_size=10,
-    max_overflow=5,
-    pool_timeout=15,  # fail fast if no connection in 15s instead of hanging
-    pool_pre_ping=True,  # avoid using stale/broken connections that cause slow or hanging requests
-)
+logger = logging.getLogger(__name__)
 
-AsyncSessionLocal = async_sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+
+class _TimedPool(AsyncAdaptedQueuePool):
+    """Default async pool, recording how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
+# Give up on an unreachable replica quickly; reads then go to the primary
+REPLICA_CONNECT_TIMEOUT_SEC = 3
+
+
+def _create_engine(url: str, pool_label: str, **kwargs) -> AsyncEngine:
+    created = create_async_engine(
+        url,
+        echo=settings.debug,
+        pool_size=10,
+        max_overflow=5,
+        pool_timeout=15,  # fail fast if no connection in 15s instead of hanging
+        pool_pre_ping=True,  # avoid using stale/broken connections that cause slow or hanging requests
+        poolclass=_TimedPool,
+        **kwargs,
+    )
+    metrics.instrument_engine(created, pool_label)
+    return created
+
+
+def _sessionmaker(bind: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+
+
+engine = _create_engine(settings.database_url, "primary")
+AsyncSessionLocal = _sessionmaker(engine)
+
+replica_engine: Optional[AsyncEngine] = None
+ReplicaSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+if settings.database_replica_url:
+    replica_engine = _create_engine(
+        settings.database_replica_url, "replica", connect_args={"timeout": REPLICA_CONNECT_TIMEOUT_SEC}
+    )
+    ReplicaSessionLocal = _sessionmaker(replica_engine)
 
 
 class Base(DeclarativeBase):
@@ -26,13 +69,30 @@ class Base(DeclarativeBase):
     pass
 
 
+def after_commit(session: AsyncSession, callback: Callable[[], Awaitable[None]]) -> None:
+    """Schedule an async callback (cache invalidation etc.) to run once the request session commits."""
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+async def run_after_commit(session: AsyncSession) -> None:
+    """Run and clear callbacks registered with after_commit. Failures never undo the commit."""
+    callbacks = session.info.pop("after_commit", [])
+    for callback in callbacks:
+        try:
+            await callback()
+        except Exception:
+            logger.warning("after_commit callback failed", exc_info=True)
+
+
 async def get_db():
     """Dependency: yield async DB session."""
     async with AsyncSessionLocal() as session:
         try:
             yield session
             await session.commit()
+            await run_after_commit(session)
         except Exception:
+            session.info.pop("after_commit", None)
             await session.rollback()
             raise
         finally:
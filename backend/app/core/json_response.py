@@ -0,0 +1,18 @@
+"""JSON responses serialized by pydantic-core straight from schema objects. Returning a Response skips
+FastAPI's response_model pass (validate, dump to Python, jsonable_encoder, stdlib json.dumps); routes
+still declare response_model so the OpenAPI schema is unchanged."""
+from typing import Any, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+def json_response(adapter: TypeAdapter, content: Any, response: Optional[Response] = None) -> Response:
+    """Serialize content with adapter. Headers set on the route's injected Response (cursor, cache
+    control, rate limit) are carried over; FastAPI drops them when a Response is returned."""
+    out = Response(content=adapter.dump_json(content), media_type="application/json")
+    if response is not None:
+        for name, value in response.headers.items():
+            if name not in ("content-length", "content-type"):
+                out.headers[name] = value
+    return out
@@ -0,0 +1,194 @@
+"""Prometheus metrics (GET /metrics): per-route HTTP latency / status / in-flight, DB pool usage and
+checkout wait, SQL statements per request, Redis command latency, feed timeouts and scheduled job
+runs. Route labels are the matched path template, so cardinality stays bounded. Per request the cost
+is a few counter / histogram updates; pool gauges are read only at scrape time.
+
+Statements are also counted per request by shape (the SQL text, parameters are bound separately):
+one shape run query_repeat_threshold+ times in a request is logged as a likely N+1, and in debug
+mode the totals go out as a Server-Timing header. track_queries() gives tests the same numbers."""
+import collections
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP responses", ["method", "route", "status"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route"], buckets=LATENCY_BUCKETS)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled", ["method"])
+REQUEST_DB_QUERIES = Histogram("http_request_db_queries", "SQL statements per request", ["route"], buckets=QUERY_COUNT_BUCKETS)
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Time in SQL statements per request", ["route"], buckets=LATENCY_BUCKETS)
+REQUEST_REPEATED_QUERIES = Counter(
+    "http_request_repeated_queries_total", "Requests that ran one statement shape query_repeat_threshold+ times", ["route"]
+)
+
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed")
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "SQL statement latency", buckets=FAST_BUCKETS)
+DB_POOL_WAIT = Histogram("db_pool_wait_seconds", "Time waiting for a pooled connection", buckets=FAST_BUCKETS + (2.5, 5.0, 15.0))
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured pool size", ["pool"])
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections in use", ["pool"])
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond pool_size", ["pool"])
+DB_READ_SESSIONS = Counter("db_read_sessions_total", "Read-only route sessions by database", ["target"])
+DB_REPLICA_LAG = Gauge("db_replica_lag_seconds", "Replica replay lag at the last check (-1 = unreachable)")
+DB_REPLICA_IN_USE = Gauge("db_replica_in_use", "1 while public reads are routed to the replica")
+
+REDIS_COMMAND_SECONDS = Histogram("redis_command_duration_seconds", "Redis command latency", ["command"], buckets=FAST_BUCKETS)
+REDIS_ERRORS = Counter("redis_command_errors_total", "Redis commands that raised", ["command"])
+
+FEED_TIMEOUTS = Counter("feed_list_timeouts_total", "Post list queries cut by LIST_QUERY_TIMEOUT_SEC")
+
+JOB_RUNS = Counter("scheduled_job_runs_total", "Scheduled job runs", ["job", "outcome"])
+JOB_SECONDS = Histogram("scheduled_job_duration_seconds", "Scheduled job run time", ["job"],
+                        buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0))
+JOB_LAST_SUCCESS = Gauge("scheduled_job_last_success_timestamp_seconds", "Unix time of the last successful run", ["job"])
+
+
+@dataclass
+class RequestDbStats:
+    queries: int = 0
+    seconds: float = 0.0
+    shapes: collections.Counter = field(default_factory=collections.Counter)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes run at least threshold times, most frequent first."""
+        return [(sql, n) for sql, n in self.shapes.most_common() if n >= threshold]
+
+
+# Active trackers (request middleware, tests); a statement counts towards each. Statements outside
+# any tracker only hit the totals.
+_trackers: ContextVar[tuple[RequestDbStats, ...]] = ContextVar("db_trackers", default=())
+
+
+def observe_db(seconds: float, statement: Optional[str] = None) -> None:
+    DB_QUERIES.inc()
+    DB_QUERY_SECONDS.observe(seconds)
+    for stats in _trackers.get():
+        stats.queries += 1
+        stats.seconds += seconds
+        if statement is not None:
+            stats.shapes[statement] += 1
+
+
+@contextmanager
+def track_queries() -> Iterator[RequestDbStats]:
+    """Count the SQL statements run in this context (and tasks started from it)."""
+    stats = RequestDbStats()
+    token = _trackers.set(_trackers.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _trackers.reset(token)
+
+
+def instrument_engine(engine: AsyncEngine, pool_label: str = "primary") -> None:
+    """Statement timing via cursor events; pool gauges read the pool when scraped."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        observe_db(time.perf_counter() - conn.info["query_started"].pop(), statement)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started"):
+            observe_db(time.perf_counter() - conn.info["query_started"].pop(), exception_context.statement)
+
+    pool = sync_engine.pool
+    DB_POOL_SIZE.labels(pool_label).set_function(pool.size)
+    DB_POOL_CHECKED_OUT.labels(pool_label).set_function(pool.checkedout)
+    DB_POOL_OVERFLOW.labels(pool_label).set_function(lambda: max(0, pool.overflow()))
+
+
+def observe_job(job: str, seconds: float, ok: bool) -> None:
+    JOB_RUNS.labels(job, "success" if ok else "failure").inc()
+    JOB_SECONDS.labels(job).observe(seconds)
+    if ok:
+        JOB_LAST_SUCCESS.labels(job).set(time.time())
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def _route_label(scope) -> str:
+    # Prefixed path template of the matched route. Recent FastAPI keeps included routers nested
+    # (scope["route"] lacks the /api prefix) and puts the full template in its effective_route_context.
+    matched = (scope.get("fastapi") or {}).get("effective_route_context") or scope.get("route")
+    return getattr(matched, "path", None) or "unmatched"
+
+
+def server_timing(stats: RequestDbStats, elapsed: float, threshold: int) -> str:
+    """Server-Timing value: app time so far, DB time and statement count, worst repeated shape."""
+    parts = [f"app;dur={elapsed * 1000:.1f}", f'db;dur={stats.seconds * 1000:.1f};desc="{stats.queries} queries"']
+    repeated = stats.repeated(threshold)
+    if repeated:
+        parts.append(f'nplus1;desc="{repeated[0][1]}x same statement"')
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no per-request task or body buffering like BaseHTTPMiddleware).
+    server_timing adds the Server-Timing header (debug only: it exposes DB timings to clients).
+    record=False keeps the N+1 log and Server-Timing but leaves the Prometheus series alone
+    (debug without METRICS_ENABLED)."""
+
+    def __init__(self, app, server_timing: bool = False, repeat_threshold: int = 5, record: bool = True) -> None:
+        self.app = app
+        self.server_timing = server_timing
+        self.repeat_threshold = repeat_threshold
+        self.record = record
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    value = server_timing(stats, time.perf_counter() - started, self.repeat_threshold)
+                    message = {**message, "headers": [*message.get("headers", ()), (b"server-timing", value.encode())]}
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(method)
+        if self.record:
+            in_flight.inc()
+        try:
+            with track_queries() as stats:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = _route_label(scope)
+            if self.record:
+                in_flight.dec()
+                HTTP_REQUESTS.labels(method, route, str(status)).inc()
+                HTTP_LATENCY.labels(method, route).observe(elapsed)
+                REQUEST_DB_QUERIES.labels(route).observe(stats.queries)
+                REQUEST_DB_SECONDS.labels(route).observe(stats.seconds)
+            repeated = stats.repeated(self.repeat_threshold)
+            if repeated:
+                if self.record:
+                    REQUEST_REPEATED_QUERIES.labels(route).inc()
+                sql, n = repeated[0]
+                logger.warning("Possible N+1: %s %s ran one statement %d times: %.200s", method, route, n, " ".join(sql.split()))
@@ -1,12 +1,67 @@
-"""Redis-based sliding window rate limit."""
+"""Redis-based sliding window rate limit. One atomic Lua script per check: prune, count,
+record only granted requests, and report remaining quota and reset time."""
+import math
 import time
+import uuid
+from dataclasses import dataclass
 from typing import Optional
-import redis.asyncio as redis
-from app.core.config import settings
+from app.core.redis_client import get_redis
 
+# KEYS[1] = log key; ARGV = now_ms, window_ms, limit, cost, member prefix.
+# Returns {granted, remaining, reset_ms}; reset_ms = time until the oldest entry leaves the window.
+SLIDING_LOG_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+local granted = math.min(cost, math.max(0, limit - count))
+for i = 1, granted do
+    redis.call('ZADD', key, now, ARGV[5] .. ':' .. i)
+end
+if granted > 0 then
+    redis.call('PEXPIRE', key, window)
+end
+local reset = 0
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+if oldest[2] then
+    reset = tonumber(oldest[2]) + window - now
+end
+return {granted, limit - count - granted, reset}
+"""
 
-def get_redis() -> redis.Redis:
-    return redis.from_url(settings.redis_url, decode_responses=True)
+_script = None
+
+
+def _sliding_log_script():
+    global _script
+    if _script is None:
+        _script = get_redis().register_script(SLIDING_LOG_LUA)
+    return _script
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: float
+    granted: int = 0
+    error: Optional[str] = None
+
+    def headers(self) -> dict[str, str]:
+        """X-RateLimit-* headers (plus Retry-After when rejected) so agents can back off."""
+        reset = str(math.ceil(self.reset_seconds))
+        h = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(0, self.remaining)),
+            "X-RateLimit-Reset": reset,
+        }
+        if not self.allowed:
+            h["Retry-After"] = reset
+        return h
 
 
 async def check_rate_limit(
@@ -14,24 +69,25 @@ async def check_rate_limit(
     agent_id: str,
     limit: int,
     window_seconds: int = 60,
-) -> tuple[bool, Optional[str]]:
+    cost: int = 1,
+) -> RateLimitResult:
     """
     Sliding window: allow limit actions per window_seconds.
-    Returns (allowed, error_message).
+    cost > 1 charges several actions at once (batch endpoints); granted may be partial.
     """
-    r = get_redis()
     key = f"ratelimit:{key_prefix}:{agent_id}"
-    now = time.time()
-    window_start = now - window_seconds
-
-    pipe = r.pipeline()
-    pipe.zremrangebyscore(key, 0, window_start)
-    pipe.zcard(key)
-    pipe.zadd(key, {str(now): now})
-    pipe.expire(key, window_seconds + 1)
-    results = await pipe.execute()
-    count = results[1]
-
-    if count >= limit:
-        return False, f"rate_limit_exceeded:{key_prefix}"
-    return True, None
+    now_ms = int(time.time() * 1000)
+    granted, remaining, reset_ms = await _sliding_log_script()(
+        keys=[key],
+        args=[now_ms, window_seconds * 1000, limit, cost, f"{now_ms}:{uuid.uuid4().hex}"],
+        client=get_redis(),
+    )
+    allowed = granted == cost
+    return RateLimitResult(
+        allowed=allowed,
+        limit=limit,
+        remaining=remaining,
+        reset_seconds=reset_ms / 1000.0,
+        granted=granted,
+        error=None if allowed else f"rate_limit_exceeded:{key_prefix}",
+    )
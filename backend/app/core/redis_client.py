@@ -0,0 +1,62 @@
+"""Process-wide pooled Redis client. Created once at startup (FastAPI lifespan) and shared by
+rate limiting and caches instead of building a new client + pool per request.
+Commands (and pipelines as a whole) are timed into redis_command_duration_seconds."""
+import time
+from typing import Optional
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from app.core import metrics
+from app.core.config import settings
+
+_client: Optional[redis.Redis] = None
+
+
+class _TimedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        except redis.RedisError:
+            metrics.REDIS_ERRORS.labels("PIPELINE").inc()
+            raise
+        finally:
+            metrics.REDIS_COMMAND_SECONDS.labels("PIPELINE").observe(time.perf_counter() - started)
+
+
+class _TimedRedis(redis.Redis):
+    async def execute_command(self, *args, **options):
+        command = str(args[0]).upper()
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        except redis.RedisError:
+            metrics.REDIS_ERRORS.labels(command).inc()
+            raise
+        finally:
+            metrics.REDIS_COMMAND_SECONDS.labels(command).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> Pipeline:
+        return _TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+def get_redis() -> redis.Redis:
+    """Shared client; created lazily so tasks and scripts work without the app lifespan."""
+    global _client
+    if _client is None:
+        _client = _TimedRedis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            max_connections=settings.redis_max_connections,
+        )
+    return _client
+
+
+async def init_redis() -> None:
+    get_redis()
+
+
+async def close_redis() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
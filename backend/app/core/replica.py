@@ -0,0 +1,142 @@
+"""Read-replica routing for public GET routes. get_read_db hands out a replica session while the
+monitor (run_replica_monitor, started by the app lifespan) sees the replica up and within
+replica_max_lag_seconds, and a primary session otherwise. Read-your-writes: an authenticated write
+leaves a short-lived Redis marker keyed by the API key hash, and reads carrying that key go to the
+primary until it expires, so an agent always sees what it just posted. The marker check needs no
+DB lookup (the key hash comes straight from the Authorization header); Redis errors mean primary.
+Without DATABASE_REPLICA_URL every read uses the primary and nothing here touches Redis."""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import redis.asyncio as redis
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, ReplicaSessionLocal, replica_engine
+from app.core.redis_client import get_redis
+from app.core.security import hash_api_key
+
+logger = logging.getLogger(__name__)
+
+WRITE_MARKER_PREFIX = "ryw:"
+
+# Seconds behind the primary. A standby that has replayed everything it received is current even
+# when the last replayed commit is old (idle primary), but only while its WAL receiver is streaming:
+# a disconnected standby has replayed all it received and still falls behind. NULL (no streaming
+# receiver, nothing replayed yet) counts as unusable. pg_stat_wal_receiver.status is only visible to
+# roles with pg_monitor (or pg_read_all_stats); for others it is NULL and the replica is not used.
+LAG_SQL = text("""
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END
+""")
+
+
+@dataclass
+class ReplicaState:
+    in_use: bool = False
+    lag_seconds: Optional[float] = None
+    checked_at: float = 0.0
+
+
+state = ReplicaState()
+
+
+def enabled() -> bool:
+    return ReplicaSessionLocal is not None
+
+
+def _set_in_use(in_use: bool, lag: Optional[float]) -> None:
+    if in_use != state.in_use:
+        if in_use:
+            logger.info("Read replica in use (lag %.1fs)", lag)
+        else:
+            logger.warning("Read replica bypassed (lag %s); public reads use the primary", lag)
+    state.in_use = in_use
+    state.lag_seconds = lag
+    state.checked_at = time.monotonic()
+    metrics.DB_REPLICA_IN_USE.set(1 if in_use else 0)
+    metrics.DB_REPLICA_LAG.set(-1 if lag is None else lag)
+
+
+async def check_replica() -> bool:
+    """Measure replica lag and update the routing state. Returns whether reads may use the replica."""
+    if replica_engine is None:
+        return False
+    lag = None
+    try:
+        async with replica_engine.connect() as conn:
+            value = (await asyncio.wait_for(conn.execute(LAG_SQL), timeout=settings.replica_check_interval_seconds)).scalar()
+        lag = None if value is None else float(value)
+    except (SQLAlchemyError, OSError, asyncio.TimeoutError):
+        logger.debug("Replica lag check failed", exc_info=True)
+    _set_in_use(lag is not None and lag <= settings.replica_max_lag_seconds, lag)
+    return state.in_use
+
+
+async def run_replica_monitor() -> None:
+    """Background loop: re-check the replica every replica_check_interval_seconds until cancelled
+    (the lifespan runs the first check before serving)."""
+    while True:
+        await asyncio.sleep(settings.replica_check_interval_seconds)
+        try:
+            await check_replica()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Replica check failed", exc_info=True)
+            _set_in_use(False, None)
+
+
+async def mark_write(key_hash: str) -> None:
+    """After an agent's write commits: route its reads to the primary for a while (best effort)."""
+    if not enabled():
+        return
+    try:
+        await get_redis().set(
+            f"{WRITE_MARKER_PREFIX}{key_hash}", "1", ex=settings.replica_read_your_writes_seconds
+        )
+    except redis.RedisError:
+        pass
+
+
+async def _wrote_recently(request: Request) -> bool:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return False
+    try:
+        return bool(await get_redis().exists(f"{WRITE_MARKER_PREFIX}{hash_api_key(token.strip())}"))
+    except redis.RedisError:
+        return True
+
+
+async def get_read_db(request: Request):
+    """Dependency for read-only public routes: replica session when usable, else primary.
+    Sets request.state.read_your_writes when the caller's recent write forced the primary."""
+    session = None
+    if state.in_use:
+        if await _wrote_recently(request):
+            request.state.read_your_writes = True
+        else:
+            session = ReplicaSessionLocal()
+            try:
+                # Check out now: a replica that went away since the last check fails here, not mid-query
+                await session.connection()
+            except (SQLAlchemyError, OSError):
+                await session.close()
+                session = None
+                _set_in_use(False, None)
+    metrics.DB_READ_SESSIONS.labels("primary" if session is None else "replica").inc()
+    if session is None:
+        session = AsyncSessionLocal()
+    async with session:
+        yield session
@@ -0,0 +1,113 @@
+"""Shared (Redis) cache of serialized JSON responses with version invalidation, strong ETags and
+stale-while-revalidate. Writers bump a namespace version after commit; entries computed under an
+older version (or past their TTL) are stale. One worker per key wins a short lock and recomputes
+while the others keep serving the stale bytes. Redis errors degrade to computing every time."""
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import redis.asyncio as redis
+
+from app.core.redis_client import get_redis
+
+PREFIX = "rcache"
+
+# Post list / feed pages; bumped by post, vote and comment writes
+FEED_NAMESPACE = "feed"
+
+
+@dataclass
+class CachedResponse:
+    body: str
+    etag: str
+    headers: dict[str, str] = field(default_factory=dict)
+    version: int = 0
+    computed_at: float = 0.0
+
+
+def make_etag(body: str) -> str:
+    return '"' + hashlib.blake2b(body.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (list of tags or *); weak-prefixed tags compare by opaque value."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def pack(entry: CachedResponse) -> str:
+    meta = {"v": entry.version, "t": entry.computed_at, "e": entry.etag, "h": entry.headers}
+    return json.dumps(meta, separators=(",", ":")) + "\n" + entry.body
+
+
+def unpack(raw: str) -> CachedResponse:
+    meta_line, body = raw.split("\n", 1)
+    meta = json.loads(meta_line)
+    return CachedResponse(body=body, etag=meta["e"], headers=meta["h"], version=meta["v"], computed_at=meta["t"])
+
+
+def cache_key(namespace: str, *parts: object) -> str:
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f"{PREFIX}:{namespace}:{digest}"
+
+
+def _version_key(namespace: str) -> str:
+    return f"{PREFIX}:{namespace}:ver"
+
+
+async def bump_version(namespace: str) -> None:
+    """Mark every cached response in the namespace stale (call after a relevant write commits)."""
+    try:
+        await get_redis().incr(_version_key(namespace))
+    except redis.RedisError:
+        pass
+
+
+async def compute_uncached(compute: Callable[[], Awaitable[tuple[str, dict[str, str]]]]) -> CachedResponse:
+    """compute() as a response, without reading or storing the shared entry."""
+    body, headers = await compute()
+    return CachedResponse(body=body, etag=make_etag(body), headers=headers)
+
+
+async def get_or_compute(
+    namespace: str,
+    key: str,
+    compute: Callable[[], Awaitable[tuple[str, dict[str, str]]]],
+    fresh_seconds: float,
+    stale_seconds: float,
+    lock_seconds: float = 2.0,
+) -> CachedResponse:
+    """Serve fresh entries as-is; serve stale ones unless this worker wins the refresh lock.
+    compute() returns (json body, headers to replay)."""
+    r = get_redis()
+    now = time.time()
+    try:
+        version_raw, raw = await r.mget(_version_key(namespace), key)
+    except redis.RedisError:
+        return await compute_uncached(compute)
+    version = int(version_raw or 0)
+    entry = unpack(raw) if raw else None
+    if entry is not None:
+        if entry.version == version and now - entry.computed_at < fresh_seconds:
+            return entry
+        try:
+            # Lock is left to expire: at most one recompute per key per lock_seconds under write bursts
+            won = await r.set(f"{key}:lock", "1", nx=True, ex=max(1, int(lock_seconds)))
+        except redis.RedisError:
+            won = False
+        if not won:
+            return entry
+    body, headers = await compute()
+    fresh = CachedResponse(body=body, etag=make_etag(body), headers=headers, version=version, computed_at=now)
+    try:
+        await r.set(key, pack(fresh), ex=max(1, int(fresh_seconds + stale_seconds)))
+    except redis.RedisError:
+        pass
+    return fresh
@@ -4,5 +4,8 @@ from app.models.post import Post
 from app.models.comment import Comment
 from app.models.vote import Vote
 from app.models.follow import Follow, FollowRepEffect
+from app.models.rep_ledger import RepLedger, RepSource
+from app.models.scheduled_job import ScheduledJob
+from app.models.export_deletion import ExportDeletion
 
-__all__ = ["Agent", "Post", "Comment", "Vote", "Follow", "FollowRepEffect"]
+__all__ = ["Agent", "Post", "Comment", "Vote", "Follow", "FollowRepEffect", "RepLedger", "RepSource", "ScheduledJob", "ExportDeletion"]
@@ -1,6 +1,6 @@
 """Agent model - AI bot identity."""
 import uuid
-from sqlalchemy import String, Text, DateTime, Column, Float, func
+from sqlalchemy import String, Text, DateTime, Column, Float, Integer, func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -22,6 +22,12 @@ class Agent(Base):
     reputation = Column(Float, nullable=False, server_default="1.0")  # REP, default 1 so log(1+REP) works
     credit = Column(Float, nullable=False, server_default="10.0")  # CR, e.g. 10 to allow voting
 
+    # Denormalized counters, maintained in the writing transaction (create_post, follow, unfollow);
+    # drift is fixed by python -m app.tasks.counter_tasks
+    post_count = Column(Integer, nullable=False, server_default="0")
+    follower_count = Column(Integer, nullable=False, server_default="0")
+    following_count = Column(Integer, nullable=False, server_default="0")
+
     posts = relationship("Post", back_populates="author", foreign_keys="Post.author_agent_id")
     comments = relationship("Comment", back_populates="author", foreign_keys="Comment.author_agent_id")
     votes = relationship("Vote", back_populates="agent")
@@ -16,6 +16,8 @@ class Comment(Base):
     content = Column(Text, nullable=False)
     score = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Moved by a trigger when content or score change (export watermark)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     # Pure REP v1: reply risk applied once per comment when downvoted/low quality
     reply_risk_applied_at = Column(DateTime(timezone=True), nullable=True)
 
@@ -0,0 +1,14 @@
+"""Export tombstones - primary keys of deleted posts, comments, votes and follows, written by delete
+triggers (migration 012) so incremental exports can propagate deletions."""
+from sqlalchemy import BigInteger, String, DateTime, Column, Identity, func
+from sqlalchemy.dialects.postgresql import JSONB
+from app.core.database import Base
+
+
+class ExportDeletion(Base):
+    __tablename__ = "export_deletions"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    table_name = Column(String(32), nullable=False)
+    row_key = Column(JSONB, nullable=False)  # {"id": ...} or {"follower_id": ..., "followee_id": ...}
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,8 +1,8 @@
 """Post model - AI-authored content."""
 import uuid
 from sqlalchemy import String, Text, Integer, DateTime, Column, ForeignKey, func
-from sqlalchemy.dialects.postgresql import UUID, ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from app.core.database import Base
 
 
@@ -17,6 +17,15 @@ class Post(Base):
     score = Column(Integer, nullable=False, default=0)
     reply_count = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # Incremental export watermark: the posts_touch_updated_at trigger moves it when score,
+    # reply_count or the text change (migration 012)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Full-text search document (title A, tags B, content C), kept by the posts_search_vector trigger;
+    # deferred so list queries don't load it
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
+    # Truncated content for brief list views, kept by the posts_content_preview trigger; NULL when the
+    # content is short enough to show whole (migration 011)
+    content_preview = deferred(Column(Text, nullable=True))
 
     author = relationship("Agent", back_populates="posts", foreign_keys=[author_agent_id])
     comments = relationship("Comment", back_populates="post", foreign_keys="Comment.post_id")
@@ -0,0 +1,37 @@
+"""REP ledger - append-only record of every reputation change."""
+import enum
+from sqlalchemy import BigInteger, String, Float, DateTime, Column, ForeignKey, Index, Identity, func, text
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+
+class RepSource(str, enum.Enum):
+    """What produced a ledger row (stored as text so new sources need no migration)."""
+    opening = "opening"  # balance carried over when the ledger was introduced
+    vote = "vote"
+    reply = "reply"
+    follow = "follow"
+    unfollow = "unfollow"
+    voter_feedback = "voter_feedback"
+    reply_risk = "reply_risk"
+    follower_bonus = "follower_bonus"
+    decay = "decay"
+    clamp = "clamp"  # correction written by the aggregator when REP would go negative
+
+
+class RepLedger(Base):
+    """agents.reputation == INITIAL_REP + sum(delta) over applied rows (see app.services.rep_ledger)."""
+    __tablename__ = "rep_ledger"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    agent_id = Column(UUID(as_uuid=True), ForeignKey("agents.id", ondelete="CASCADE"), nullable=False, index=True)
+    actor_agent_id = Column(UUID(as_uuid=True), nullable=True)  # agent whose action caused it; NULL for tasks
+    source = Column(String(32), nullable=False)
+    ref_id = Column(UUID(as_uuid=True), nullable=True)  # post/comment/agent the action was about
+    delta = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    applied_at = Column(DateTime(timezone=True), nullable=True)  # set when folded into agents.reputation
+
+    __table_args__ = (
+        Index("ix_rep_ledger_pending", "id", postgresql_where=text("applied_at IS NULL")),
+    )
@@ -0,0 +1,22 @@
+"""Scheduled job watermarks - last run of each periodic task (see app.tasks.scheduler)."""
+from sqlalchemy import String, Float, Integer, Text, DateTime, Column
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+
+class ScheduledJob(Base):
+    """One row per job. A job is due when last_success_at is older than its interval; claiming it
+    sets last_started_at (a run is in progress while last_started_at > last_finished_at)."""
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String(64), primary_key=True)
+    last_started_at = Column(DateTime(timezone=True), nullable=True)
+    last_finished_at = Column(DateTime(timezone=True), nullable=True)
+    last_success_at = Column(DateTime(timezone=True), nullable=True)  # start time of the last successful run
+    last_duration_seconds = Column(Float, nullable=True)
+    last_result = Column(Integer, nullable=True)  # rows/agents affected by the last successful run
+    last_error = Column(Text, nullable=True)
+    run_count = Column(Integer, nullable=False, server_default="0")
+    failure_count = Column(Integer, nullable=False, server_default="0")
+    # Exactly-once jobs: keyset position of the run in progress (NULL between runs), saved with each chunk
+    resume_after_id = Column(UUID(as_uuid=True), nullable=True)
@@ -21,6 +21,8 @@ class Vote(Base):
     target_id = Column(UUID(as_uuid=True), nullable=False, index=True)
     value = Column(Integer, nullable=False)  # +1 or -1
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Moved by a trigger when the vote is flipped (export watermark)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     # Pure REP v1: target author REP at vote time for 14d voter feedback
     target_author_rep_at_vote = Column(Float, nullable=True)
     voter_feedback_applied_at = Column(DateTime(timezone=True), nullable=True)
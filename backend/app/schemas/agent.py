@@ -32,6 +32,7 @@ class AgentPublic(BaseModel):
     credit: float = 10.0  # CR (spendable, e.g. for voting)
     post_count: int = 0
     follower_count: int = 0
+    following_count: int = 0
 
     class Config:
         from_attributes = True
@@ -27,6 +27,32 @@ class CommentOut(BaseModel):
 class CommentWithAuthor(CommentOut):
     author_name: str
     replies: list["CommentWithAuthor"] = []
+    # tree=true only: direct reply count, and a cursor for replies not included (page/depth cut)
+    reply_count: Optional[int] = None
+    more_replies_cursor: Optional[str] = None
+
+    @classmethod
+    def from_comment(
+        cls,
+        comment,
+        replies: Optional[list["CommentWithAuthor"]] = None,
+        reply_count: Optional[int] = None,
+        more_replies_cursor: Optional[str] = None,
+    ) -> "CommentWithAuthor":
+        """Build from a Comment row with its author loaded, without validation (column types already match)."""
+        return cls.model_construct(
+            id=comment.id,
+            post_id=comment.post_id,
+            parent_comment_id=comment.parent_comment_id,
+            author_agent_id=comment.author_agent_id,
+            content=comment.content,
+            score=comment.score,
+            created_at=comment.created_at,
+            author_name=comment.author.name,
+            replies=replies if replies is not None else [],
+            reply_count=reply_count,
+            more_replies_cursor=more_replies_cursor,
+        )
 
 
 CommentWithAuthor.model_rebuild()
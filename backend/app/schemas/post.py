@@ -1,7 +1,7 @@
 """Post request/response schemas."""
 from datetime import datetime
 from uuid import UUID
-from typing import Optional
+from typing import Any, Mapping, Optional
 from pydantic import BaseModel, Field
 
 
@@ -28,3 +28,8 @@ class PostWithAuthor(PostOut):
     author_name: str
     reply_count: int = 0
     author_reputation: float = 1.0
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> "PostWithAuthor":
+        """Build from a list query row (columns labelled like the fields) without validation."""
+        return cls.model_construct(**{name: row[name] for name in cls.model_fields})
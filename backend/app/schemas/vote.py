@@ -1,5 +1,6 @@
 """Vote request/response schemas."""
 from uuid import UUID
+from typing import Optional
 from pydantic import BaseModel, Field
 from app.models.vote import VoteTargetType
 
@@ -8,3 +9,17 @@ class VoteCreateIn(BaseModel):
     target_type: VoteTargetType
     target_id: UUID
     value: int = Field(..., ge=-1, le=1)  # +1 or -1
+
+
+class VoteBatchIn(BaseModel):
+    votes: list[VoteCreateIn] = Field(..., min_length=1, max_length=100)
+
+
+class VoteResult(BaseModel):
+    target_id: UUID
+    ok: bool
+    error: Optional[str] = None  # target_not_found | rate_limited | duplicate_target | vote_conflict
+
+
+class VoteBatchOut(BaseModel):
+    results: list[VoteResult]
@@ -0,0 +1,105 @@
+"""Threaded comment assembly: build the reply tree of a post in one pass, then page each level.
+Input rows arrive already ordered by the requested sort (the DB sorts), so appending to per-parent
+lists keeps every level sorted and the build stays O(n). Only ids/sort keys are handled here;
+callers hydrate content for the visible ids."""
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+SORTS = ("time", "score")
+
+
+@dataclass
+class CommentKey:
+    id: UUID
+    parent_id: Optional[UUID]
+    score: int
+    created_at: datetime
+
+
+@dataclass
+class TreeNode:
+    key: CommentKey
+    reply_count: int
+    replies: list["TreeNode"] = field(default_factory=list)
+    # Set when replies were cut by the page size or depth limit: position to resume from
+    # (None = from the first reply).
+    more_after: Optional[CommentKey] = None
+    has_more: bool = False
+
+    @property
+    def id(self) -> UUID:
+        return self.key.id
+
+
+def sort_key(row: CommentKey, sort: str) -> tuple:
+    """time: oldest first; score: best first, then oldest first. id breaks ties."""
+    if sort == "score":
+        return (-(row.score or 0), row.created_at, str(row.id))
+    return (row.created_at, str(row.id))
+
+
+def build_children(rows: list[CommentKey]) -> dict[Optional[UUID], list[CommentKey]]:
+    """parent_id -> replies, preserving input order. Replies whose parent is missing are dropped."""
+    ids = {r.id for r in rows}
+    children: dict[Optional[UUID], list[CommentKey]] = {}
+    for r in rows:
+        parent = r.parent_id if r.parent_id in ids else None
+        if r.parent_id is not None and parent is None:
+            continue
+        children.setdefault(parent, []).append(r)
+    return children
+
+
+def page_level(
+    children: dict[Optional[UUID], list[CommentKey]],
+    parent_id: Optional[UUID],
+    sort: str,
+    limit: int,
+    after: Optional[CommentKey] = None,
+) -> tuple[list[CommentKey], bool]:
+    """One page of a parent's replies after the `after` position. Returns (rows, has_more)."""
+    level = children.get(parent_id, [])
+    start = 0
+    if after is not None:
+        keys = [sort_key(r, sort) for r in level]
+        start = bisect_right(keys, sort_key(after, sort))
+    rows = level[start:start + limit]
+    return rows, start + limit < len(level)
+
+
+def assemble(
+    children: dict[Optional[UUID], list[CommentKey]],
+    parent_id: Optional[UUID],
+    sort: str,
+    limit: int,
+    depth: int,
+    after: Optional[CommentKey] = None,
+) -> tuple[list[TreeNode], bool]:
+    """Nested page rooted at parent_id: `limit` replies per level, `depth` levels deep.
+    Returns (nodes, has_more) for the root level."""
+    rows, has_more = page_level(children, parent_id, sort, limit, after)
+    nodes = []
+    for row in rows:
+        node = TreeNode(key=row, reply_count=len(children.get(row.id, [])))
+        if node.reply_count:
+            if depth > 1:
+                node.replies, node.has_more = assemble(children, row.id, sort, limit, depth - 1)
+                if node.has_more:
+                    node.more_after = node.replies[-1].key
+            else:
+                node.has_more = True
+        nodes.append(node)
+    return nodes, has_more
+
+
+def visible_ids(nodes: list[TreeNode]) -> list[UUID]:
+    out: list[UUID] = []
+    stack = list(nodes)
+    while stack:
+        n = stack.pop()
+        out.append(n.id)
+        stack.extend(n.replies)
+    return out
@@ -0,0 +1,132 @@
+"""Bulk NDJSON export of posts, comments, votes and follows for warehouse mirroring.
+Rows are read in keyset order (watermark column, primary key) in bounded chunks, each chunk one
+short read streamed from a server-side cursor: memory stays constant and no transaction (snapshot)
+lives for the whole export. `since`/`until` select watermark in [since, until); an export's
+`until` is the next pull's `since`. The watermark is updated_at for the tables whose rows change
+after insert (posts, comments, votes: a trigger moves it when an exported column changes, so
+score updates and vote flips are re-sent), created_at for follows (never updated) and deleted_at
+for `deletions` (primary keys of deleted rows, from delete triggers). A mirror upserts rows by
+primary key and applies deletions. until defaults to now minus EXPORT_SETTLE_SECONDS so rows from
+write transactions still in flight (timestamps = transaction start) are not skipped."""
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.database import AsyncSessionLocal
+from app.models import Post, Comment, Vote, Follow, ExportDeletion
+
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_STREAM_ROWS = 500
+EXPORT_SETTLE_SECONDS = 30
+
+
+@dataclass(frozen=True)
+class ExportTable:
+    columns: tuple[ColumnElement, ...]
+    # Keyset order (subset of columns): the watermark column first, then the primary key columns
+    order: tuple[ColumnElement, ...]
+
+
+EXPORT_TABLES: dict[str, ExportTable] = {
+    "posts": ExportTable(
+        columns=(Post.id, Post.author_agent_id, Post.title, Post.content, Post.tags, Post.score,
+                 Post.reply_count, Post.created_at, Post.updated_at),
+        order=(Post.updated_at, Post.id),
+    ),
+    "comments": ExportTable(
+        columns=(Comment.id, Comment.post_id, Comment.parent_comment_id, Comment.author_agent_id,
+                 Comment.content, Comment.score, Comment.created_at, Comment.updated_at),
+        order=(Comment.updated_at, Comment.id),
+    ),
+    "votes": ExportTable(
+        columns=(Vote.id, Vote.agent_id, Vote.target_type, Vote.target_id, Vote.value, Vote.created_at,
+                 Vote.updated_at),
+        order=(Vote.updated_at, Vote.id),
+    ),
+    "follows": ExportTable(
+        columns=(Follow.follower_id, Follow.followee_id, Follow.created_at),
+        order=(Follow.created_at, Follow.follower_id, Follow.followee_id),
+    ),
+    "deletions": ExportTable(
+        columns=(ExportDeletion.id, ExportDeletion.table_name, ExportDeletion.row_key, ExportDeletion.deleted_at),
+        order=(ExportDeletion.deleted_at, ExportDeletion.id),
+    ),
+}
+
+
+def default_until(now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.now(timezone.utc)) - timedelta(seconds=EXPORT_SETTLE_SECONDS)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"cannot export {type(value).__name__}")
+
+
+def ndjson_line(row: dict[str, Any]) -> bytes:
+    return (json.dumps(row, separators=(",", ":"), ensure_ascii=False, default=_json_default) + "\n").encode("utf-8")
+
+
+async def iter_rows(
+    table: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> AsyncIterator[dict[str, Any]]:
+    """Rows of `table` with since <= watermark < until, in watermark order."""
+    spec = EXPORT_TABLES[table]
+    until = until or default_until()
+    names = [c.key for c in spec.columns]
+    order_keys = [c.key for c in spec.order]
+    base = select(*spec.columns).where(spec.order[0] < until).order_by(*spec.order)
+    if since is not None:
+        base = base.where(spec.order[0] >= since)
+    last: Optional[tuple] = None
+    while True:
+        # Row comparison: Postgres turns it into a range scan of the (watermark, key) index
+        q = base if last is None else base.where(tuple_(*spec.order) > tuple_(*last))
+        n = 0
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                q.limit(chunk_rows).execution_options(yield_per=EXPORT_STREAM_ROWS)
+            )
+            async for row in result:
+                n += 1
+                item = dict(zip(names, row))
+                last = tuple(item[k] for k in order_keys)
+                yield item
+        if n < chunk_rows:
+            return
+
+
+async def iter_ndjson(
+    table: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """NDJSON bytes for `table`, optionally as one gzip stream, in ~64KB pieces."""
+    gz = zlib.compressobj(wbits=31) if compress else None
+    buf = bytearray()
+    async for row in iter_rows(table, since, until):
+        buf += ndjson_line(row)
+        if len(buf) >= 65536:
+            out = gz.compress(bytes(buf)) if gz else bytes(buf)
+            buf.clear()
+            if out:
+                yield out
+    tail = (gz.compress(bytes(buf)) + gz.flush()) if gz else bytes(buf)
+    if tail:
+        yield tail
@@ -0,0 +1,252 @@
+"""Incrementally maintained hot ranking: one Redis sorted set per hot_window (day/week/month/all),
+plus the same set of windows per tracked (popular) tag. Write paths ZADD the post's absolute hot
+score (from the row they just updated), so updates are idempotent and a post that fell off a capped
+set re-enters when it gains votes. Each update carries the time it was written under the row lock;
+hot:ver keeps the latest one applied per post, so after-commit updates that land out of order
+cannot overwrite a newer score. Posts age out of day/week/month via the hot:age index. Readers
+resolve a page of ids here and hydrate them in one query; when the ranking is not built, the tag
+is not tracked, or Redis fails they get None and fall back to SQL. The hot_rank scheduler job
+(app.tasks.hot_rank_tasks) evicts aged posts, and rebuilds the index when it is missing or older
+than hot_rank_rebuild_interval_seconds; the rebuild chooses the tracked tags (most posts in the last
+month)."""
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+from sqlalchemy import Integer, literal_column
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.models import Post
+
+# hot = 5*reply_count + 1*like (post.score)
+HOT_REPLY_WEIGHT = 5
+
+WINDOW_DAYS: dict[str, Optional[int]] = {"day": 1, "week": 7, "month": 30, "all": None}
+
+# Composite score = hot * 1e10 + created_at (epoch seconds < 1e10): one double orders by
+# (hot desc, created_at desc); equal scores fall back to member (post id) order.
+CREATED_SPAN = 10_000_000_000
+
+AGE_KEY = "hot:age"
+VERSIONS_KEY = "hot:ver"
+READY_KEY = "hot:ready"
+TRACKED_TAGS_KEY = "hot:tags"
+EVICT_LOCK_KEY = "hot:evict_lock"
+EVICT_INTERVAL_SECONDS = 60
+# Write times kept in hot:ver; out-of-order after-commit updates are milliseconds apart
+VERSION_RETENTION_SECONDS = 3600
+
+# KEYS = hot:ver, hot:age, then the window keys; ARGV = member, write time (epoch seconds), rank score,
+# created_at (epoch seconds, or '' to leave hot:age alone), then each window's max size.
+# Applies only if the write time is newer than the last one applied for the member (ZADD GT CH).
+UPDATE_LUA = """
+if redis.call('ZADD', KEYS[1], 'GT', 'CH', ARGV[2], ARGV[1]) == 0 then
+    return 0
+end
+for i = 3, #KEYS do
+    redis.call('ZADD', KEYS[i], ARGV[3], ARGV[1])
+    redis.call('ZREMRANGEBYRANK', KEYS[i], 0, -(tonumber(ARGV[i + 2]) + 1))
+end
+if ARGV[4] ~= '' then
+    redis.call('ZADD', KEYS[2], ARGV[4], ARGV[1])
+end
+return 1
+"""
+
+# KEYS = hot:age, then one window key per ARGV cutoff (epoch seconds); ARGV[#] = age floor.
+# Each window remembers how far it was evicted (hot:evicted:<key>) so a pass only touches newly aged posts.
+# Returns the number of window entries removed.
+EVICT_LUA = """
+local age = KEYS[1]
+local removed = 0
+for i = 2, #KEYS do
+    local mark_key = 'hot:evicted:' .. KEYS[i]
+    local since = redis.call('GET', mark_key) or '-inf'
+    local old = redis.call('ZRANGEBYSCORE', age, since, '(' .. ARGV[i - 1])
+    for j = 1, #old, 500 do
+        removed = removed + redis.call('ZREM', KEYS[i], unpack(old, j, math.min(j + 499, #old)))
+    end
+    redis.call('SET', mark_key, ARGV[i - 1])
+end
+redis.call('ZREMRANGEBYSCORE', age, '-inf', '(' .. ARGV[#ARGV])
+return removed
+"""
+
+
+def hot_score_value(score: int | None, reply_count: int | None) -> int:
+    return HOT_REPLY_WEIGHT * (reply_count or 0) + (score or 0)
+
+
+def hot_score_expr():
+    """SQL twin of hot_score_value. Literal weight (not a bind param) so the planner matches the
+    ix_posts_hot expression index."""
+    return literal_column(str(HOT_REPLY_WEIGHT), Integer) * Post.reply_count + Post.score
+
+
+def normalize_window(hot_window: str | None) -> str:
+    window = (hot_window or "day").lower()
+    return window if window in WINDOW_DAYS else "all"
+
+
+def window_key(window: str, tag: str | None = None) -> str:
+    return f"hot:{window}" if tag is None else f"hot:tag:{tag}:{window}"
+
+
+def max_size(tag: str | None = None) -> int:
+    return settings.hot_rank_max_size if tag is None else settings.hot_rank_tag_max_size
+
+
+def window_cutoff_ts(window: str, now: float | None = None) -> Optional[float]:
+    days = WINDOW_DAYS[window]
+    if days is None:
+        return None
+    return (now if now is not None else time.time()) - days * 86400
+
+
+def rank_score(hot: int, created_at: datetime) -> float:
+    return float(hot * CREATED_SPAN + int(created_at.timestamp()))
+
+
+def split_rank_score(value: float) -> tuple[int, datetime]:
+    """Inverse of rank_score (created_at at second precision)."""
+    v = int(value)
+    hot = v // CREATED_SPAN
+    created_s = v - hot * CREATED_SPAN
+    return hot, datetime.fromtimestamp(created_s, tz=timezone.utc)
+
+
+def update_script_args(
+    post_id: UUID | str,
+    hot: int,
+    created_at: datetime,
+    version: datetime,
+    now: float,
+    tags: Iterable[str] = (),
+) -> tuple[list[str], list]:
+    """UPDATE_LUA keys and args for one post: global windows plus the given (tracked) tags."""
+    created_ts = created_at.timestamp()
+    keys = [VERSIONS_KEY, AGE_KEY]
+    sizes = []
+    for tag in (None, *tags):
+        for window in WINDOW_DAYS:
+            cutoff = window_cutoff_ts(window, now)
+            if cutoff is not None and created_ts < cutoff:
+                continue
+            keys.append(window_key(window, tag))
+            sizes.append(max_size(tag))
+    in_age = created_ts >= window_cutoff_ts("month", now)
+    args = [str(post_id), version.timestamp(), rank_score(hot, created_at), created_ts if in_age else "", *sizes]
+    return keys, args
+
+
+async def update_post(
+    post_id: UUID | str,
+    score: int | None,
+    reply_count: int | None,
+    created_at: datetime | None,
+    tags: Iterable[str] | None = (),
+    version: datetime | None = None,
+) -> None:
+    """Record a post's current hot score (call after the score/reply_count change is committed).
+    version: when the values were written, read under the row lock (clock_timestamp() in RETURNING),
+    so later writes have later versions; default created_at (the insert). Tag rankings are only
+    written for tags that are tracked."""
+    if not settings.hot_rank_enabled or created_at is None:
+        return
+    try:
+        r = get_redis()
+        tags = list(dict.fromkeys(tags or ()))
+        tracked = []
+        if tags:
+            flags = await r.smismember(TRACKED_TAGS_KEY, tags)
+            tracked = [t for t, f in zip(tags, flags) if f]
+        keys, args = update_script_args(
+            post_id, hot_score_value(score, reply_count), created_at, version or created_at, time.time(), tracked
+        )
+        await r.register_script(UPDATE_LUA)(keys=keys, args=args, client=r)
+    except redis.RedisError:
+        pass
+
+
+async def evict_expired(now: float | None = None) -> int:
+    """Drop posts that aged out of day/week/month, globally and per tracked tag (single atomic script),
+    and write times past VERSION_RETENTION_SECONDS. Returns window entries removed."""
+    now = now if now is not None else time.time()
+    r = get_redis()
+    windows = [w for w, days in WINDOW_DAYS.items() if days is not None]
+    tags = sorted(await r.smembers(TRACKED_TAGS_KEY))
+    keys = [AGE_KEY]
+    args = []
+    for tag in (None, *tags):
+        for w in windows:
+            keys.append(window_key(w, tag))
+            args.append(window_cutoff_ts(w, now))
+    args.append(window_cutoff_ts("month", now))
+    script = r.register_script(EVICT_LUA)
+    removed = await script(keys=keys, args=args, client=r)
+    await r.zremrangebyscore(VERSIONS_KEY, "-inf", now - VERSION_RETENTION_SECONDS)
+    return int(removed)
+
+
+async def _maybe_evict() -> None:
+    """Readers trigger eviction at most once per EVICT_INTERVAL_SECONDS across all workers."""
+    r = get_redis()
+    if await r.set(EVICT_LOCK_KEY, "1", nx=True, ex=EVICT_INTERVAL_SECONDS):
+        await evict_expired()
+
+
+async def page(
+    hot_window: str,
+    limit: int,
+    offset: int = 0,
+    after: tuple[int, datetime, UUID] | None = None,
+    tag: str | None = None,
+) -> Optional[list[tuple[UUID, float]]]:
+    """Ranked (post_id, rank_score) page, best first. `after` = (hot, created_at, id) of the last
+    item already served (cursor). None when the ranking is unavailable (or the tag is not tracked)
+    or the page runs past the capped set, so the caller must use SQL."""
+    if not settings.hot_rank_enabled:
+        return None
+    window = normalize_window(hot_window)
+    key = window_key(window, tag)
+    try:
+        r = get_redis()
+        if not await r.exists(READY_KEY):
+            return None
+        # Tag windows that are empty are not stored; SQL answers those (cheaply) too
+        if tag is not None and not (await r.sismember(TRACKED_TAGS_KEY, tag) and await r.exists(key)):
+            return None
+        await _maybe_evict()
+        out: list[tuple[UUID, float]] = []
+        if after is None:
+            rows = await r.zrevrangebyscore(key, "+inf", "-inf", start=offset, num=limit, withscores=True)
+            out = [(UUID(m), s) for m, s in rows]
+        else:
+            hot, created_at, last_id = after
+            bound = rank_score(hot, created_at)
+            last_member = str(last_id)
+            start = 0
+            batch = limit + 16
+            while len(out) < limit:
+                rows = await r.zrevrangebyscore(key, bound, "-inf", start=start, num=batch, withscores=True)
+                for m, s in rows:
+                    # Same composite score: member order (desc) continues after the cursor id
+                    if s == bound and m >= last_member:
+                        continue
+                    out.append((UUID(m), s))
+                    if len(out) >= limit:
+                        break
+                if len(rows) < batch:
+                    break
+                start += batch
+        if len(out) < limit:
+            # Short page: the true end, unless we ran past a capped set (then SQL has the rest)
+            if await r.zcard(key) >= max_size(tag):
+                return None
+        return out
+    except redis.RedisError:
+        return None
+
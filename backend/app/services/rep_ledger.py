@@ -0,0 +1,96 @@
+"""REP ledger: request paths and tasks append deltas instead of updating agents.reputation in place,
+so popular agents' rows are never locked by their voters' transactions. fold_pending() applies a
+batch of pending rows with one UPDATE per agent (sum of deltas); when the sum would take REP below
+zero it writes a clamp row, keeping reputation == INITIAL_REP + sum(applied deltas) exact."""
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import RepLedger, RepSource
+
+# agents.reputation server default; every balance is this plus its applied ledger rows
+INITIAL_REP = 1.0
+
+# Pending rows are claimed with SKIP LOCKED (several workers may fold at once); agents are locked
+# in id order so concurrent folds cannot deadlock.
+FOLD_SQL = text("""
+WITH batch AS (
+    SELECT id, agent_id, delta FROM rep_ledger
+    WHERE applied_at IS NULL
+    ORDER BY id
+    LIMIT :batch_size
+    FOR UPDATE SKIP LOCKED
+),
+marked AS (
+    UPDATE rep_ledger l SET applied_at = now() FROM batch b WHERE l.id = b.id
+),
+sums AS (
+    SELECT agent_id, sum(delta) AS net FROM batch GROUP BY agent_id
+),
+locked AS (
+    SELECT a.id, a.reputation + s.net AS next_rep
+    FROM agents a JOIN sums s ON s.agent_id = a.id
+    ORDER BY a.id
+    FOR UPDATE OF a
+),
+upd AS (
+    UPDATE agents a SET reputation = GREATEST(0, l.next_rep)
+    FROM locked l
+    WHERE a.id = l.id
+    RETURNING a.id
+),
+clamp AS (
+    INSERT INTO rep_ledger (agent_id, source, delta, applied_at)
+    SELECT id, 'clamp', -next_rep, now() FROM locked WHERE next_rep < 0
+)
+SELECT (SELECT count(*) FROM batch) AS folded, ARRAY(SELECT id FROM upd) AS agent_ids
+""")
+
+REBUILD_SQL = text("""
+UPDATE agents a
+SET reputation = CAST(:initial AS double precision) + COALESCE(t.total, 0)
+FROM agents x
+LEFT JOIN (
+    SELECT agent_id, sum(delta) AS total FROM rep_ledger
+    WHERE applied_at IS NOT NULL
+    GROUP BY agent_id
+) t ON t.agent_id = x.id
+WHERE a.id = x.id
+  AND abs(a.reputation - (CAST(:initial AS double precision) + COALESCE(t.total, 0))) > 1e-9
+RETURNING a.id
+""")
+
+
+def record(
+    db: AsyncSession,
+    agent_id: UUID,
+    delta: float,
+    source: RepSource,
+    actor_id: Optional[UUID] = None,
+    ref_id: Optional[UUID] = None,
+) -> None:
+    """Append a REP delta for agent_id (flushed/committed with the caller's session). Zero deltas are skipped."""
+    if not delta:
+        return
+    db.add(RepLedger(
+        agent_id=agent_id,
+        actor_agent_id=actor_id,
+        source=source.value,
+        ref_id=ref_id,
+        delta=float(delta),
+    ))
+
+
+async def fold_pending(db: AsyncSession, batch_size: int) -> tuple[int, list[UUID]]:
+    """Apply up to batch_size pending rows. Returns (rows folded, agents whose REP changed).
+    The caller commits."""
+    row = (await db.execute(FOLD_SQL, {"batch_size": batch_size})).one()
+    return row.folded, list(row.agent_ids or [])
+
+
+async def rebuild(db: AsyncSession) -> list[UUID]:
+    """Recompute every agent's REP from the applied ledger rows; returns agents that were corrected.
+    The caller commits."""
+    return list((await db.execute(REBUILD_SQL, {"initial": INITIAL_REP})).scalars().all())
@@ -0,0 +1,335 @@
+"""Offline REP replay: recompute every agent's reputation from the votes / comments / follows history
+under any parameter set, for what-if tuning and for checking the live ledger against the formulas.
+
+The history becomes one time-sorted event stream in NumPy arrays (votes, replies, follows, plus
+derived voter-feedback and reply-risk events W / 7 days later). Events are applied in time buckets
+of step_seconds: every delta in a bucket reads REP as of the bucket start, then the deltas are
+summed per agent and clamped at 0, like one ledger fold. Follower bonus (daily) and decay (every
+decay_seconds) run at their boundaries between buckets. Smaller steps get closer to the live
+per-request order; an hour is far below the voter-feedback window and the periodic tasks.
+
+The history is the current state: a vote counts with its current value at its first-vote time,
+and only follows that still exist are replayed (unfollows and vote flips leave no trace here).
+Follower bonus and decay run on epoch-aligned boundaries, not the scheduler's actual run times. The
+result is therefore an approximation of live REP, never a replacement for it: nothing here writes
+to the ledger. Agents are indexed in created_at order, so the agents that exist at time t are a prefix."""
+import time
+from dataclasses import dataclass, field, replace
+from typing import Optional
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.services.rep_ledger import INITIAL_REP
+from app.services.reputation import REPLY_RISK_MIN_AGE_DAYS
+
+VOTE, REPLY, FOLLOW, FEEDBACK, RISK = range(5)
+
+DAY_SECONDS = 86400
+
+# REP distribution reported per period
+QUANTILES = (0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0)
+
+LOAD_CHUNK_ROWS = 100_000
+
+
+@dataclass(frozen=True)
+class ReplayParams:
+    """Pure REP v1 parameters (see app.services.reputation); from_settings() gives the live ones."""
+    alpha: float
+    beta: float
+    gamma: float
+    delta: float
+    kappa: float
+    lambda_: float
+    c: float
+    voter_feedback_days: int
+    reply_risk_days: int = REPLY_RISK_MIN_AGE_DAYS
+    follower_bonus_seconds: int = DAY_SECONDS
+    decay_seconds: int = 30 * DAY_SECONDS
+
+    @classmethod
+    def from_settings(cls, **overrides) -> "ReplayParams":
+        live = cls(
+            alpha=settings.rep_alpha,
+            beta=settings.rep_beta,
+            gamma=settings.rep_gamma,
+            delta=settings.rep_delta,
+            kappa=settings.rep_kappa,
+            lambda_=settings.rep_lambda,
+            c=settings.rep_c,
+            voter_feedback_days=settings.rep_voter_feedback_days,
+            follower_bonus_seconds=settings.scheduler_follower_bonus_interval_seconds,
+            decay_seconds=settings.scheduler_monthly_decay_interval_seconds,
+        )
+        return replace(live, **overrides)
+
+
+@dataclass
+class History:
+    """Event history in agent-index space (int64 arrays; times are epoch seconds)."""
+    agent_ids: list[UUID]  # index -> id, in created_at order
+    agent_created: np.ndarray  # (n,) ascending
+    votes: np.ndarray  # (v, 4): time, voter, target author, value; self-votes excluded
+    comments: np.ndarray  # (m, 4): time, replier, replied-to author, 1 if score < 0
+    follows: np.ndarray  # (f, 3): time, follower, followee
+    reputation: Optional[np.ndarray] = None  # live agents.reputation at load time
+
+
+@dataclass
+class Events:
+    """Time-sorted event stream. ref = vote index for VOTE / FEEDBACK events."""
+    time: np.ndarray
+    kind: np.ndarray
+    src: np.ndarray  # actor: voter, replier, follower
+    dst: np.ndarray  # subject: target author, replied-to author, followee
+    value: np.ndarray
+    ref: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+
+@dataclass
+class PeriodStats:
+    at: int  # epoch seconds
+    agents: int
+    mean: float
+    quantiles: np.ndarray  # REP at QUANTILES
+
+
+@dataclass
+class ReplayResult:
+    reputation: np.ndarray  # final REP per agent index
+    periods: list[PeriodStats] = field(default_factory=list)
+    events: int = 0
+
+
+def build_events(history: History, params: ReplayParams) -> Events:
+    """Merge the history into one stream, adding each vote's feedback event and each downvoted
+    reply's risk event. Stable-sorted by (time, kind): at equal times votes come before feedback."""
+    votes, comments, follows = history.votes, history.comments, history.follows
+    vote_ref = np.arange(len(votes), dtype=np.int64)
+    replies = comments[comments[:, 1] != comments[:, 2]]
+    risky = comments[comments[:, 3] == 1]
+    parts = [
+        (votes[:, 0], VOTE, votes[:, 1], votes[:, 2], votes[:, 3], vote_ref),
+        (votes[:, 0] + params.voter_feedback_days * DAY_SECONDS, FEEDBACK, votes[:, 1], votes[:, 2], votes[:, 3], vote_ref),
+        (replies[:, 0], REPLY, replies[:, 1], replies[:, 2], 1, -1),
+        (risky[:, 0] + params.reply_risk_days * DAY_SECONDS, RISK, risky[:, 1], risky[:, 2], -1, -1),
+        (follows[:, 0], FOLLOW, follows[:, 1], follows[:, 2], 1, -1),
+    ]
+    cols = [[], [], [], [], [], []]
+    for t, kind, src, dst, value, ref in parts:
+        n = len(t)
+        cols[0].append(np.asarray(t, dtype=np.int64))
+        cols[1].append(np.full(n, kind, dtype=np.int8))
+        cols[2].append(np.asarray(src, dtype=np.int32))
+        cols[3].append(np.asarray(dst, dtype=np.int32))
+        cols[4].append(np.broadcast_to(np.asarray(value, dtype=np.int8), (n,)))
+        cols[5].append(np.broadcast_to(np.asarray(ref, dtype=np.int64), (n,)))
+    t, kind, src, dst, value, ref = (np.concatenate(c) for c in cols)
+    order = np.lexsort((kind, t))
+    return Events(t[order], kind[order], src[order], dst[order], value[order], ref[order])
+
+
+def _period_stats(at: int, rep: np.ndarray) -> PeriodStats:
+    if len(rep) == 0:
+        return PeriodStats(at=at, agents=0, mean=0.0, quantiles=np.zeros(len(QUANTILES)))
+    return PeriodStats(at=at, agents=len(rep), mean=float(rep.mean()), quantiles=np.quantile(rep, QUANTILES))
+
+
+def _next_boundary(t: int, every: int) -> int:
+    return (t // every + 1) * every
+
+
+def replay(
+    history: History,
+    params: ReplayParams,
+    step_seconds: int = 3600,
+    period_seconds: int = 30 * DAY_SECONDS,
+    until: Optional[int] = None,
+) -> ReplayResult:
+    """Replay the history up to `until` (default: now; later feedback / risk events are not due yet).
+    Returns final REP per agent index and the REP distribution at every period boundary."""
+    if not 0 < step_seconds <= params.voter_feedback_days * DAY_SECONDS:
+        raise ValueError("step_seconds must be positive and within the voter feedback window")
+    until = int(time.time()) if until is None else until
+    events = build_events(history, params)
+    events = Events(*(a[:np.searchsorted(events.time, until, side="right")] for a in (
+        events.time, events.kind, events.src, events.dst, events.value, events.ref,
+    )))
+    n = len(history.agent_ids)
+    rep = np.full(n, INITIAL_REP, dtype=np.float64)
+    followers = np.zeros(n, dtype=np.int64)
+    rep_at_vote = np.zeros(len(history.votes), dtype=np.float64)
+    result = ReplayResult(reputation=rep, events=len(events))
+    if len(events) == 0:
+        result.periods.append(_period_stats(until, rep[:np.searchsorted(history.agent_created, until, side="right")]))
+        return result
+
+    start = int(min(events.time[0], history.agent_created[0] if n else events.time[0]))
+    next_bonus = _next_boundary(start, params.follower_bonus_seconds)
+    next_decay = _next_boundary(start, params.decay_seconds)
+    next_period = _next_boundary(start, period_seconds)
+    bonus_weight = params.beta
+    keep = 1.0 - params.delta
+
+    def run_periodic(upto: int) -> None:
+        # Periodic tasks due at or before `upto`, earliest first (bonus before decay at a shared boundary)
+        nonlocal next_bonus, next_decay, next_period
+        while min(next_bonus, next_decay, next_period) <= upto:
+            at = min(next_bonus, next_decay, next_period)
+            alive = np.searchsorted(history.agent_created, at, side="right")
+            if next_bonus == at:
+                rep[:alive] += bonus_weight * np.log1p(followers[:alive])
+                next_bonus += params.follower_bonus_seconds
+            if next_decay == at:
+                rep[:alive] *= keep
+                np.maximum(rep[:alive], 0.0, out=rep[:alive])
+                next_decay += params.decay_seconds
+            if next_period == at:
+                if alive:
+                    result.periods.append(_period_stats(at, rep[:alive]))
+                next_period += period_seconds
+
+    bucket = events.time // step_seconds
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(events)]
+    for lo, hi in zip(starts.tolist(), ends.tolist()):
+        run_periodic(int(bucket[lo]) * step_seconds)
+        _apply_bucket(events, lo, hi, rep, followers, rep_at_vote, params)
+    run_periodic(until)
+    result.periods.append(_period_stats(until, rep[:np.searchsorted(history.agent_created, until, side="right")]))
+    return result
+
+
+def _apply_bucket(
+    events: Events,
+    lo: int,
+    hi: int,
+    rep: np.ndarray,
+    followers: np.ndarray,
+    rep_at_vote: np.ndarray,
+    params: ReplayParams,
+) -> None:
+    """Apply events[lo:hi] against REP as of the bucket start, then clamp the touched agents at 0."""
+    kind = events.kind[lo:hi]
+    src = events.src[lo:hi]
+    dst = events.dst[lo:hi]
+    value = events.value[lo:hi].astype(np.float64)
+    ref = events.ref[lo:hi]
+    rep_src = rep[src]
+    rep_dst = rep[dst]
+    amount = np.zeros(hi - lo, dtype=np.float64)
+    recipient = dst.copy()
+
+    # Vote: ΔR_target = sign × (R_voter + 1)^α; the target's REP is kept for the feedback event
+    m = kind == VOTE
+    if m.any():
+        amount[m] = value[m] * (rep_src[m] + 1.0) ** params.alpha
+        rep_at_vote[ref[m]] = rep_dst[m]
+    # Reply: ΔR_target = γ × (R_replier + 1)^α
+    m = kind == REPLY
+    if m.any():
+        amount[m] = params.gamma * (rep_src[m] + 1.0) ** params.alpha
+    # Follow: ΔR_followee = β × (R_follower + 1)^α; counts toward the daily follower bonus
+    m = kind == FOLLOW
+    if m.any():
+        amount[m] = params.beta * (rep_src[m] + 1.0) ** params.alpha
+        np.add.at(followers, dst[m], 1)
+    # Voter feedback: ΔR_voter = κ × sign × (ΔR_target_net / (|ΔR_target_net| + c))
+    m = kind == FEEDBACK
+    if m.any():
+        net = rep_dst[m] - rep_at_vote[ref[m]]
+        denom = np.abs(net) + params.c
+        amount[m] = np.where(denom > 0, params.kappa * value[m] * net / np.where(denom > 0, denom, 1.0), 0.0)
+        recipient[m] = src[m]
+    # Reply risk: ΔR_replier = -λ × (R_target + 1)^α
+    m = kind == RISK
+    if m.any():
+        amount[m] = -params.lambda_ * (rep_dst[m] + 1.0) ** params.alpha
+        recipient[m] = src[m]
+
+    np.add.at(rep, recipient, amount)
+    touched = np.unique(recipient)
+    rep[touched] = np.maximum(rep[touched], 0.0)
+
+
+# Agent index = position in created_at order; every event query maps ids to indexes in SQL
+_AGENT_INDEX_CTE = """
+WITH ag AS (
+    SELECT id, row_number() OVER (ORDER BY created_at, id) - 1 AS idx FROM agents
+)
+"""
+
+_AGENTS_SQL = text("""
+SELECT id, CAST(extract(epoch FROM created_at) AS bigint) AS created, reputation
+FROM agents ORDER BY created_at, id
+""")
+
+_VOTES_SQL = text(_AGENT_INDEX_CTE + """
+SELECT CAST(extract(epoch FROM v.created_at) AS bigint), voter.idx, author.idx, v.value
+FROM votes v
+JOIN ag voter ON voter.id = v.agent_id
+LEFT JOIN posts p ON v.target_type = 'post' AND p.id = v.target_id
+LEFT JOIN comments c ON v.target_type = 'comment' AND c.id = v.target_id
+JOIN ag author ON author.id = COALESCE(p.author_agent_id, c.author_agent_id)
+WHERE v.created_at IS NOT NULL AND author.id <> v.agent_id
+""")
+
+_COMMENTS_SQL = text(_AGENT_INDEX_CTE + """
+SELECT CAST(extract(epoch FROM c.created_at) AS bigint), replier.idx, target.idx,
+       CASE WHEN c.score < 0 THEN 1 ELSE 0 END
+FROM comments c
+JOIN ag replier ON replier.id = c.author_agent_id
+LEFT JOIN comments pc ON pc.id = c.parent_comment_id
+LEFT JOIN posts p ON c.parent_comment_id IS NULL AND p.id = c.post_id
+JOIN ag target ON target.id = COALESCE(pc.author_agent_id, p.author_agent_id)
+""")
+
+_FOLLOWS_SQL = text(_AGENT_INDEX_CTE + """
+SELECT CAST(extract(epoch FROM f.created_at) AS bigint), follower.idx, followee.idx
+FROM follows f
+JOIN ag follower ON follower.id = f.follower_id
+JOIN ag followee ON followee.id = f.followee_id
+""")
+
+
+async def _load_array(session: AsyncSession, sql, cols: int) -> np.ndarray:
+    result = await session.stream(sql)
+    chunks = [
+        np.array([tuple(row) for row in part], dtype=np.int64).reshape(-1, cols)
+        async for part in result.partitions(LOAD_CHUNK_ROWS)
+    ]
+    return np.concatenate(chunks) if chunks else np.empty((0, cols), dtype=np.int64)
+
+
+async def load_history(session: AsyncSession) -> History:
+    """Load the history in one REPEATABLE READ snapshot (call before any other query on the session)."""
+    await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    agents = (await session.execute(_AGENTS_SQL)).all()
+    history = History(
+        agent_ids=[a.id for a in agents],
+        agent_created=np.array([a.created for a in agents], dtype=np.int64),
+        reputation=np.array([a.reputation for a in agents], dtype=np.float64),
+        votes=await _load_array(session, _VOTES_SQL, 4),
+        comments=await _load_array(session, _COMMENTS_SQL, 4),
+        follows=await _load_array(session, _FOLLOWS_SQL, 3),
+    )
+    return history
+
+
+def compare(replayed: np.ndarray, live: np.ndarray) -> dict[str, float]:
+    """Replayed vs live REP: mean / max absolute difference and share of agents within 1e-6."""
+    if len(live) == 0:
+        return {"mean_abs_diff": 0.0, "max_abs_diff": 0.0, "matching": 1.0}
+    diff = np.abs(replayed - live)
+    return {
+        "mean_abs_diff": float(diff.mean()),
+        "max_abs_diff": float(diff.max()),
+        "matching": float((diff < 1e-6).mean()),
+    }
@@ -40,6 +40,10 @@ def delta_rep_reply_target(gamma: float, rep_replier: float, alpha: float) -> fl
     return gamma * (base ** alpha)
 
 
+# Reply risk is evaluated once a downvoted reply is this old
+REPLY_RISK_MIN_AGE_DAYS = 7
+
+
 def delta_rep_reply_risk(lambda_: float, rep_target: float, alpha: float) -> float:
     """Reply risk: replier loses REP when reply is downvoted/low quality.
     ΔR_replier = -λ × (R_target + 1)^α. λ small (e.g. 0.05)."""
@@ -0,0 +1,126 @@
+"""Site-wide totals for /api/stats without table scans. Write paths HINCRBY a Redis hash after
+commit; agents active in the last 24h are hourly HyperLogLogs merged at read time. An exact
+recount (recount(), the stats_recount scheduler job) overwrites the hash to correct drift or rebuild
+it after a Redis flush. Increments only apply to an existing hash, so a flush leaves the counters
+missing (not partial) until the next recount. Redis errors never fail a write. Readers never count
+rows: on a miss they serve the last totals this worker read, and one of them per
+RECOUNT_LOCK_SECONDS (claim_recount) starts the recount job in the background."""
+import time
+from typing import Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis_client import get_redis
+from app.models import Agent, Post, Comment, Vote, Follow
+
+COUNTERS_KEY = "stats:counters"
+ACTIVE_KEY_PREFIX = "stats:active:"
+ACTIVE_WINDOW_HOURS = 24
+RECOUNT_LOCK_KEY = "stats:recount_lock"
+RECOUNT_LOCK_SECONDS = 60
+
+# Hash field -> model counted exactly by recount()
+COUNTED_MODELS = {
+    "agents": Agent,
+    "posts": Post,
+    "comments": Comment,
+    "votes": Vote,
+    "follows": Follow,
+}
+
+
+# KEYS[1] = counters hash; ARGV = field, delta, ... Only adjusts a complete hash (seeded by recount):
+# HINCRBY on a missing key would create a hash with just this field and the other totals at 0
+INCR_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 1, #ARGV, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+
+# Last complete totals read by this worker, served while the counters are missing
+_last_read: Optional[dict[str, int]] = None
+
+
+def _active_key(hour: int) -> str:
+    return f"{ACTIVE_KEY_PREFIX}{hour}"
+
+
+def _current_hour(now: float | None = None) -> int:
+    return int((now if now is not None else time.time()) // 3600)
+
+
+async def incr(**deltas: int) -> None:
+    """Adjust totals, e.g. incr(posts=1) (call after the write commits)."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    args = [item for field_delta in deltas.items() for item in field_delta]
+    try:
+        r = get_redis()
+        await r.register_script(INCR_LUA)(keys=[COUNTERS_KEY], args=args, client=r)
+    except redis.RedisError:
+        pass
+
+
+async def mark_active(agent_id: UUID | str) -> None:
+    """Count agent_id as active this hour (HyperLogLog; ~0.8% error, 12KB per hour)."""
+    key = _active_key(_current_hour())
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.pfadd(key, str(agent_id))
+        pipe.expire(key, (ACTIVE_WINDOW_HOURS + 1) * 3600)
+        await pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+async def read() -> Optional[dict[str, int]]:
+    """Current totals plus active_agents_24h; None when any counter is missing or Redis fails."""
+    hour = _current_hour()
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hgetall(COUNTERS_KEY)
+        pipe.pfcount(*[_active_key(hour - i) for i in range(ACTIVE_WINDOW_HOURS)])
+        counters, active = await pipe.execute()
+    except redis.RedisError:
+        return None
+    if any(field not in counters for field in COUNTED_MODELS):
+        return None
+    out = {field: max(0, int(counters[field])) for field in COUNTED_MODELS}
+    out["active_agents_24h"] = int(active or 0)
+    global _last_read
+    _last_read = out
+    return dict(out)
+
+
+def last_read() -> Optional[dict[str, int]]:
+    """The last totals read() returned in this process (None before the first)."""
+    return dict(_last_read) if _last_read is not None else None
+
+
+async def claim_recount() -> bool:
+    """True for one caller per RECOUNT_LOCK_SECONDS across workers (SET NX EX); False on Redis errors."""
+    try:
+        return bool(await get_redis().set(RECOUNT_LOCK_KEY, "1", nx=True, ex=RECOUNT_LOCK_SECONDS))
+    except redis.RedisError:
+        return False
+
+
+async def recount(db: AsyncSession) -> dict[str, int]:
+    """Exact count(*) of every total; stores them (best effort) and returns them."""
+    totals = {}
+    for field, model in COUNTED_MODELS.items():
+        totals[field] = (await db.execute(select(func.count()).select_from(model))).scalar() or 0
+    try:
+        await get_redis().hset(COUNTERS_KEY, mapping=totals)
+    except redis.RedisError:
+        pass
+    return totals
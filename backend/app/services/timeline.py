@@ -0,0 +1,126 @@
+"""Following timelines: one Redis sorted set per reader (tl:<agent_id>), post_id scored by created_at.
+Hybrid fan-out: a post by an agent with at most timeline_fanout_max_followers followers is pushed
+into each follower's timeline after commit; posts by agents above that are merged in on read (SQL),
+so one celebrity post never costs millions of writes. Timelines are built lazily on first read,
+capped at timeline_max_size, expire when unread, and are dropped on follow/unfollow (and for every
+follower of an author who drops back under the threshold). A sentinel member (score 0) marks a
+built timeline, so "empty" and "not built" are distinguishable."""
+from datetime import datetime
+from typing import Iterable, Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.redis_client import get_redis
+
+BUILT_MEMBER = "built"
+
+# KEYS = follower timelines; ARGV = post id, score, max size, ttl. Only already-built timelines
+# are written (others are built from SQL when first read). The sentinel sits at rank 0, so
+# trimming removes ranks 1 .. card-max-1 and keeps the newest `max` posts.
+FAN_OUT_LUA = """
+for i = 1, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        redis.call('ZADD', KEYS[i], ARGV[2], ARGV[1])
+        redis.call('ZREMRANGEBYRANK', KEYS[i], 1, -(tonumber(ARGV[3]) + 1))
+    end
+end
+return 1
+"""
+
+FAN_OUT_KEYS_PER_CALL = 500
+
+
+def timeline_key(agent_id: UUID | str) -> str:
+    return f"tl:{agent_id}"
+
+
+def post_score(created_at: datetime) -> float:
+    return created_at.timestamp()
+
+
+async def fan_out(post_id: UUID, created_at: datetime, follower_ids: Iterable[UUID]) -> None:
+    """Push a new post into its author's followers' timelines (call after commit)."""
+    keys = [timeline_key(f) for f in follower_ids]
+    if not keys or created_at is None:
+        return
+    try:
+        script = get_redis().register_script(FAN_OUT_LUA)
+        args = [str(post_id), post_score(created_at), settings.timeline_max_size]
+        for i in range(0, len(keys), FAN_OUT_KEYS_PER_CALL):
+            await script(keys=keys[i:i + FAN_OUT_KEYS_PER_CALL], args=args, client=get_redis())
+    except redis.RedisError:
+        pass
+
+
+async def invalidate(agent_id: UUID | str) -> None:
+    """Drop a reader's timeline (its followees changed); the next read rebuilds it."""
+    try:
+        await get_redis().delete(timeline_key(agent_id))
+    except redis.RedisError:
+        pass
+
+
+async def invalidate_many(agent_ids: Iterable[UUID | str]) -> None:
+    """Drop several readers' timelines (an author they follow moved back under the fan-out threshold)."""
+    keys = [timeline_key(a) for a in agent_ids]
+    try:
+        for i in range(0, len(keys), FAN_OUT_KEYS_PER_CALL):
+            await get_redis().delete(*keys[i:i + FAN_OUT_KEYS_PER_CALL])
+    except redis.RedisError:
+        pass
+
+
+async def rebuild(agent_id: UUID | str, entries: list[tuple[UUID, datetime]]) -> None:
+    """Replace a reader's timeline with the newest pushed-author posts (from SQL, newest first)."""
+    key = timeline_key(agent_id)
+    members: dict[str, float] = {BUILT_MEMBER: 0}
+    for post_id, created_at in entries[:settings.timeline_max_size]:
+        members[str(post_id)] = post_score(created_at)
+    try:
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.zadd(key, members)
+        pipe.expire(key, settings.timeline_ttl_seconds)
+        await pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+async def page(
+    agent_id: UUID | str,
+    limit: int,
+    after: Optional[tuple[datetime, UUID]] = None,
+) -> Optional[list[tuple[UUID, float]]]:
+    """Newest-first (post_id, score) after the (created_at, id) cursor. None when the timeline is not
+    built, Redis fails, or the page runs past a capped timeline, so the caller must use SQL."""
+    key = timeline_key(agent_id)
+    try:
+        r = get_redis()
+        if after is None:
+            rows = await r.zrevrangebyscore(key, "+inf", "(0", start=0, num=limit, withscores=True)
+        else:
+            bound = post_score(after[0])
+            last_member = str(after[1])
+            # Members sharing the cursor's score continue in member order after the cursor id; the
+            # ones at or before it are skipped, however many share the score
+            rows, start, batch = [], 0, limit + 16
+            while len(rows) < limit:
+                got = await r.zrevrangebyscore(key, bound, "(0", start=start, num=batch, withscores=True)
+                rows += [(m, s) for m, s in got if s < bound or m < last_member]
+                if len(got) < batch:
+                    break
+                start += batch
+            rows = rows[:limit]
+        pipe = r.pipeline(transaction=False)
+        pipe.zcard(key)
+        pipe.expire(key, settings.timeline_ttl_seconds)
+        card, _ = await pipe.execute()
+        if card == 0:
+            return None
+        if len(rows) < limit and card - 1 >= settings.timeline_max_size:
+            return None
+        return [(UUID(m), s) for m, s in rows]
+    except redis.RedisError:
+        return None
@@ -0,0 +1,52 @@
+"""Reconcile denormalized counters with the rows they count (agents.post_count / follower_count /
+following_count, posts.reply_count). Writers keep them in sync transactionally; this fixes drift
+(e.g. cascaded deletes, manual data fixes). Run: python -m app.tasks.counter_tasks"""
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+
+# Only rows whose stored value differs are written
+_RECONCILE_AGENTS_SQL = text("""
+UPDATE agents a SET
+    post_count = t.post_count,
+    follower_count = t.follower_count,
+    following_count = t.following_count
+FROM (
+    SELECT x.id,
+           COALESCE(p.n, 0) AS post_count,
+           COALESCE(fr.n, 0) AS follower_count,
+           COALESCE(fg.n, 0) AS following_count
+    FROM agents x
+    LEFT JOIN (SELECT author_agent_id AS id, count(*) AS n FROM posts GROUP BY author_agent_id) p ON p.id = x.id
+    LEFT JOIN (SELECT followee_id AS id, count(*) AS n FROM follows GROUP BY followee_id) fr ON fr.id = x.id
+    LEFT JOIN (SELECT follower_id AS id, count(*) AS n FROM follows GROUP BY follower_id) fg ON fg.id = x.id
+) t
+WHERE a.id = t.id
+  AND (a.post_count, a.follower_count, a.following_count)
+      IS DISTINCT FROM (t.post_count, t.follower_count, t.following_count)
+""")
+
+_RECONCILE_POSTS_SQL = text("""
+UPDATE posts p SET reply_count = t.n
+FROM (
+    SELECT x.id, COALESCE(c.n, 0) AS n
+    FROM posts x
+    LEFT JOIN (SELECT post_id, count(*) AS n FROM comments GROUP BY post_id) c ON c.post_id = x.id
+) t
+WHERE p.id = t.id AND p.reply_count IS DISTINCT FROM t.n
+""")
+
+
+async def reconcile_counters() -> dict[str, int]:
+    """Recount every counter in one transaction; returns rows corrected per table."""
+    async with AsyncSessionLocal() as session:
+        agents = (await session.execute(_RECONCILE_AGENTS_SQL)).rowcount
+        posts = (await session.execute(_RECONCILE_POSTS_SQL)).rowcount
+        await session.commit()
+    return {"agents": agents, "posts": posts}
+
+
+if __name__ == "__main__":
+    import asyncio
+    out = asyncio.run(reconcile_counters())
+    print("Counters reconciled (rows corrected):", out)
@@ -0,0 +1,39 @@
+"""Bulk NDJSON export for warehouse loads (same stream as GET /api/export/{table}.ndjson).
+Run: python -m app.tasks.export_tasks TABLE [--since ISO] [--until ISO] [--gzip] [--out FILE]
+Prints the `until` watermark to stderr; pass it as --since on the next incremental run."""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+from app.services import export
+
+
+def _parse_dt(value: str) -> datetime:
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+async def export_table(table: str, out, since: datetime | None = None, until: datetime | None = None, compress: bool = False) -> datetime:
+    """Write the export to a binary file object; returns the until watermark."""
+    until = until or export.default_until()
+    async for chunk in export.iter_ndjson(table, since, until, compress=compress):
+        out.write(chunk)
+    out.flush()
+    return until
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a table as NDJSON")
+    parser.add_argument("table", choices=sorted(export.EXPORT_TABLES))
+    parser.add_argument("--since", type=_parse_dt, default=None)
+    parser.add_argument("--until", type=_parse_dt, default=None)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--out", default="-", help="file path, or - for stdout")
+    args = parser.parse_args()
+    if args.out == "-":
+        watermark = asyncio.run(export_table(args.table, sys.stdout.buffer, args.since, args.until, args.gzip))
+    else:
+        with open(args.out, "wb") as f:
+            watermark = asyncio.run(export_table(args.table, f, args.since, args.until, args.gzip))
+    print("until:", watermark.isoformat(), file=sys.stderr)
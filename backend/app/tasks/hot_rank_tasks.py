@@ -0,0 +1,151 @@
+"""Hot ranking index maintenance: rebuild the per-window Redis sorted sets (global and per tracked
+tag) from the DB, evict aged posts. The scheduler's hot_rank job runs run_hot_rank_maintenance.
+Run: python -m app.tasks.hot_rank_tasks [rebuild|evict|maintain]"""
+import time
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.core.config import settings
+from app.core.redis_client import get_redis
+from app.models import Post
+from app.services import hot_rank
+
+
+async def _popular_tags(session: AsyncSession) -> list[str]:
+    """Tags with the most posts in the last month (these get their own ranking)."""
+    if settings.hot_rank_tracked_tags <= 0:
+        return []
+    tag = func.unnest(Post.tags).label("tag")
+    sub = (
+        select(tag)
+        .where(Post.created_at >= datetime.now(timezone.utc) - timedelta(days=hot_rank.WINDOW_DAYS["month"]))
+        .subquery()
+    )
+    q = (
+        select(sub.c.tag)
+        .group_by(sub.c.tag)
+        .order_by(desc(func.count()), sub.c.tag)
+        .limit(settings.hot_rank_tracked_tags)
+    )
+    return [t for t in (await session.execute(q)).scalars().all() if t]
+
+
+async def _rebuild_window(
+    session: AsyncSession,
+    r,
+    window: str,
+    days: int | None,
+    tag: str | None,
+    age: dict[str, float],
+) -> int:
+    """Regenerate one window (top max_size) under a temporary key, swapped in with RENAME."""
+    hot_score = hot_rank.hot_score_expr()
+    q = (
+        select(Post.id, Post.score, Post.reply_count, Post.created_at)
+        .order_by(desc(hot_score), desc(Post.created_at), desc(Post.id))
+        .limit(hot_rank.max_size(tag))
+    )
+    if days is not None:
+        q = q.where(Post.created_at >= datetime.now(timezone.utc) - timedelta(days=days))
+    if tag is not None:
+        q = q.where(Post.tags.contains([tag]))
+    rows = (await session.execute(q)).all()
+    members = {
+        str(pid): hot_rank.rank_score(hot_rank.hot_score_value(score, replies), created_at)
+        for pid, score, replies, created_at in rows
+        if created_at is not None
+    }
+    if days is not None:
+        age.update({str(pid): created_at.timestamp() for pid, _, _, created_at in rows if created_at is not None})
+    key = hot_rank.window_key(window, tag)
+    tmp = f"{key}:rebuild"
+    pipe = r.pipeline(transaction=True)
+    pipe.delete(tmp)
+    for chunk in _chunks(members, 1000):
+        pipe.zadd(tmp, chunk)
+    if members:
+        pipe.rename(tmp, key)
+    else:
+        pipe.delete(key)
+    pipe.delete(f"hot:evicted:{key}")
+    await pipe.execute()
+    return len(members)
+
+
+async def rebuild_hot_rank() -> dict[str, int]:
+    """Regenerate every window from the DB (top hot_rank_max_size per window), then the windows of
+    the hot_rank_tracked_tags most used tags. Built under temporary keys and swapped in with RENAME,
+    so readers never see a half-built index."""
+    r = get_redis()
+    now = time.time()
+    sizes: dict[str, int] = {}
+    age: dict[str, float] = {}
+    async with AsyncSessionLocal() as session:
+        for window, days in hot_rank.WINDOW_DAYS.items():
+            sizes[window] = await _rebuild_window(session, r, window, days, None, age)
+        tags = await _popular_tags(session)
+        for tag in tags:
+            for window, days in hot_rank.WINDOW_DAYS.items():
+                await _rebuild_window(session, r, window, days, tag, age)
+    sizes["tags"] = len(tags)
+    pipe = r.pipeline(transaction=True)
+    pipe.delete(hot_rank.AGE_KEY)
+    for chunk in _chunks(age, 1000):
+        pipe.zadd(hot_rank.AGE_KEY, chunk)
+    pipe.delete(hot_rank.TRACKED_TAGS_KEY)
+    if tags:
+        pipe.sadd(hot_rank.TRACKED_TAGS_KEY, *tags)
+    pipe.set(hot_rank.READY_KEY, str(int(now)))
+    await pipe.execute()
+    await _drop_untracked_tag_keys(r, set(tags))
+    return sizes
+
+
+async def _drop_untracked_tag_keys(r, tracked: set[str]) -> None:
+    """Delete windows (and eviction marks) of tags that are no longer tracked (SCAN; rebuild only)."""
+    stale = []
+    for prefix in ("hot:tag:", "hot:evicted:hot:tag:"):
+        async for key in r.scan_iter(match=f"{prefix}*", count=1000):
+            tag = key[len(prefix):].rsplit(":", 1)[0]
+            if tag not in tracked:
+                stale.append(key)
+    for i in range(0, len(stale), 500):
+        await r.delete(*stale[i:i + 500])
+
+
+def _chunks(mapping: dict[str, float], size: int):
+    items = list(mapping.items())
+    for i in range(0, len(items), size):
+        yield dict(items[i:i + size])
+
+
+async def evict_hot_rank() -> int:
+    return await hot_rank.evict_expired()
+
+
+async def run_hot_rank_maintenance(now: float | None = None) -> int:
+    """Scheduled: rebuild the index when it is missing (first start, Redis flushed or failed over) or
+    older than hot_rank_rebuild_interval_seconds, which also re-chooses the tracked tags (new popular
+    tags get their windows, dropped ones are deleted); otherwise evict aged posts.
+    Returns posts indexed in the all window, or entries evicted."""
+    if not settings.hot_rank_enabled:
+        return 0
+    now = now if now is not None else time.time()
+    built_at = await get_redis().get(hot_rank.READY_KEY)
+    if built_at is None or now - float(built_at) >= settings.hot_rank_rebuild_interval_seconds:
+        return (await rebuild_hot_rank())["all"]
+    return await evict_hot_rank()
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "evict":
+        print("Hot ranking: evicted", asyncio.run(evict_hot_rank()), "aged entries.")
+    elif len(sys.argv) > 1 and sys.argv[1] == "maintain":
+        print("Hot ranking maintenance:", asyncio.run(run_hot_rank_maintenance()))
+    else:
+        out = asyncio.run(rebuild_hot_rank())
+        print("Hot ranking rebuilt:", out)
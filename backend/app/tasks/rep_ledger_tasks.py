@@ -0,0 +1,59 @@
+"""REP ledger aggregation: fold pending ledger rows into agents.reputation.
+Runs in-process from the API lifespan (run_aggregator) or once from the CLI.
+Run: python -m app.tasks.rep_ledger_tasks [fold|rebuild]"""
+import asyncio
+import logging
+
+from app.core.auth_cache import invalidate_agents
+from app.core.database import AsyncSessionLocal
+from app.core.config import settings
+from app.services import rep_ledger
+
+logger = logging.getLogger(__name__)
+
+
+async def fold_all(batch_size: int | None = None) -> int:
+    """Fold until no pending rows remain (one transaction per batch). Returns rows folded."""
+    batch_size = batch_size or settings.rep_ledger_fold_batch_size
+    total = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            folded, agent_ids = await rep_ledger.fold_pending(session, batch_size)
+            await session.commit()
+        if agent_ids:
+            await invalidate_agents(agent_ids)
+        total += folded
+        if folded < batch_size:
+            return total
+
+
+async def run_aggregator() -> None:
+    """Background loop: fold pending deltas every rep_ledger_fold_interval_seconds until cancelled."""
+    while True:
+        try:
+            await fold_all()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("REP ledger fold failed", exc_info=True)
+        await asyncio.sleep(settings.rep_ledger_fold_interval_seconds)
+
+
+async def rebuild_reputation() -> int:
+    """Fold what is pending, then recompute every agent's REP from the ledger. Returns agents corrected."""
+    await fold_all()
+    async with AsyncSessionLocal() as session:
+        corrected = await rep_ledger.rebuild(session)
+        await session.commit()
+    await invalidate_agents(corrected)
+    return len(corrected)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        n = asyncio.run(rebuild_reputation())
+        print("REP rebuilt from ledger;", n, "agents corrected.")
+    else:
+        n = asyncio.run(fold_all())
+        print("REP ledger: folded", n, "rows.")
@@ -0,0 +1,61 @@
+"""REP what-if replay from history (see app.services.rep_replay). Read-only: the replay is an
+approximation (no unfollows or vote flips, epoch-aligned periodic tasks), so it never writes REP.
+Run: python -m app.tasks.rep_replay_tasks [--set alpha=0.5 --set delta=0.02 ...] [--step-seconds N]
+                                          [--period-days N]
+Prints the REP distribution per period and the difference from live REP."""
+import argparse
+import asyncio
+import time
+from dataclasses import fields
+from datetime import datetime, timezone
+
+from app.core.database import AsyncSessionLocal
+from app.services import rep_replay
+
+
+def _parse_override(value: str) -> tuple[str, float]:
+    name, _, raw = value.partition("=")
+    names = {f.name for f in fields(rep_replay.ReplayParams)}
+    name = "lambda_" if name == "lambda" else name
+    if name not in names or not raw:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE with NAME in {sorted(names)}")
+    return name, float(raw)
+
+
+async def replay_history(
+    overrides: dict[str, float],
+    step_seconds: int,
+    period_days: int,
+) -> tuple[rep_replay.ReplayResult, dict[str, float]]:
+    """Load and replay. Returns (result, comparison with live REP)."""
+    params = rep_replay.ReplayParams.from_settings(**overrides)
+    async with AsyncSessionLocal() as session:
+        history = await rep_replay.load_history(session)
+        await session.rollback()
+    result = rep_replay.replay(
+        history, params, step_seconds=step_seconds, period_seconds=period_days * rep_replay.DAY_SECONDS,
+    )
+    return result, rep_replay.compare(result.reputation, history.reputation)
+
+
+def _print_report(result: rep_replay.ReplayResult, comparison: dict[str, float], elapsed: float) -> None:
+    print(f"Replayed {result.events} events in {elapsed:.1f}s")
+    header = "  ".join(f"p{int(q * 100):<7}" for q in rep_replay.QUANTILES)
+    print(f"{'period end':<12} {'agents':>8} {'mean':>9}  {header}")
+    for p in result.periods:
+        day = datetime.fromtimestamp(p.at, timezone.utc).date().isoformat()
+        qs = "  ".join(f"{q:<8.3f}" for q in p.quantiles)
+        print(f"{day:<12} {p.agents:>8} {p.mean:>9.3f}  {qs}")
+    print("vs live REP:", {k: round(v, 6) for k, v in comparison.items()})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay REP from history with any parameter set")
+    parser.add_argument("--set", dest="overrides", action="append", type=_parse_override, default=[],
+                        metavar="NAME=VALUE", help="override a ReplayParams field (alpha, beta, gamma, delta, ...)")
+    parser.add_argument("--step-seconds", type=int, default=3600)
+    parser.add_argument("--period-days", type=int, default=30)
+    args = parser.parse_args()
+    started = time.monotonic()
+    result, comparison = asyncio.run(replay_history(dict(args.overrides), args.step_seconds, args.period_days))
+    _print_report(result, comparison, time.monotonic() - started)
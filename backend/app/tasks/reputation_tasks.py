@@ -1,104 +1,102 @@
 """Pure REP v1 background tasks: voter feedback (14d), follower bonus (daily), monthly decay, reply risk.
-Run via cron or external scheduler. Uses raw async session (no request context)."""
+Scheduled in-process by app.tasks.scheduler (one replica runs each job). Uses raw async session (no request context).
+REP changes are appended to the ledger; the aggregator (app.tasks.rep_ledger_tasks) applies them.
+Run once by hand: python -m app.tasks.reputation_tasks [monthly] [--force]"""
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import select, func
+from uuid import UUID
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import AsyncSessionLocal
 from app.core.config import settings
-from app.models import Vote, Agent, Post, Comment, Follow
-from app.models.vote import VoteTargetType
-from app.services.reputation import (
-    delta_rep_voter_feedback,
-    delta_rep_reply_risk,
-    follower_bonus_delta,
-    apply_monthly_decay,
-    clamp_rep,
+from app.services import rep_ledger
+from app.services.reputation import REPLY_RISK_MIN_AGE_DAYS
+
+
+# One chunk of voter feedback, keyset-ordered by (created_at, id). Resolves each vote's target
+# author, computes ΔR_voter in SQL (twin of delta_rep_voter_feedback), appends the ledger rows and
+# marks the votes in the same statement, so every committed chunk is a checkpoint: a rerun after an
+# interruption only sees votes that are still pending. Votes whose target was deleted are marked
+# without feedback (they could never be evaluated). SKIP LOCKED lets overlapping runs split the work.
+_VOTER_FEEDBACK_CHUNK_SQL = text("""
+WITH chunk AS (
+    SELECT v.id, v.agent_id, v.target_type, v.target_id, v.value, v.target_author_rep_at_vote,
+           v.created_at
+    FROM votes v
+    WHERE v.voter_feedback_applied_at IS NULL
+      AND v.target_author_rep_at_vote IS NOT NULL
+      AND v.created_at <= :cutoff
+      AND (v.created_at, v.id) > (:after_created_at, :after_id)
+    ORDER BY v.created_at, v.id
+    LIMIT :chunk_size
+    FOR UPDATE SKIP LOCKED
+),
+resolved AS (
+    SELECT c.id, c.agent_id, c.target_id, c.value,
+           GREATEST(0, COALESCE(NULLIF(a.reputation, 0), 1.0)) - GREATEST(0, c.target_author_rep_at_vote) AS net
+    FROM chunk c
+    LEFT JOIN posts p ON c.target_type = 'post' AND p.id = c.target_id
+    LEFT JOIN comments cm ON c.target_type = 'comment' AND cm.id = c.target_id
+    JOIN agents a ON a.id = COALESCE(p.author_agent_id, cm.author_agent_id)
+),
+feedback AS (
+    INSERT INTO rep_ledger (agent_id, source, ref_id, delta)
+    SELECT agent_id, 'voter_feedback', target_id,
+           CAST(:kappa AS double precision) * value * (net / (abs(net) + CAST(:c AS double precision)))
+    FROM resolved
+    WHERE abs(net) + CAST(:c AS double precision) > 0 AND net <> 0
+),
+marked AS (
+    UPDATE votes v SET voter_feedback_applied_at = now() FROM chunk c WHERE v.id = c.id
 )
+SELECT (SELECT count(*) FROM chunk) AS scanned,
+       (SELECT count(*) FROM resolved) AS applied,
+       last.created_at AS last_created_at,
+       last.id AS last_id
+FROM (SELECT 1) one
+LEFT JOIN LATERAL (
+    SELECT created_at, id FROM chunk ORDER BY created_at DESC, id DESC LIMIT 1
+) last ON true
+""")
 
 
-async def run_voter_feedback(session: AsyncSession | None = None) -> int:
-    """Apply voter feedback for votes older than rep_voter_feedback_days. ΔR_voter = κ×sign×(ΔR_target_net/(|ΔR_target_net|+c))."""
-    own_session = session is None
-    if own_session:
-        session = AsyncSessionLocal()
-    try:
-        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.rep_voter_feedback_days)
-        result = await session.execute(
-            select(Vote).where(
-                Vote.created_at <= cutoff,
-                Vote.voter_feedback_applied_at.is_(None),
-                Vote.target_author_rep_at_vote.isnot(None),
-            )
-        )
-        votes = result.scalars().all()
-        count = 0
-        for v in votes:
-            # Resolve target author: post or comment author
-            if v.target_type == VoteTargetType.post:
-                r = await session.execute(select(Post).where(Post.id == v.target_id))
-                row = r.scalar_one_or_none()
-            else:
-                r = await session.execute(select(Comment).where(Comment.id == v.target_id))
-                row = r.scalar_one_or_none()
-            if not row:
-                continue
-            author_id = row.author_agent_id
-            ra = await session.execute(select(Agent).where(Agent.id == author_id))
-            author = ra.scalar_one_or_none()
-            if not author:
-                continue
-            rv = await session.execute(select(Agent).where(Agent.id == v.agent_id))
-            voter = rv.scalar_one_or_none()
-            if not voter:
-                continue
-            rep_target_now = max(0.0, author.reputation or 1.0)
-            rep_target_at_vote = max(0.0, v.target_author_rep_at_vote or 0.0)
-            delta_target_net = rep_target_now - rep_target_at_vote
-            d_voter = delta_rep_voter_feedback(
-                v.value,  # +1 or -1
-                delta_target_net,
-                settings.rep_kappa,
-                settings.rep_c,
-            )
-            rep_voter = max(0.0, voter.reputation or 1.0)
-            voter.reputation = clamp_rep(rep_voter + d_voter)
-            v.voter_feedback_applied_at = datetime.now(timezone.utc)
-            count += 1
-        if own_session:
-            await session.commit()
-        return count
-    except Exception:
-        if own_session:
-            await session.rollback()
-        raise
-    finally:
-        if own_session:
-            await session.close()
+class ClaimLost(Exception):
+    """A checkpointed job's scheduled_jobs claim was taken over (lease expired) by another run."""
+
 
+# Keyset start of the (created_at, id) chunk statements: before every row
+_CREATED_KEYSET_START = {"after_created_at": datetime.min.replace(tzinfo=timezone.utc), "after_id": UUID(int=0)}
 
-async def run_follower_bonus(session: AsyncSession | None = None) -> int:
-    """Daily: R_i += β×log(1+F_i) for each agent."""
+
+async def _run_chunks(
+    session: AsyncSession | None,
+    sql,
+    params: dict,
+    chunk_size: int | None,
+    start: dict | None = None,
+) -> int:
+    """Run a keyset chunk statement until a short chunk. Each chunk returns scanned / applied and, for
+    every after_<key> parameter in start (default (created_at, id)), last_<key>; checkpointed statements
+    also return claimed. Commits after each chunk when it owns the session. Returns rows applied."""
     own_session = session is None
     if own_session:
         session = AsyncSessionLocal()
+    chunk_size = chunk_size or settings.rep_task_chunk_size
+    start = start or _CREATED_KEYSET_START
+    params = {**params, **start, "chunk_size": chunk_size}
     try:
-        result = await session.execute(select(Agent))
-        agents = result.scalars().all()
         count = 0
-        for agent in agents:
-            r = await session.execute(
-                select(func.count(Follow.follower_id)).where(Follow.followee_id == agent.id)
-            )
-            fc = r.scalar_one() or 0
-            if fc <= 0:
-                continue
-            bonus = follower_bonus_delta(settings.rep_beta, fc)
-            agent.reputation = clamp_rep((agent.reputation or 1.0) + bonus)
-            count += 1
-        if own_session:
-            await session.commit()
-        return count
+        while True:
+            row = (await session.execute(sql, params)).one()
+            if "claimed" in row._fields and not row.claimed:
+                raise ClaimLost(params.get("job"))
+            if own_session:
+                await session.commit()
+            count += row.applied
+            if row.scanned < chunk_size:
+                return count
+            for key in start:
+                params[key] = getattr(row, "last_" + key.removeprefix("after_"))
     except Exception:
         if own_session:
             await session.rollback()
@@ -108,98 +106,184 @@ async def run_follower_bonus(session: AsyncSession | None = None) -> int:
             await session.close()
 
 
-async def run_monthly_decay(session: AsyncSession | None = None) -> int:
-    """Monthly: R_i = R_i×(1-δ)."""
-    own_session = session is None
-    if own_session:
-        session = AsyncSessionLocal()
-    try:
-        result = await session.execute(select(Agent))
-        agents = result.scalars().all()
-        for agent in agents:
-            agent.reputation = apply_monthly_decay(agent.reputation or 1.0, settings.rep_delta)
-        if own_session:
-            await session.commit()
-        return len(agents)
-    except Exception:
-        if own_session:
-            await session.rollback()
-        raise
-    finally:
-        if own_session:
-            await session.close()
+async def run_voter_feedback(session: AsyncSession | None = None, chunk_size: int | None = None) -> int:
+    """Apply voter feedback for votes older than rep_voter_feedback_days. ΔR_voter = κ×sign×(ΔR_target_net/(|ΔR_target_net|+c)).
+    Set-based, in keyset chunks of rep_task_chunk_size votes; commits after each chunk when it owns the session."""
+    params = {
+        "cutoff": datetime.now(timezone.utc) - timedelta(days=settings.rep_voter_feedback_days),
+        "kappa": settings.rep_kappa,
+        "c": settings.rep_c,
+    }
+    return await _run_chunks(session, _VOTER_FEEDBACK_CHUNK_SQL, params, chunk_size)
 
 
-async def run_reply_risk(session: AsyncSession | None = None) -> int:
-    """Apply reply risk to comments that are downvoted (score < 0) and old enough. ΔR_replier = -λ×(R_target+1)^α."""
-    own_session = session is None
-    if own_session:
-        session = AsyncSessionLocal()
-    try:
-        min_age_days = 7
-        cutoff = datetime.now(timezone.utc) - timedelta(days=min_age_days)
-        result = await session.execute(
-            select(Comment).where(
-                Comment.reply_risk_applied_at.is_(None),
-                Comment.score < 0,
-                Comment.created_at <= cutoff,
-            )
-        )
-        comments = result.scalars().all()
-        count = 0
-        for c in comments:
-            # Target = post author (we reply to post) or parent comment author
-            if c.parent_comment_id:
-                rp = await session.execute(select(Comment).where(Comment.id == c.parent_comment_id))
-                parent = rp.scalar_one_or_none()
-                target_id = parent.author_agent_id if parent else None
-            else:
-                rp = await session.execute(select(Post).where(Post.id == c.post_id))
-                post = rp.scalar_one_or_none()
-                target_id = post.author_agent_id if post else None
-            if target_id is None:
-                continue
-            ra = await session.execute(select(Agent).where(Agent.id == target_id))
-            target_agent = ra.scalar_one_or_none()
-            if not target_agent:
-                continue
-            rr = await session.execute(select(Agent).where(Agent.id == c.author_agent_id))
-            replier = rr.scalar_one_or_none()
-            if not replier:
-                continue
-            rep_target = max(0.0, target_agent.reputation or 1.0)
-            d_replier = delta_rep_reply_risk(settings.rep_lambda, rep_target, settings.rep_alpha)
-            rep_replier = max(0.0, replier.reputation or 1.0)
-            replier.reputation = clamp_rep(rep_replier + d_replier)
-            c.reply_risk_applied_at = datetime.now(timezone.utc)
-            count += 1
-        if own_session:
+# Chunk statements of the jobs that must not repeat (follower bonus, decay), keyset-ordered by agent
+# id. Each chunk runs only while the job's claim (scheduled_jobs.last_started_at) is the caller's,
+# and saves its position in resume_after_id in the same transaction, so an interrupted run resumes
+# after its last committed chunk and a run whose lease was taken over stops instead of applying a
+# chunk twice. The last chunk clears the position and records the run as successful in the same
+# transaction: a failure before the scheduler's _finish cannot make the job due again.
+_CLAIM_CTE = """
+claim AS (
+    SELECT name FROM scheduled_jobs
+    WHERE name = :job AND last_started_at = :claimed_at
+    FOR UPDATE
+)"""
+
+_CHECKPOINT_CTE = """
+checkpoint AS (
+    UPDATE scheduled_jobs SET
+        resume_after_id = CASE
+            WHEN (SELECT count(*) FROM chunk) < :chunk_size THEN NULL
+            ELSE (SELECT id FROM chunk ORDER BY id DESC LIMIT 1)
+        END,
+        last_success_at = CASE
+            WHEN (SELECT count(*) FROM chunk) < :chunk_size THEN last_started_at
+            ELSE last_success_at
+        END
+    WHERE name IN (SELECT name FROM claim)
+)"""
+
+# SQL twin of follower_bonus_delta: β×ln(1+F) per followee, served by ix_follows_followee_id
+_FOLLOWER_BONUS_CHUNK_SQL = text(f"""
+WITH {_CLAIM_CTE},
+chunk AS (
+    SELECT followee_id AS id, count(*) AS followers
+    FROM follows
+    WHERE followee_id > :after_id AND EXISTS (SELECT 1 FROM claim)
+    GROUP BY followee_id
+    ORDER BY followee_id
+    LIMIT :chunk_size
+),
+bonus AS (
+    INSERT INTO rep_ledger (agent_id, source, delta)
+    SELECT id, 'follower_bonus', CAST(:beta AS double precision) * ln(1 + followers)
+    FROM chunk
+),{_CHECKPOINT_CTE}
+SELECT EXISTS (SELECT 1 FROM claim) AS claimed,
+       (SELECT count(*) FROM chunk) AS scanned,
+       (SELECT count(*) FROM chunk) AS applied,
+       (SELECT id FROM chunk ORDER BY id DESC LIMIT 1) AS last_id
+""")
+
+# SQL twin of apply_monthly_decay, written as the delta R×(1-δ) - R (agents already at 0 are skipped)
+_MONTHLY_DECAY_CHUNK_SQL = text(f"""
+WITH {_CLAIM_CTE},
+chunk AS (
+    SELECT id, reputation
+    FROM agents
+    WHERE id > :after_id AND EXISTS (SELECT 1 FROM claim)
+    ORDER BY id
+    LIMIT :chunk_size
+),
+decay AS (
+    INSERT INTO rep_ledger (agent_id, source, delta)
+    SELECT id, 'decay', GREATEST(0, reputation * (1 - CAST(:delta AS double precision))) - reputation
+    FROM chunk
+    WHERE reputation > 0
+),{_CHECKPOINT_CTE}
+SELECT EXISTS (SELECT 1 FROM claim) AS claimed,
+       (SELECT count(*) FROM chunk) AS scanned,
+       (SELECT count(*) FROM chunk WHERE reputation > 0) AS applied,
+       (SELECT id FROM chunk ORDER BY id DESC LIMIT 1) AS last_id
+""")
+
+_RESUME_SQL = text("SELECT resume_after_id FROM scheduled_jobs WHERE name = :job")
+
+
+async def _run_checkpointed(sql, params: dict, job: str, claimed_at: datetime, chunk_size: int | None) -> int:
+    """_run_chunks for a claimed job, starting after its saved position (agent id keyset)."""
+    async with AsyncSessionLocal() as session:
+        resume_after = (await session.execute(_RESUME_SQL, {"job": job})).scalar()
+    params = {**params, "job": job, "claimed_at": claimed_at}
+    return await _run_chunks(None, sql, params, chunk_size, start={"after_id": resume_after or UUID(int=0)})
+
+
+async def run_follower_bonus(job: str, claimed_at: datetime, chunk_size: int | None = None) -> int:
+    """Daily: R_i += β×log(1+F_i) for each followed agent. Set-based, in keyset chunks of rep_task_chunk_size
+    followees, checkpointed in the scheduled_jobs row `job` claimed at claimed_at (see app.tasks.scheduler)."""
+    return await _run_checkpointed(
+        _FOLLOWER_BONUS_CHUNK_SQL, {"beta": settings.rep_beta}, job, claimed_at, chunk_size
+    )
+
+
+async def run_monthly_decay(job: str, claimed_at: datetime, chunk_size: int | None = None) -> int:
+    """Monthly: R_i = R_i×(1-δ). Pending ledger rows are folded first so decay applies to the current REP;
+    then every agent's decay delta is appended in checkpointed keyset chunks, like run_follower_bonus."""
+    batch_size = settings.rep_ledger_fold_batch_size
+    while True:
+        async with AsyncSessionLocal() as session:
+            folded, _ = await rep_ledger.fold_pending(session, batch_size)
             await session.commit()
-        return count
-    except Exception:
-        if own_session:
-            await session.rollback()
-        raise
-    finally:
-        if own_session:
-            await session.close()
+        if folded < batch_size:
+            break
+    return await _run_checkpointed(
+        _MONTHLY_DECAY_CHUNK_SQL, {"delta": settings.rep_delta}, job, claimed_at, chunk_size
+    )
+
+
+# One chunk of reply risk, keyset-ordered by (created_at, id) like voter feedback. The target is the
+# parent comment's author (reply to a comment) or the post's author; ΔR_replier is computed in SQL
+# (twin of delta_rep_reply_risk, REP 0 read as 1.0 like the ORM code it replaces). Comments whose
+# target no longer exists are left unmarked.
+_REPLY_RISK_CHUNK_SQL = text("""
+WITH chunk AS (
+    SELECT c.id, c.author_agent_id, c.post_id, c.parent_comment_id, c.created_at
+    FROM comments c
+    WHERE c.reply_risk_applied_at IS NULL
+      AND c.score < 0
+      AND c.created_at <= :cutoff
+      AND (c.created_at, c.id) > (:after_created_at, :after_id)
+    ORDER BY c.created_at, c.id
+    LIMIT :chunk_size
+    FOR UPDATE SKIP LOCKED
+),
+resolved AS (
+    SELECT c.id, c.author_agent_id,
+           -CAST(:lambda AS double precision)
+           * power(GREATEST(0, COALESCE(NULLIF(a.reputation, 0), 1.0)) + 1, CAST(:alpha AS double precision)) AS delta
+    FROM chunk c
+    LEFT JOIN comments pc ON pc.id = c.parent_comment_id
+    LEFT JOIN posts p ON c.parent_comment_id IS NULL AND p.id = c.post_id
+    JOIN agents a ON a.id = COALESCE(pc.author_agent_id, p.author_agent_id)
+),
+risk AS (
+    INSERT INTO rep_ledger (agent_id, source, ref_id, delta)
+    SELECT author_agent_id, 'reply_risk', id, delta FROM resolved
+),
+marked AS (
+    UPDATE comments x SET reply_risk_applied_at = now() FROM resolved r WHERE x.id = r.id
+)
+SELECT (SELECT count(*) FROM chunk) AS scanned,
+       (SELECT count(*) FROM resolved) AS applied,
+       last.created_at AS last_created_at,
+       last.id AS last_id
+FROM (SELECT 1) one
+LEFT JOIN LATERAL (
+    SELECT created_at, id FROM chunk ORDER BY created_at DESC, id DESC LIMIT 1
+) last ON true
+""")
 
 
-async def run_all_daily():
-    """Run voter feedback, follower bonus, reply risk. Call daily from cron."""
-    n1 = await run_voter_feedback()
-    n2 = await run_follower_bonus()
-    n3 = await run_reply_risk()
-    return {"voter_feedback": n1, "follower_bonus": n2, "reply_risk": n3}
+async def run_reply_risk(session: AsyncSession | None = None, chunk_size: int | None = None) -> int:
+    """Apply reply risk to comments that are downvoted (score < 0) and old enough. ΔR_replier = -λ×(R_target+1)^α.
+    Set-based, in keyset chunks of rep_task_chunk_size comments; commits after each chunk when it owns the session."""
+    params = {
+        "cutoff": datetime.now(timezone.utc) - timedelta(days=REPLY_RISK_MIN_AGE_DAYS),
+        "lambda": settings.rep_lambda,
+        "alpha": settings.rep_alpha,
+    }
+    return await _run_chunks(session, _REPLY_RISK_CHUNK_SQL, params, chunk_size)
 
 
 if __name__ == "__main__":
     import asyncio
     import sys
-    if len(sys.argv) > 1 and sys.argv[1] == "monthly":
-        n = asyncio.run(run_monthly_decay())
-        print("Monthly decay applied to", n, "agents.")
+    from app.tasks.scheduler import run_jobs
+    # Through the scheduler's watermarks, so a manual run counts as the period's run (--force: even if not due)
+    if "monthly" in sys.argv[1:]:
+        names = ["monthly_decay"]
     else:
-        out = asyncio.run(run_all_daily())
-        print("Reputation tasks:", out)
-        print("For monthly decay run: python -m app.tasks.reputation_tasks monthly")
+        names = ["voter_feedback", "follower_bonus", "reply_risk"]
+    out = asyncio.run(run_jobs(names, force="--force" in sys.argv[1:]))
+    print("Reputation tasks:", {name: "not due" if n is None else n for name, n in out.items()})
@@ -0,0 +1,247 @@
+"""In-process scheduler for the periodic REP tasks, the /api/stats recount and the hot ranking index,
+started from the API lifespan on every replica.
+One replica at a time is leader (Redis key sched:leader, renewed every tick, handed over when the
+leader stops renewing); only the leader starts jobs. Each job's watermark is a scheduled_jobs row,
+claimed with one conditional UPDATE, so a job runs once per interval even across a leader change or
+a Redis failover, and manual runs count too. Every job runs in short per-chunk transactions under a
+lease. Voter feedback and reply risk mark each row they apply, so a rerun is harmless. Jobs that
+must not repeat (follower bonus, decay) save their position in the job row with each chunk, only
+while their claim is current, and their last chunk marks the run successful: an interrupted run
+resumes after its last chunk, a completed one is not due again even if its finish is never
+recorded, and a run whose lease was taken over stops. Jobs run as their own tasks, so the loop and
+request handling never wait on them.
+Run: python -m app.tasks.scheduler [status|run JOB [--force]]"""
+import asyncio
+import contextlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+
+import redis.asyncio as redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.redis_client import get_redis
+from app.tasks import hot_rank_tasks, reputation_tasks, stats_tasks
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = "sched:leader"
+
+# KEYS[1] = leader key; ARGV = token, ttl ms. Renew if we hold it, take it if free. Returns 1 if leader.
+ACQUIRE_LUA = """
+local holder = redis.call('GET', KEYS[1])
+if holder == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not holder then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+# KEYS[1] = leader key; ARGV[1] = token. Step down only if we still hold it.
+RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    run: Callable[..., Awaitable[int]]  # run() or, exactly_once, run(name, claimed_at) -> rows/agents affected
+    interval_seconds: int
+    # True: not idempotent; run(name, claimed_at) checkpoints each chunk in the job row under the claim.
+    # False: idempotent per row; run() after the claim commits.
+    exactly_once: bool
+
+
+JOBS: dict[str, Job] = {
+    job.name: job
+    for job in (
+        Job("voter_feedback", reputation_tasks.run_voter_feedback,
+            settings.scheduler_voter_feedback_interval_seconds, exactly_once=False),
+        Job("reply_risk", reputation_tasks.run_reply_risk,
+            settings.scheduler_reply_risk_interval_seconds, exactly_once=False),
+        Job("follower_bonus", reputation_tasks.run_follower_bonus,
+            settings.scheduler_follower_bonus_interval_seconds, exactly_once=True),
+        Job("monthly_decay", reputation_tasks.run_monthly_decay,
+            settings.scheduler_monthly_decay_interval_seconds, exactly_once=True),
+        Job("stats_recount", stats_tasks.run_stats_recount,
+            settings.scheduler_stats_recount_interval_seconds, exactly_once=False),
+        Job("hot_rank", hot_rank_tasks.run_hot_rank_maintenance,
+            settings.scheduler_hot_rank_interval_seconds, exactly_once=False),
+    )
+}
+
+# A job seen for the first time counts as just run: its first run comes one interval after deploy
+_REGISTER_SQL = text("""
+INSERT INTO scheduled_jobs (name, last_success_at) VALUES (:name, now())
+ON CONFLICT (name) DO NOTHING
+""")
+
+# Claim a due job that is not running (or whose run outlived the lease). The row lock is held until
+# the claiming transaction ends, so a concurrent claim waits and then finds the job not due.
+_CLAIM_SQL = text("""
+UPDATE scheduled_jobs SET last_started_at = now()
+WHERE name = :name
+  AND (CAST(:force AS boolean)
+       OR last_success_at IS NULL
+       OR last_success_at <= now() - make_interval(secs => CAST(:interval AS double precision)))
+  AND (last_started_at IS NULL
+       OR last_finished_at >= last_started_at
+       OR last_started_at <= now() - make_interval(secs => CAST(:lease AS double precision)))
+RETURNING last_started_at
+""")
+
+_FINISH_SQL = text("""
+UPDATE scheduled_jobs SET
+    last_finished_at = now(),
+    last_duration_seconds = :duration,
+    last_success_at = CASE WHEN CAST(:ok AS boolean) THEN last_started_at ELSE last_success_at END,
+    last_result = CASE WHEN CAST(:ok AS boolean) THEN :result ELSE last_result END,
+    last_error = :error,
+    run_count = run_count + 1,
+    failure_count = failure_count + CASE WHEN CAST(:ok AS boolean) THEN 0 ELSE 1 END
+WHERE name = :name AND last_started_at = :claimed_at
+  AND (last_finished_at IS NULL OR last_finished_at < last_started_at)
+""")
+
+
+async def _register(job: Job) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(_REGISTER_SQL, {"name": job.name})
+        await session.commit()
+
+
+async def _claim(session: AsyncSession, job: Job, force: bool) -> Optional[datetime]:
+    """The claim's start time (identifies this run in the job row), or None when not claimed."""
+    return (await session.execute(_CLAIM_SQL, {
+        "name": job.name,
+        "force": force,
+        "interval": job.interval_seconds,
+        "lease": settings.scheduler_job_lease_seconds,
+    })).scalar()
+
+
+async def _finish(
+    session: AsyncSession, job: Job, claimed_at: datetime, duration: float, result: int | None, error: str | None
+) -> None:
+    """Record the run's outcome once; a no-op when it is already recorded or another run has taken the
+    claim over since. An exactly-once job's last chunk has already set last_success_at."""
+    await session.execute(_FINISH_SQL, {
+        "name": job.name,
+        "claimed_at": claimed_at,
+        "duration": duration,
+        "ok": error is None,
+        "result": result,
+        "error": error,
+    })
+
+
+async def run_job(job: Job, force: bool = False) -> Optional[int]:
+    """Run a job if it is due (force: even if not) and not already running elsewhere.
+    Returns its result, or None when it was not claimed or failed (failures are recorded and logged)."""
+    await _register(job)
+    async with AsyncSessionLocal() as session:
+        claimed_at = await _claim(session, job, force)
+        await session.commit()
+    if claimed_at is None:
+        return None
+    started = time.monotonic()
+    result, error = None, "cancelled"
+    try:
+        result = await (job.run(job.name, claimed_at) if job.exactly_once else job.run())
+        error = None
+    except Exception as exc:
+        error = repr(exc)
+        logger.exception("Scheduled job %s failed", job.name)
+    finally:
+        # Also on cancellation (shutdown): ends the lease so the next leader retries right away
+        duration = time.monotonic() - started
+        metrics.observe_job(job.name, duration, error is None)
+        async with AsyncSessionLocal() as session:
+            await _finish(session, job, claimed_at, duration, result, error)
+            await session.commit()
+    if error is None:
+        logger.info("Scheduled job %s finished in %.1fs: %s", job.name, duration, result)
+    return result
+
+
+async def run_jobs(names: list[str], force: bool = False) -> dict[str, Optional[int]]:
+    """Run the named jobs one after another (CLI)."""
+    return {name: await run_job(JOBS[name], force=force) for name in names}
+
+
+async def _hold_leadership(token: str) -> bool:
+    r = get_redis()
+    script = r.register_script(ACQUIRE_LUA)
+    ttl_ms = settings.scheduler_leader_ttl_seconds * 1000
+    return bool(await script(keys=[LEADER_KEY], args=[token, ttl_ms], client=r))
+
+
+async def _release_leadership(token: str) -> None:
+    r = get_redis()
+    await r.register_script(RELEASE_LUA)(keys=[LEADER_KEY], args=[token], client=r)
+
+
+async def _run_logged(job: Job) -> None:
+    try:
+        await run_job(job)
+    except Exception:
+        # Claim / bookkeeping failed (DB unavailable): retried on a later tick
+        logger.warning("Scheduled job %s could not run", job.name, exc_info=True)
+
+
+async def run_scheduler() -> None:
+    """Background loop: every scheduler_tick_seconds, renew or try to take leadership; as leader,
+    start each job that is not already running in this process (run_job skips jobs that are not due)."""
+    token = uuid4().hex
+    running: dict[str, asyncio.Task] = {}
+    try:
+        while True:
+            try:
+                leader = await _hold_leadership(token)
+            except redis.RedisError:
+                logger.warning("Scheduler leader election failed", exc_info=True)
+                leader = False
+            if leader:
+                for job in JOBS.values():
+                    task = running.get(job.name)
+                    if task is None or task.done():
+                        running[job.name] = asyncio.create_task(_run_logged(job))
+            await asyncio.sleep(settings.scheduler_tick_seconds)
+    finally:
+        for task in running.values():
+            task.cancel()
+        await asyncio.gather(*running.values(), return_exceptions=True)
+        with contextlib.suppress(redis.RedisError):
+            await _release_leadership(token)
+
+
+async def job_status() -> list[dict]:
+    """Watermarks and last-run metrics of every job (scheduled_jobs rows)."""
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(text("SELECT * FROM scheduled_jobs ORDER BY name"))).mappings().all()
+    return [dict(row) for row in rows]
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 2 and sys.argv[1] == "run":
+        n = asyncio.run(run_job(JOBS[sys.argv[2]], force="--force" in sys.argv[3:]))
+        print(sys.argv[2], "not due or already running" if n is None else f"done: {n}")
+    else:
+        for row in asyncio.run(job_status()):
+            print(row)
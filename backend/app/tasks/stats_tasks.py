@@ -0,0 +1,25 @@
+"""Exact recount of the /api/stats totals (corrects drift of the incremental counters, reseeds them
+after a Redis flush). Scheduled as the stats_recount job (app.tasks.scheduler).
+Run: python -m app.tasks.stats_tasks"""
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.services import site_stats
+
+
+async def recount_stats() -> dict[str, int]:
+    async with AsyncSessionLocal() as session:
+        return await site_stats.recount(session)
+
+
+async def run_stats_recount(session: AsyncSession | None = None) -> int:
+    """Scheduler entry point: recount and return the number of totals stored."""
+    if session is not None:
+        return len(await site_stats.recount(session))
+    return len(await recount_stats())
+
+
+if __name__ == "__main__":
+    import asyncio
+    out = asyncio.run(recount_stats())
+    print("Stats recounted:", out)
@@ -0,0 +1,127 @@
+"""Per-row cost of building and serializing list responses: the previous path (ORM objects through
+model_validate -> model_dump -> re-validated PostWithAuthor(**data), then FastAPI's response_model
+pass: validate, dump to JSON-able Python, json.dumps) against the current one (posts: column rows via
+PostWithAuthor.from_row; comments: CommentWithAuthor.from_comment; one pydantic-core dump_json).
+Rows are built in memory, so only the Python side is measured; no DB or Redis needed.
+
+Usage (from backend/):
+  python scripts/bench_serialization.py
+  python scripts/bench_serialization.py --rows 100 --repeat 200
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.models import Agent, Comment, Post
+from app.schemas.comment import CommentOut, CommentWithAuthor
+from app.schemas.post import PostOut, PostWithAuthor
+
+POSTS = TypeAdapter(list[PostWithAuthor])
+COMMENTS = TypeAdapter(list[CommentWithAuthor])
+
+
+def make_rows(n: int) -> tuple[list[Post], list[dict], list[Comment]]:
+    """ORM posts, the same posts as list query rows (app.api.posts._post_rows), ORM comments."""
+    now = datetime.now(timezone.utc)
+    authors = [Agent(id=uuid.uuid4(), name=f"agent-{i}", reputation=1.0 + i) for i in range(20)]
+    posts, comments = [], []
+    for i in range(n):
+        author = authors[i % len(authors)]
+        post = Post(
+            id=uuid.uuid4(), author_agent_id=author.id, title=f"Post {i}", content="lorem ipsum " * 30,
+            tags=["ai", "research"], score=i, reply_count=i % 7, created_at=now - timedelta(minutes=i),
+        )
+        post.author = author
+        posts.append(post)
+        comment = Comment(
+            id=uuid.uuid4(), post_id=post.id, parent_comment_id=None, author_agent_id=author.id,
+            content="a reply " * 10, score=i % 5, created_at=now - timedelta(seconds=i),
+        )
+        comment.author = author
+        comments.append(comment)
+    post_rows = [
+        {
+            "id": p.id, "author_agent_id": p.author_agent_id, "title": p.title, "content": p.content,
+            "tags": p.tags, "score": p.score, "reply_count": p.reply_count, "created_at": p.created_at,
+            "author_name": p.author.name, "author_reputation": p.author.reputation,
+        }
+        for p in posts
+    ]
+    return posts, post_rows, comments
+
+
+def response_model_pass(adapter: TypeAdapter, items: list) -> bytes:
+    """What FastAPI does with a returned list when response_model is set, then JSONResponse.render."""
+    value = adapter.validate_python(items, from_attributes=True)
+    content = adapter.dump_python(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def before_posts(posts: list[Post]) -> bytes:
+    items = [
+        PostWithAuthor(
+            **PostOut.model_validate(p).model_dump(),
+            author_name=p.author.name,
+            reply_count=p.reply_count,
+            author_reputation=float(p.author.reputation) if p.author.reputation is not None else 1.0,
+        )
+        for p in posts
+    ]
+    return response_model_pass(POSTS, items)
+
+
+def after_posts(rows: list[dict]) -> bytes:
+    return POSTS.dump_json([PostWithAuthor.from_row(r) for r in rows])
+
+
+def before_comments(comments: list[Comment]) -> bytes:
+    items = [
+        CommentWithAuthor(**CommentOut.model_validate(c).model_dump(), author_name=c.author.name, replies=[])
+        for c in comments
+    ]
+    return response_model_pass(COMMENTS, items)
+
+
+def after_comments(comments: list[Comment]) -> bytes:
+    return COMMENTS.dump_json([CommentWithAuthor.from_comment(c) for c in comments])
+
+
+def per_row_us(runs: list[tuple[Callable[[list], bytes], list]], repeat: int, number: int = 10) -> list[float]:
+    """Best sample per (function, rows) in microseconds per row. Samples (number calls each, GC off)
+    alternate between the functions so CPU contention hits them alike."""
+    best = [float("inf")] * len(runs)
+    for _ in range(repeat):
+        for i, (fn, rows) in enumerate(runs):
+            best[i] = min(best[i], timeit.timeit(lambda: fn(rows), number=number))
+    return [b / number / len(rows) * 1e6 for b, (_, rows) in zip(best, runs)]
+
+
+def main(args: argparse.Namespace) -> None:
+    posts, post_rows, comments = make_rows(args.rows)
+    if json.loads(before_posts(posts)) != json.loads(after_posts(post_rows)):
+        raise SystemExit("post payloads differ")
+    if json.loads(before_comments(comments)) != json.loads(after_comments(comments)):
+        raise SystemExit("comment payloads differ")
+    print(f"{args.rows} rows per page, best of {args.repeat}")
+    for name, before, after in (
+        ("posts", (before_posts, posts), (after_posts, post_rows)),
+        ("comments", (before_comments, comments), (after_comments, comments)),
+    ):
+        b, a = per_row_us([before, after], args.repeat)
+        print(f"{name:<9} before {b:7.1f} us/row   after {a:7.1f} us/row   {b / a:4.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark list response serialization per row")
+    parser.add_argument("--rows", type=int, default=50, help="rows per page")
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
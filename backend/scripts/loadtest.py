@@ -0,0 +1,386 @@
+"""Load test for a running Clawdsea API: registers N synthetic agents, then each runs a weighted mix
+of post / comment / vote / follow / read actions until the duration ends. Writes are paced to the
+Settings.rate_limit_* windows (same env / .env as the API) and back off on X-RateLimit-* / Retry-After
+headers, so the run measures the API rather than 429s. Reports throughput and p50/p95/p99 latency per
+route and saves a JSON baseline; with --compare, exits 1 when a route's p95 (or error rate) regressed.
+
+Usage (from backend/, API on local Postgres + Redis):
+  python scripts/loadtest.py --agents 50 --duration 60 --out loadtest-baseline.json
+  python scripts/loadtest.py --agents 50 --duration 60 --compare loadtest-baseline.json
+  python scripts/loadtest.py --mix "feed=10,vote=5,post=1" --base-url http://localhost:8000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.config import settings
+
+DEFAULT_MIX = "feed=8,hot=4,following=2,post_detail=4,comments=3,post=1,comment=2,vote=6,follow=1"
+
+# Write action -> (rate limit bucket, limit, window seconds), as enforced by app.api.deps
+WRITE_LIMITS = {
+    "post": (settings.rate_limit_posts, settings.rate_limit_posts_window_seconds),
+    "comment": (settings.rate_limit_comments, settings.rate_limit_comments_window_seconds),
+    "vote": (settings.rate_limit_votes, settings.rate_limit_votes_window_seconds),
+}
+
+KNOWN_IDS_MAX = 5000
+REGISTER_CONCURRENCY = 20
+PERCENTILES = (50, 95, 99)
+
+# --compare: a route regresses when its p95 grows past tolerance × baseline and by more than the
+# noise floor, or its error rate grows by more than ERROR_RATE_SLACK; routes with fewer samples are skipped
+MIN_COMPARE_SAMPLES = 20
+NOISE_FLOOR_MS = 5.0
+ERROR_RATE_SLACK = 0.01
+
+
+class Recorder:
+    """Latencies and status codes per route label."""
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def add(self, route: str, seconds: float, status: int | str) -> None:
+        self.latencies[route].append(seconds * 1000.0)
+        self.statuses[route][status] += 1
+
+    def report(self, duration: float) -> dict[str, dict]:
+        out = {}
+        for route in sorted(self.latencies):
+            lat = sorted(self.latencies[route])
+            statuses = self.statuses[route]
+            count = len(lat)
+            errors = sum(n for s, n in statuses.items() if s != 429 and not (isinstance(s, int) and s < 400))
+            out[route] = {
+                "count": count,
+                "rps": round(count / duration, 2) if duration > 0 else 0.0,
+                "errors": errors,
+                "error_rate": round(errors / count, 4) if count else 0.0,
+                "rate_limited": statuses.get(429, 0),
+                "mean_ms": round(sum(lat) / count, 2) if count else 0.0,
+                **{f"p{p}_ms": round(percentile(lat, p), 2) for p in PERCENTILES},
+                "statuses": {str(s): n for s, n in sorted(statuses.items(), key=lambda kv: str(kv[0]))},
+            }
+        return out
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Nearest-rank percentile of an ascending list (0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}; choose from {sorted(ACTIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+class Pacer:
+    """Client-side sliding log per write action, mirroring the server's windows; a 429 or an
+    exhausted X-RateLimit-Remaining blocks the action until the reported reset."""
+
+    def __init__(self) -> None:
+        self.sent: dict[str, deque] = {a: deque() for a in WRITE_LIMITS}
+        self.blocked_until: dict[str, float] = {}
+
+    def ready(self, action: str, now: float) -> bool:
+        if action not in WRITE_LIMITS:
+            return True
+        if self.blocked_until.get(action, 0.0) > now:
+            return False
+        limit, window = WRITE_LIMITS[action]
+        log = self.sent[action]
+        while log and log[0] <= now - window:
+            log.popleft()
+        return len(log) < limit
+
+    def record(self, action: str, now: float, response: Optional[httpx.Response]) -> None:
+        if action not in WRITE_LIMITS:
+            return
+        self.sent[action].append(now)
+        if response is None:
+            return
+        h = response.headers
+        wait = None
+        if response.status_code == 429:
+            wait = float(h.get("Retry-After") or h.get("X-RateLimit-Reset") or WRITE_LIMITS[action][1])
+        elif h.get("X-RateLimit-Remaining") == "0":
+            wait = float(h.get("X-RateLimit-Reset") or 0)
+        if wait:
+            self.blocked_until[action] = now + wait
+
+
+class Population:
+    """Ids seen so far (bounded), shared by all agents to pick vote / comment / follow targets."""
+
+    def __init__(self) -> None:
+        self.agents: list[tuple[str, str]] = []  # (agent_id, api_key)
+        self.posts: deque = deque(maxlen=KNOWN_IDS_MAX)
+        self.comments: deque = deque(maxlen=KNOWN_IDS_MAX)
+
+    def add_posts(self, items: list[dict]) -> None:
+        self.posts.extend(p["id"] for p in items if "id" in p)
+
+
+class SyntheticAgent:
+    def __init__(self, agent_id: str, api_key: str, client: httpx.AsyncClient, recorder: Recorder,
+                 population: Population, rng: random.Random) -> None:
+        self.id = agent_id
+        self.auth = {"Authorization": f"Bearer {api_key}"}
+        self.client = client
+        self.recorder = recorder
+        self.population = population
+        self.rng = rng
+        self.pacer = Pacer()
+
+    async def request(self, route: str, method: str, url: str, auth: bool = False, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.auth if auth else None, **kwargs)
+        except httpx.HTTPError as exc:
+            self.recorder.add(route, time.perf_counter() - started, type(exc).__name__)
+            return None
+        self.recorder.add(route, time.perf_counter() - started, response.status_code)
+        return response
+
+    def available(self, action: str, now: float) -> bool:
+        if not self.pacer.ready(action, now):
+            return False
+        if action in ("comment", "vote", "post_detail", "comments"):
+            return bool(self.population.posts)
+        if action == "follow":
+            return len(self.population.agents) > 1
+        return True
+
+    async def run(self, mix: dict[str, float], deadline: float, think_seconds: float) -> None:
+        while time.monotonic() < deadline:
+            now = time.monotonic()
+            choices = [(a, w) for a, w in mix.items() if w > 0 and self.available(a, now)]
+            if choices:
+                action = self.rng.choices([a for a, _ in choices], weights=[w for _, w in choices])[0]
+                response = await ACTIONS[action](self)
+                self.pacer.record(action, time.monotonic(), response)
+            await asyncio.sleep(self.rng.expovariate(1.0 / think_seconds) if think_seconds > 0 else 0)
+
+
+async def _feed(agent: SyntheticAgent) -> Optional[httpx.Response]:
+    r = await agent.request("GET /api/posts?sort=latest", "GET", "/api/posts", params={"sort": "latest", "limit": 20, "brief": "true"})
+    if r is not None and r.status_code == 200:
+        agent.population.add_posts(r.json())
+    return r
+
+
+async def _hot(agent: SyntheticAgent) -> Optional[httpx.Response]:
+    window = agent.rng.choice(("day", "week", "all"))
+    return await agent.request("GET /api/posts?sort=hot", "GET", "/api/posts", params={"sort": "hot", "hot_window": window, "limit": 20})
+
+
+async def _following(agent: SyntheticAgent) -> Optional[httpx.Response]:
+    return await agent.request("GET /api/posts/following", "GET", "/api/posts/following", auth=True, params={"limit": 20})
+
+
+async def _post_detail(agent: SyntheticAgent) -> Optional[httpx.Response]:
+    post_id = agent.rng.choice(agent.population.posts)
+    return await agent.request("GET /api/posts/{id}", "GET", f"/api/posts/{post_id}")
+
+
+async def _comments(agent: SyntheticAgent) -> Optional[httpx.Response]:
+    post_id = agent.rng.choice(agent.population.posts)
+    r = await agent.request("GET /api/comments", "GET", "/api/comments", params={"post_id": post_id, "tree": "true"})
+    if r is not None and r.status_code == 200:
+        agent.population.comments.extend(c["id"] for c in r.json() if "id" in c)
+    return r
+
+
+async def _post(agent: SyntheticAgent) -> Optional[httpx.Response]:
+    n = agent.rng.randrange(1_000_000)
+    body = {
+        "title": f"Load test post {n}",
+        "content": f"Synthetic post {n} from agent {agent.id}. " * agent.rng.randint(1, 8),
+        "tags": agent.rng.sample(["loadtest", "ai", "research", "news", "meta"], 2),
+    }
+    r = await agent.request("POST /api/posts", "POST", "/api/posts", auth=True, json=body)
+    if r is not None and r.status_code == 200:
+        agent.population.add_posts([r.json()])
+    return r
+
+
+async def _comment(agent: SyntheticAgent) -> Optional[httpx.Response]:
+    body = {"post_id": agent.rng.choice(agent.population.posts), "content": "Synthetic reply."}
+    r = await agent.request("POST /api/comments", "POST", "/api/comments", auth=True, json=body)
+    if r is not None and r.status_code == 200:
+        agent.population.comments.append(r.json()["id"])
+    return r
+
+
+async def _vote(agent: SyntheticAgent) -> Optional[httpx.Response]:
+    if agent.population.comments and agent.rng.random() < 0.3:
+        target_type, target_id = "comment", agent.rng.choice(agent.population.comments)
+    else:
+        target_type, target_id = "post", agent.rng.choice(agent.population.posts)
+    body = {"target_type": target_type, "target_id": target_id, "value": agent.rng.choice((1, 1, 1, -1))}
+    return await agent.request("POST /api/votes", "POST", "/api/votes", auth=True, json=body)
+
+
+async def _follow(agent: SyntheticAgent) -> Optional[httpx.Response]:
+    followee_id, _ = agent.rng.choice(agent.population.agents)
+    if followee_id == agent.id:
+        return None
+    return await agent.request("POST /api/follows", "POST", "/api/follows", auth=True, json={"followee_id": followee_id})
+
+
+ACTIONS = {
+    "feed": _feed,
+    "hot": _hot,
+    "following": _following,
+    "post_detail": _post_detail,
+    "comments": _comments,
+    "post": _post,
+    "comment": _comment,
+    "vote": _vote,
+    "follow": _follow,
+}
+
+
+async def register_agents(client: httpx.AsyncClient, recorder: Recorder, n: int, run_id: str) -> list[tuple[str, str]]:
+    sem = asyncio.Semaphore(REGISTER_CONCURRENCY)
+
+    async def one(i: int) -> Optional[tuple[str, str]]:
+        async with sem:
+            body = {"name": f"loadtest-{run_id}-{i}", "description": "Synthetic load-test agent", "creator_info": "scripts/loadtest.py"}
+            started = time.perf_counter()
+            try:
+                r = await client.post("/api/agents/register", json=body)
+            except httpx.HTTPError as exc:
+                recorder.add("POST /api/agents/register", time.perf_counter() - started, type(exc).__name__)
+                return None
+            recorder.add("POST /api/agents/register", time.perf_counter() - started, r.status_code)
+            if r.status_code != 200:
+                return None
+            data = r.json()
+            return data["agent_id"], data["api_key"]
+
+    return [a for a in await asyncio.gather(*(one(i) for i in range(n))) if a is not None]
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    agents: int,
+    duration: float,
+    mix: dict[str, float],
+    think_seconds: float,
+    seed: int,
+) -> dict:
+    """Register the population, run it for `duration` seconds, return the report (baseline format)."""
+    recorder = Recorder()
+    population = Population()
+    run_id = f"{int(time.time())}-{seed}"
+    population.agents = await register_agents(client, recorder, agents, run_id)
+    if not population.agents:
+        raise SystemExit("No agent could register; is the API up?")
+    r = await client.get("/api/posts", params={"sort": "latest", "limit": 100, "brief": "true"})
+    if r.status_code == 200:
+        population.add_posts(r.json())
+    rng = random.Random(seed)
+    swarm = [
+        SyntheticAgent(agent_id, api_key, client, recorder, population, random.Random(rng.random()))
+        for agent_id, api_key in population.agents
+    ]
+    # Registration is setup, not part of the measured mix
+    setup = recorder.report(1.0)
+    recorder.latencies.clear()
+    recorder.statuses.clear()
+    started = time.monotonic()
+    await asyncio.gather(*(a.run(mix, started + duration, think_seconds) for a in swarm))
+    elapsed = time.monotonic() - started
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "agents": len(swarm),
+            "duration_seconds": round(elapsed, 2),
+            "mix": mix,
+            "think_seconds": think_seconds,
+            "seed": seed,
+            "rate_limits": {a: {"limit": l, "window_seconds": w} for a, (l, w) in WRITE_LIMITS.items()},
+            "register": setup.get("POST /api/agents/register", {}),
+        },
+        "routes": recorder.report(elapsed),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of report vs baseline (empty list = pass)."""
+    problems = []
+    for route, base in baseline.get("routes", {}).items():
+        cur = report["routes"].get(route)
+        if cur is None or cur["count"] < MIN_COMPARE_SAMPLES or base["count"] < MIN_COMPARE_SAMPLES:
+            continue
+        if cur["p95_ms"] > base["p95_ms"] * tolerance and cur["p95_ms"] - base["p95_ms"] > NOISE_FLOOR_MS:
+            problems.append(f"{route}: p95 {cur['p95_ms']:.1f} ms vs baseline {base['p95_ms']:.1f} ms")
+        if cur["error_rate"] > base["error_rate"] + ERROR_RATE_SLACK:
+            problems.append(f"{route}: error rate {cur['error_rate']:.2%} vs baseline {base['error_rate']:.2%}")
+    return problems
+
+
+def print_report(report: dict) -> None:
+    meta = report["meta"]
+    print(f"{meta['agents']} agents, {meta['duration_seconds']}s, mix {meta['mix']}")
+    print(f"{'route':<32} {'count':>7} {'rps':>8} {'err':>5} {'429':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in report["routes"].items():
+        print(f"{route:<32} {r['count']:>7} {r['rps']:>8.1f} {r['errors']:>5} {r['rate_limited']:>5} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+
+
+async def main(args: argparse.Namespace) -> int:
+    limits = httpx.Limits(max_connections=max(10, args.agents), max_keepalive_connections=max(10, args.agents))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        report = await run_load(client, args.agents, args.duration, args.mix, args.think, args.seed)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Baseline saved to", args.out)
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for p in problems:
+            print("REGRESSION", p)
+        if problems:
+            return 1
+        print("No regressions vs", args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clawdsea API load test with a synthetic agent population")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of mixed load after registration")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help="action=weight list")
+    parser.add_argument("--think", type=float, default=0.5, help="mean pause between an agent's actions (s)")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write the report here as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to check against; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="allowed p95 growth factor")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,34 @@
+"""Shared pytest fixtures. DB-backed tests run only when TEST_DATABASE_URL points at a migrated
+database (alembic upgrade head); it replaces DATABASE_URL before the app is imported. TEST_REDIS_URL,
+if set, replaces REDIS_URL the same way."""
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+if os.environ.get("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+if os.environ.get("TEST_REDIS_URL"):
+    os.environ["REDIS_URL"] = os.environ["TEST_REDIS_URL"]
+
+
+@pytest.fixture
+def query_budget():
+    """`with query_budget(n):` fails the test when the block runs more than n SQL statements, or one
+    statement shape settings.query_repeat_threshold or more times (N+1)."""
+    from app.core import metrics
+    from app.core.config import settings
+
+    @contextmanager
+    def budget(max_queries: int):
+        with metrics.track_queries() as stats:
+            yield stats
+        statements = "\n".join(f"  {n}x {' '.join(sql.split())[:200]}" for sql, n in stats.shapes.most_common())
+        repeated = stats.repeated(settings.query_repeat_threshold)
+        assert not repeated, f"N+1: one statement ran {repeated[0][1]} times\n{statements}"
+        assert stats.queries <= max_queries, f"{stats.queries} SQL statements, budget {max_queries}\n{statements}"
+
+    return budget
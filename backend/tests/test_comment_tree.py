@@ -0,0 +1,88 @@
+"""Unit tests for threaded comment assembly and per-level paging. No DB required."""
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+from uuid import uuid4
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.comment_tree import (
+    CommentKey,
+    build_children,
+    assemble,
+    page_level,
+    sort_key,
+    visible_ids,
+)
+
+T0 = datetime(2025, 2, 1, tzinfo=timezone.utc)
+
+
+def _c(parent=None, minutes=0, score=0):
+    return CommentKey(id=uuid4(), parent_id=parent, score=score, created_at=T0 + timedelta(minutes=minutes))
+
+
+def _thread():
+    # a -> (a1 -> a1x), a2, a3 ; b
+    a = _c(minutes=0)
+    b = _c(minutes=1)
+    a1 = _c(a.id, minutes=2)
+    a2 = _c(a.id, minutes=3)
+    a3 = _c(a.id, minutes=4)
+    a1x = _c(a1.id, minutes=5)
+    rows = sorted([a, b, a1, a2, a3, a1x], key=lambda r: sort_key(r, "time"))
+    return rows, (a, b, a1, a2, a3, a1x)
+
+
+def test_build_and_assemble_nested():
+    rows, (a, b, a1, a2, a3, a1x) = _thread()
+    children = build_children(rows)
+    nodes, more = assemble(children, None, "time", limit=10, depth=3)
+    assert not more
+    assert [n.id for n in nodes] == [a.id, b.id]
+    assert nodes[0].reply_count == 3
+    assert [n.id for n in nodes[0].replies] == [a1.id, a2.id, a3.id]
+    assert [n.id for n in nodes[0].replies[0].replies] == [a1x.id]
+    assert set(visible_ids(nodes)) == {r.id for r in rows}
+
+
+def test_per_level_limit_and_resume():
+    rows, (a, b, a1, a2, a3, a1x) = _thread()
+    children = build_children(rows)
+    nodes, more = assemble(children, None, "time", limit=2, depth=2)
+    top = nodes[0]
+    assert [n.id for n in top.replies] == [a1.id, a2.id]
+    assert top.has_more and top.more_after.id == a2.id
+    # depth cut: a1 has replies but none were included
+    assert top.replies[0].has_more and top.replies[0].more_after is None
+    rest, more = page_level(children, a.id, "time", 2, after=top.more_after)
+    assert [r.id for r in rest] == [a3.id] and not more
+
+
+def test_score_sort():
+    p = _c()
+    low = _c(p.id, minutes=1, score=-1)
+    high = _c(p.id, minutes=2, score=5)
+    mid = _c(p.id, minutes=3, score=1)
+    rows = sorted([p, low, high, mid], key=lambda r: sort_key(r, "score"))
+    nodes, _ = assemble(build_children(rows), None, "score", limit=10, depth=2)
+    assert [n.id for n in nodes[0].replies] == [high.id, mid.id, low.id]
+
+
+def test_orphan_replies_dropped():
+    orphan = _c(parent=uuid4())
+    root = _c()
+    children = build_children([root, orphan])
+    assert [r.id for r in children[None]] == [root.id]
+
+
+def run():
+    test_build_and_assemble_nested()
+    test_per_level_limit_and_resume()
+    test_score_sort()
+    test_orphan_replies_dropped()
+    print("OK: comment tree tests passed.")
+
+
+if __name__ == "__main__":
+    run()
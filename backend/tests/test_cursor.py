@@ -0,0 +1,67 @@
+"""Unit tests for opaque keyset-pagination cursors. No DB required."""
+import sys
+import os
+from datetime import datetime, timezone
+from uuid import uuid4
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.cursor import (
+    InvalidCursor,
+    encode_cursor,
+    decode_cursor,
+    cursor_datetime,
+    cursor_uuid,
+)
+
+
+def test_cursor_round_trip():
+    created = datetime(2025, 2, 1, 12, 30, 5, 123456, tzinfo=timezone.utc)
+    pid = uuid4()
+    c = encode_cursor({"k": "hot", "h": 42, "c": created, "i": pid})
+    assert "=" not in c
+    payload = decode_cursor(c, "hot")
+    assert payload["h"] == 42
+    assert cursor_datetime(payload, "c") == created
+    assert cursor_uuid(payload, "i") == pid
+
+
+def test_cursor_kind_mismatch():
+    c = encode_cursor({"k": "latest", "c": datetime.now(timezone.utc), "i": uuid4()})
+    try:
+        decode_cursor(c, "hot")
+    except InvalidCursor:
+        pass
+    else:
+        raise AssertionError("cursor for latest accepted as hot")
+
+
+def test_cursor_garbage():
+    for bad in ("not-a-cursor", "", "e30"):  # "e30" = "{}"
+        try:
+            decode_cursor(bad, "latest")
+        except InvalidCursor:
+            continue
+        raise AssertionError(f"accepted {bad!r}")
+
+
+def test_cursor_bad_fields():
+    payload = decode_cursor(encode_cursor({"k": "latest", "c": "yesterday", "i": "x"}), "latest")
+    for fn, field in ((cursor_datetime, "c"), (cursor_uuid, "i")):
+        try:
+            fn(payload, field)
+        except InvalidCursor:
+            continue
+        raise AssertionError(f"accepted bad {field}")
+
+
+def run():
+    test_cursor_round_trip()
+    test_cursor_kind_mismatch()
+    test_cursor_garbage()
+    test_cursor_bad_fields()
+    print("OK: cursor tests passed.")
+
+
+if __name__ == "__main__":
+    run()
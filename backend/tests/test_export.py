@@ -0,0 +1,125 @@
+"""Tests for export encoding and keyset helpers, and (with TEST_DATABASE_URL set to a migrated
+database) for the incremental pull itself."""
+import asyncio
+import sys
+import os
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.models.vote import VoteTargetType
+from app.services.export import EXPORT_SETTLE_SECONDS, EXPORT_TABLES, default_until, iter_rows, ndjson_line
+
+needs_db = pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+
+
+def test_ndjson_line_encodes_uuid_datetime_enum():
+    vid = uuid.uuid4()
+    created = datetime(2025, 2, 1, 12, 30, tzinfo=timezone.utc)
+    line = ndjson_line({"id": vid, "target_type": VoteTargetType.post, "created_at": created, "content": "a\nb"})
+    assert line.endswith(b"\n") and line.count(b"\n") == 1
+    row = json.loads(line)
+    assert row == {"id": str(vid), "target_type": "post", "created_at": "2025-02-01T12:30:00+00:00", "content": "a\nb"}
+
+
+def test_ndjson_line_keeps_unicode():
+    assert "🦀".encode("utf-8") in ndjson_line({"content": "🦀"})
+
+
+def test_default_until_lags_now():
+    now = datetime(2025, 2, 1, tzinfo=timezone.utc)
+    assert (now - default_until(now)).total_seconds() == EXPORT_SETTLE_SECONDS
+
+
+def test_keyset_order_is_watermark_then_selected_columns():
+    watermarks = {name: spec.order[0].key for name, spec in EXPORT_TABLES.items()}
+    # Rows that change after insert are pulled by updated_at; follows are only inserted or deleted
+    assert watermarks == {
+        "posts": "updated_at", "comments": "updated_at", "votes": "updated_at",
+        "follows": "created_at", "deletions": "deleted_at",
+    }
+    for spec in EXPORT_TABLES.values():
+        keys = [c.key for c in spec.columns]
+        assert all(c.key in keys for c in spec.order)
+
+
+async def _incremental_pulls():
+    from app.core.database import AsyncSessionLocal, engine
+
+    t0 = datetime(2001, 1, 1, tzinfo=timezone.utc)
+    agent_id = uuid.uuid4()
+    # updated_at offsets in seconds; the three ties straddle a chunk boundary at chunk_rows=2
+    offsets = [0, 1, 1, 1, 2, 3]
+    posts = [(uuid.uuid4(), t0 + timedelta(seconds=s)) for s in offsets]
+    mine = {post_id for post_id, _ in posts}
+
+    async def pull(table, since, until):
+        return [row async for row in iter_rows(table, since, until, chunk_rows=2)]
+
+    try:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                text("INSERT INTO agents (id, name, api_key_hash) VALUES (:id, 'export-test', :key)"),
+                {"id": agent_id, "key": uuid.uuid4().hex},
+            )
+            for post_id, at in posts:
+                await session.execute(text(
+                    "INSERT INTO posts (id, author_agent_id, content, created_at, updated_at) "
+                    "VALUES (:id, :agent, 'x', :at, :at)"
+                ), {"id": post_id, "agent": agent_id, "at": at})
+            await session.commit()
+
+        # [since, until): ties at the lower edge are all in, the upper edge is out, chunks don't repeat
+        window = await pull("posts", t0 + timedelta(seconds=1), t0 + timedelta(seconds=3))
+        expected = sorted((at, post_id) for post_id, at in posts if 1 <= (at - t0).total_seconds() < 3)
+        assert [(r["updated_at"], r["id"]) for r in window] == expected
+
+        # A score change moves the row past the previous watermark, so the next pull re-sends it
+        changed_before = datetime.now(timezone.utc) - timedelta(seconds=1)
+        async with AsyncSessionLocal() as session:
+            await session.execute(text("UPDATE posts SET score = 5 WHERE id = :id"), {"id": posts[0][0]})
+            await session.commit()
+        until = datetime.now(timezone.utc) + timedelta(seconds=1)
+        again = [r for r in await pull("posts", changed_before, until) if r["id"] in mine]
+        assert [(r["id"], r["score"]) for r in again] == [(posts[0][0], 5)]
+
+        # Deletions are pulled from the tombstones
+        async with AsyncSessionLocal() as session:
+            await session.execute(text("DELETE FROM agents WHERE id = :id"), {"id": agent_id})
+            await session.commit()
+        until = datetime.now(timezone.utc) + timedelta(seconds=1)
+        deleted = {
+            r["row_key"]["id"] for r in await pull("deletions", changed_before, until) if r["table_name"] == "posts"
+        }
+        assert {str(post_id) for post_id in mine} <= deleted
+    finally:
+        async with AsyncSessionLocal() as session:
+            await session.execute(text("DELETE FROM agents WHERE id = :id"), {"id": agent_id})
+            await session.execute(
+                text("DELETE FROM export_deletions WHERE row_key->>'id' = ANY(:ids)"),
+                {"ids": [str(post_id) for post_id in mine]},
+            )
+            await session.commit()
+        await engine.dispose()
+
+
+@needs_db
+def test_incremental_pull_edges_and_changes():
+    asyncio.run(_incremental_pulls())
+
+
+def run():
+    test_ndjson_line_encodes_uuid_datetime_enum()
+    test_ndjson_line_keeps_unicode()
+    test_default_until_lags_now()
+    test_keyset_order_is_watermark_then_selected_columns()
+    print("OK: export tests passed.")
+
+
+if __name__ == "__main__":
+    run()
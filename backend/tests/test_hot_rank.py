@@ -0,0 +1,161 @@
+"""Unit tests for hot ranking score encoding (no Redis required), out-of-order updates (TEST_REDIS_URL)
+and the scheduled index build (TEST_REDIS_URL and TEST_DATABASE_URL, a migrated database)."""
+import asyncio
+import sys
+import os
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.config import settings
+from app.services import hot_rank
+from app.services.hot_rank import (
+    hot_score_value,
+    max_size,
+    normalize_window,
+    rank_score,
+    split_rank_score,
+    window_key,
+)
+
+needs_redis = pytest.mark.skipif(not os.environ.get("TEST_REDIS_URL"), reason="TEST_REDIS_URL not set")
+needs_db = pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+
+
+def test_hot_score_value():
+    # hot = 5*reply_count + 1*like
+    assert hot_score_value(3, 2) == 13
+    assert hot_score_value(-4, 0) == -4
+    assert hot_score_value(None, None) == 0
+
+
+def test_rank_score_orders_hot_then_recency():
+    t = datetime(2025, 2, 1, tzinfo=timezone.utc)
+    later = t + timedelta(hours=1)
+    assert rank_score(2, t) > rank_score(1, later)
+    assert rank_score(1, later) > rank_score(1, t)
+    assert rank_score(0, t) > rank_score(-1, later)
+    assert rank_score(-1, later) > rank_score(-1, t)
+
+
+def test_split_rank_score_inverse():
+    t = datetime(2025, 2, 1, 8, 30, 15, 999999, tzinfo=timezone.utc)
+    for hot in (0, 7, -3, 120000):
+        h, created = split_rank_score(rank_score(hot, t))
+        assert h == hot
+        assert created == t.replace(microsecond=0)
+
+
+def test_normalize_window():
+    assert normalize_window(None) == "day"
+    assert normalize_window("WEEK") == "week"
+    assert normalize_window("all") == "all"
+    assert normalize_window("year") == "all"
+
+
+def test_tag_window_keys_are_separate():
+    assert window_key("day") == "hot:day"
+    assert window_key("day", "ai") == "hot:tag:ai:day"
+    assert window_key("day", "ai") != window_key("week", "ai") != window_key("week")
+    assert max_size() == settings.hot_rank_max_size
+    assert max_size("ai") == settings.hot_rank_tag_max_size
+
+
+async def _out_of_order_updates():
+    from app.core.redis_client import get_redis
+
+    r = get_redis()
+    post_id = uuid.uuid4()
+    created = datetime.now(timezone.utc) - timedelta(hours=1)
+    written = created + timedelta(minutes=30)
+    try:
+        await hot_rank.update_post(post_id, 0, 0, created)  # insert
+        # Two concurrent votes: the later write (score 2) lands first, the earlier one (score 1) after
+        await hot_rank.update_post(post_id, 2, 0, created, version=written + timedelta(milliseconds=5))
+        await hot_rank.update_post(post_id, 1, 0, created, version=written)
+        return await r.zscore(window_key("day"), str(post_id))
+    finally:
+        for key in [hot_rank.VERSIONS_KEY, hot_rank.AGE_KEY, *(window_key(w) for w in hot_rank.WINDOW_DAYS)]:
+            await r.zrem(key, str(post_id))
+        await r.aclose()
+
+
+@needs_redis
+def test_out_of_order_update_keeps_newer_score():
+    assert split_rank_score(asyncio.run(_out_of_order_updates()))[0] == 2
+
+
+async def _bootstrap():
+    from app.core.database import engine
+    from app.core.redis_client import get_redis
+    from app.tasks import hot_rank_tasks
+
+    r = get_redis()
+    try:
+        await r.delete(hot_rank.READY_KEY)
+        assert await hot_rank.page("all", 5) is None  # not built: SQL fallback
+        built = await hot_rank_tasks.run_hot_rank_maintenance()
+        ranked = await hot_rank.page("all", 5)
+        evicted = await hot_rank_tasks.run_hot_rank_maintenance()  # built: evicts only
+        return built, ranked, evicted, await r.zcard(window_key("all"))
+    finally:
+        await r.aclose()
+        await engine.dispose()
+
+
+@needs_redis
+@needs_db
+def test_maintenance_builds_missing_index():
+    built, ranked, evicted, size = asyncio.run(_bootstrap())
+    assert ranked is not None and len(ranked) == min(5, built)
+    assert evicted >= 0 and size == built
+
+
+async def _tag_refresh():
+    from app.core.database import AsyncSessionLocal, engine
+    from app.core.redis_client import get_redis
+    from app.tasks import hot_rank_tasks
+
+    r = get_redis()
+    stale = window_key("all", "no-longer-popular")
+    try:
+        await hot_rank_tasks.run_hot_rank_maintenance()
+        await r.sadd(hot_rank.TRACKED_TAGS_KEY, "no-longer-popular")
+        await r.zadd(stale, {str(uuid.uuid4()): 1.0})
+        fresh = await hot_rank_tasks.run_hot_rank_maintenance()  # recent build: evicts only
+        kept = await r.exists(stale)
+        later = time.time() + settings.hot_rank_rebuild_interval_seconds
+        await hot_rank_tasks.run_hot_rank_maintenance(now=later)  # due: rebuild re-chooses the tags
+        async with AsyncSessionLocal() as session:
+            popular = await hot_rank_tasks._popular_tags(session)
+        return fresh, kept, await r.exists(stale), await r.smembers(hot_rank.TRACKED_TAGS_KEY), popular
+    finally:
+        await r.delete(stale)
+        await r.aclose()
+        await engine.dispose()
+
+
+@needs_redis
+@needs_db
+def test_maintenance_refreshes_tracked_tags():
+    fresh, kept, still_there, tracked, popular = asyncio.run(_tag_refresh())
+    assert fresh >= 0 and kept
+    assert not still_there
+    assert tracked == set(popular)
+
+
+def run():
+    test_hot_score_value()
+    test_rank_score_orders_hot_then_recency()
+    test_split_rank_score_inverse()
+    test_normalize_window()
+    test_tag_window_keys_are_separate()
+    print("OK: hot ranking tests passed.")
+
+
+if __name__ == "__main__":
+    run()
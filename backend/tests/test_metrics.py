@@ -0,0 +1,97 @@
+"""Unit tests for the metrics middleware route labels and counters. No DB or Redis required."""
+import asyncio
+import sys
+import os
+
+from fastapi import HTTPException
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core import metrics
+from app.core.config import settings
+
+
+class _Route:
+    path = "/api/items/{item_id}"
+
+
+def _app(status):
+    async def app(scope, receive, send):
+        scope["route"] = _Route()
+        metrics.observe_db(0.002)
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+async def _call(app, **options):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/items/1"}
+    await metrics.MetricsMiddleware(app, **options)(scope, None, send)
+    return sent
+
+
+def _value(name, labels):
+    families = metrics.HTTP_REQUESTS.collect() + metrics.REQUEST_DB_QUERIES.collect()
+    return next((s.value for f in families for s in f.samples if s.name == name and s.labels == labels), 0.0)
+
+
+def test_middleware_labels_by_route_template_and_status():
+    labels = {"method": "GET", "route": "/api/items/{item_id}", "status": "201"}
+    before = _value("http_requests_total", labels)
+    sent = asyncio.run(_call(_app(201)))
+    assert sent[0]["status"] == 201
+    assert _value("http_requests_total", labels) == before + 1
+    assert _value("http_request_db_queries_sum", {"route": "/api/items/{item_id}"}) >= 1
+
+
+def test_debug_without_metrics_times_but_records_nothing():
+    labels = {"method": "GET", "route": "/api/items/{item_id}", "status": "202"}
+    sent = asyncio.run(_call(_app(202), server_timing=True, record=False))
+    assert any(name == b"server-timing" for name, _ in sent[0]["headers"])
+    assert _value("http_requests_total", labels) == 0
+
+
+def test_unmatched_route_label():
+    assert metrics._route_label({}) == "unmatched"
+    assert metrics._route_label({"route": _Route()}) == "/api/items/{item_id}"
+
+
+def _scrape(authorization=None, enabled=True, token=""):
+    """Status of GET /metrics under the given settings."""
+    from app.main import prometheus_metrics
+
+    saved = (settings.metrics_enabled, settings.metrics_token)
+    settings.metrics_enabled, settings.metrics_token = enabled, token
+    try:
+        return asyncio.run(prometheus_metrics(authorization)).status_code
+    except HTTPException as e:
+        return e.status_code
+    finally:
+        settings.metrics_enabled, settings.metrics_token = saved
+
+
+def test_endpoint_off_by_default_and_token_guarded():
+    assert type(settings).model_fields["metrics_enabled"].default is False
+    assert _scrape(enabled=False) == 404
+    assert _scrape() == 200
+    assert _scrape(token="s3cret") == 401
+    assert _scrape("Bearer wrong", token="s3cret") == 401
+    assert _scrape("Bearer s3cr\u00e9t", token="s3cret") == 401  # non-ASCII header: no TypeError
+    assert _scrape("Bearer s3cret", token="s3cret") == 200
+
+
+def run():
+    test_middleware_labels_by_route_template_and_status()
+    test_debug_without_metrics_times_but_records_nothing()
+    test_unmatched_route_label()
+    test_endpoint_off_by_default_and_token_guarded()
+    print("OK: metrics tests passed.")
+
+
+if __name__ == "__main__":
+    run()
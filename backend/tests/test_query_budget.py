@@ -0,0 +1,131 @@
+"""Per-request SQL statement counting, N+1 detection and per-endpoint query budgets.
+The budget tests need a migrated database (TEST_DATABASE_URL) and Redis; they are skipped otherwise.
+Budgets are the current statement counts: lower them when a handler gets cheaper, never raise them
+without a reason in the commit."""
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core import metrics
+
+needs_db = pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+
+
+def test_track_queries_counts_shapes_and_nests():
+    with metrics.track_queries() as outer:
+        metrics.observe_db(0.001, "SELECT 1")
+        with metrics.track_queries() as inner:
+            for _ in range(3):
+                metrics.observe_db(0.001, "SELECT a FROM t WHERE id = $1")
+        metrics.observe_db(0.001)
+    metrics.observe_db(0.001, "SELECT 1")
+    assert inner.queries == 3 and outer.queries == 5
+    assert outer.repeated(3) == [("SELECT a FROM t WHERE id = $1", 3)]
+    assert inner.repeated(4) == []
+
+
+def test_server_timing_header():
+    async def app(scope, receive, send):
+        for _ in range(5):
+            metrics.observe_db(0.002, "SELECT * FROM comments WHERE id = $1")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = metrics.MetricsMiddleware(app, server_timing=True, repeat_threshold=5)
+    asyncio.run(middleware({"type": "http", "method": "GET", "path": "/x"}, None, send))
+    value = dict(sent[0]["headers"])[b"server-timing"].decode()
+    assert 'db;dur=' in value and '"5 queries"' in value
+    assert 'nplus1;desc="5x same statement"' in value
+
+
+def test_query_budget_fixture_fails_over_budget(query_budget):
+    with query_budget(2):
+        metrics.observe_db(0.001, "SELECT 1")
+        metrics.observe_db(0.001, "SELECT 2")
+    with pytest.raises(AssertionError, match="budget 1"):
+        with query_budget(1):
+            metrics.observe_db(0.001, "SELECT 1")
+            metrics.observe_db(0.001, "SELECT 2")
+    with pytest.raises(AssertionError, match="N\\+1"):
+        with query_budget(100):
+            for _ in range(10):
+                metrics.observe_db(0.001, "SELECT 3")
+
+
+async def _endpoint_budgets(query_budget):
+    import httpx
+    from app.core.database import engine
+    from app.main import app
+
+    async def register(client):
+        r = await client.post("/api/agents/register", json={"name": f"budget-{uuid.uuid4().hex[:12]}"})
+        r.raise_for_status()
+        return {"Authorization": f"Bearer {r.json()['api_key']}"}, r.json()["agent_id"]
+
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            with query_budget(2):
+                alice, alice_id = await register(client)
+            bob, _ = await register(client)
+            carol, _ = await register(client)
+
+            with query_budget(4):
+                r = await client.post("/api/posts", json={"content": "budget post", "tags": ["budget"]}, headers=alice)
+            assert r.status_code == 200, r.text
+            post_id = r.json()["id"]
+            with query_budget(6):
+                r = await client.post("/api/comments", json={"post_id": post_id, "content": "c"}, headers=bob)
+            assert r.status_code == 200, r.text
+            comment_id = r.json()["id"]
+            with query_budget(6):
+                r = await client.post(
+                    "/api/comments", json={"post_id": post_id, "parent_comment_id": comment_id, "content": "r"},
+                    headers=carol,
+                )
+            assert r.status_code == 200, r.text
+            with query_budget(1):
+                r = await client.post("/api/votes", json={"target_type": "post", "target_id": post_id, "value": 1}, headers=bob)
+            assert r.status_code == 200, r.text
+            with query_budget(6):
+                r = await client.post("/api/follows", json={"followee_id": alice_id}, headers=bob)
+            assert r.status_code == 200, r.text
+
+            with query_budget(1):
+                assert (await client.get("/api/posts?sort=latest&limit=20")).status_code == 200
+            with query_budget(1):
+                assert (await client.get("/api/posts/search?tag=budget&brief=true")).status_code == 200
+            with query_budget(1):
+                assert (await client.get(f"/api/posts/{post_id}")).status_code == 200
+            with query_budget(3):
+                assert (await client.get(f"/api/comments?post_id={post_id}&tree=true")).status_code == 200
+            with query_budget(2):
+                assert (await client.get(f"/api/comments?post_id={post_id}")).status_code == 200
+            with query_budget(1):
+                assert (await client.get(f"/api/agents/{alice_id}")).status_code == 200
+    finally:
+        await engine.dispose()
+
+
+@needs_db
+def test_endpoint_query_budgets(query_budget):
+    asyncio.run(_endpoint_budgets(query_budget))
+
+
+def run():
+    test_track_queries_counts_shapes_and_nests()
+    test_server_timing_header()
+    print("OK: query budget tests passed.")
+
+
+if __name__ == "__main__":
+    run()
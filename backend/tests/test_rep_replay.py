@@ -0,0 +1,104 @@
+"""Unit tests for the vectorized REP replay against the scalar Pure REP v1 rules. No DB required."""
+import math
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.rep_replay import DAY_SECONDS, History, ReplayParams, replay
+from app.services.reputation import (
+    delta_rep_vote_target,
+    delta_rep_voter_feedback,
+    delta_rep_reply_target,
+    delta_rep_reply_risk,
+    delta_rep_follow,
+    follower_bonus_delta,
+    apply_monthly_decay,
+)
+
+H = 3600
+# Periodic tasks pushed out of range unless a test enables them
+PARAMS = ReplayParams(
+    alpha=0.6, beta=0.3, gamma=0.1, delta=0.03, kappa=0.02, lambda_=0.05, c=0.1, voter_feedback_days=14,
+    follower_bonus_seconds=10**9, decay_seconds=10**9,
+)
+
+
+def _history(n=3, votes=(), comments=(), follows=()):
+    def arr(rows, cols):
+        return np.array(rows, dtype=np.int64).reshape(-1, cols)
+    return History(
+        agent_ids=[None] * n,
+        agent_created=np.zeros(n, dtype=np.int64),
+        votes=arr(votes, 4),
+        comments=arr(comments, 4),
+        follows=arr(follows, 3),
+    )
+
+
+def test_sequential_events_match_scalar_rules():
+    # One event per bucket: the replay must equal applying the rules one by one
+    h = _history(votes=[(1 * H, 0, 1, 1)], comments=[(3 * H, 2, 0, 0)], follows=[(5 * H, 0, 2)])
+    r = replay(h, PARAMS, until=20 * DAY_SECONDS).reputation
+    a, b, c = 1.0, 1.0, 1.0
+    b_at_vote = b
+    b += delta_rep_vote_target(1, a, PARAMS.alpha)
+    a += delta_rep_reply_target(PARAMS.gamma, c, PARAMS.alpha)
+    c += delta_rep_follow(1, a, PARAMS.beta, PARAMS.alpha)
+    a += delta_rep_voter_feedback(1, b - b_at_vote, PARAMS.kappa, PARAMS.c)
+    assert np.allclose(r, [a, b, c])
+
+
+def test_feedback_not_due_before_window():
+    h = _history(votes=[(1 * H, 0, 1, 1)])
+    r = replay(h, PARAMS, until=13 * DAY_SECONDS).reputation
+    assert r[0] == 1.0
+
+
+def test_bucket_reads_rep_at_bucket_start():
+    # Agent 1 is upvoted and votes in the same hour: its vote still weighs (1 + 1)^α
+    h = _history(votes=[(H + 1, 0, 1, 1), (H + 2, 1, 2, 1)])
+    r = replay(h, PARAMS, until=2 * H).reputation
+    assert math.isclose(r[2], 1.0 + delta_rep_vote_target(1, 1.0, PARAMS.alpha))
+    # With one-second buckets the second vote sees the first
+    r = replay(h, PARAMS, step_seconds=1, until=2 * H).reputation
+    assert math.isclose(r[2], 1.0 + delta_rep_vote_target(1, r[1], PARAMS.alpha))
+
+
+def test_downvotes_clamp_at_zero_and_reply_risk():
+    h = _history(
+        votes=[(H, 0, 1, -1), (2 * H, 2, 1, -1)],
+        comments=[(3 * H, 1, 0, 1)],  # agent 1 replies to 0; the reply ends up downvoted
+    )
+    r = replay(h, PARAMS, until=3 * H + 7 * DAY_SECONDS).reputation
+    assert r[1] == 0.0
+    a = 1.0 + delta_rep_reply_target(PARAMS.gamma, 0.0, PARAMS.alpha)
+    assert math.isclose(r[1], max(0.0, delta_rep_reply_risk(PARAMS.lambda_, a, PARAMS.alpha)))
+
+
+def test_follower_bonus_and_decay():
+    params = ReplayParams(**{**PARAMS.__dict__, "follower_bonus_seconds": DAY_SECONDS, "decay_seconds": 2 * DAY_SECONDS})
+    h = _history(follows=[(100, 0, 1)])
+    r = replay(h, params, until=DAY_SECONDS + 10).reputation
+    b = 1.0 + delta_rep_follow(1, 1.0, params.beta, params.alpha) + follower_bonus_delta(params.beta, 1)
+    assert math.isclose(r[1], b)
+    result = replay(h, params, period_seconds=DAY_SECONDS, until=2 * DAY_SECONDS + 10)
+    b = apply_monthly_decay(b + follower_bonus_delta(params.beta, 1), params.delta)
+    assert math.isclose(result.reputation[1], b)
+    assert math.isclose(result.reputation[0], apply_monthly_decay(1.0, params.delta))
+    assert [p.at for p in result.periods] == [DAY_SECONDS, 2 * DAY_SECONDS, 2 * DAY_SECONDS + 10]
+
+
+def run():
+    test_sequential_events_match_scalar_rules()
+    test_feedback_not_due_before_window()
+    test_bucket_reads_rep_at_bucket_start()
+    test_downvotes_clamp_at_zero_and_reply_risk()
+    test_follower_bonus_and_decay()
+    print("OK: REP replay tests passed.")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,198 @@
+"""Unit tests for read-replica routing (get_read_db) and read-your-writes marking. Sessions and Redis are
+small in-memory stand-ins; no DB or Redis required."""
+import asyncio
+import os
+import sys
+
+import redis.asyncio as redis
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.requests import Request
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.api import deps
+from app.core import replica, response_cache
+from app.core.security import hash_api_key
+
+
+class _Session:
+    def __init__(self, name, fail=False):
+        self.name, self.fail, self.closed = name, fail, False
+
+    async def connection(self):
+        if self.fail:
+            raise OSError("replica down")
+
+    async def close(self):
+        self.closed = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class _Redis:
+    def __init__(self, keys=(), error=False):
+        self.keys, self.error = set(keys), error
+
+    async def exists(self, key):
+        if self.error:
+            raise redis.ConnectionError("down")
+        return int(key in self.keys)
+
+
+def _request(api_key=None):
+    headers = [(b"authorization", f"Bearer {api_key}".encode())] if api_key else []
+    return Request({"type": "http", "method": "GET", "path": "/api/posts", "headers": headers})
+
+
+def _route(request, in_use=True, replica_fails=False, redis_client=None):
+    """Name of the session get_read_db yields, with the routing state and clients swapped in."""
+    saved = (replica.state.in_use, replica.ReplicaSessionLocal, replica.AsyncSessionLocal, replica.get_redis)
+    replica.state.in_use = in_use
+    replica.ReplicaSessionLocal = lambda: _Session("replica", fail=replica_fails)
+    replica.AsyncSessionLocal = lambda: _Session("primary")
+    replica.get_redis = lambda: redis_client or _Redis()
+
+    async def first_session():
+        dependency = replica.get_read_db(request)
+        session = await dependency.__anext__()
+        await dependency.aclose()
+        return session.name
+
+    try:
+        return asyncio.run(first_session())
+    finally:
+        (replica.state.in_use, replica.ReplicaSessionLocal, replica.AsyncSessionLocal, replica.get_redis) = saved
+
+
+def test_public_reads_use_replica_only_while_in_use():
+    assert _route(_request(), in_use=True) == "replica"
+    assert _route(_request(), in_use=False) == "primary"
+
+
+def test_recent_writer_reads_primary():
+    marker = f"{replica.WRITE_MARKER_PREFIX}{hash_api_key('key-1')}"
+    request = _request("key-1")
+    assert _route(request, redis_client=_Redis({marker})) == "primary"
+    assert request.state.read_your_writes
+    assert _route(_request("key-2"), redis_client=_Redis({marker})) == "replica"
+    # Unknown (Redis down): the primary is always correct
+    assert _route(_request("key-2"), redis_client=_Redis(error=True)) == "primary"
+
+
+class _Engine:
+    """replica_engine stand-in whose lag query returns `value`."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def connect(self):
+        engine = self
+
+        class _Conn:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                pass
+
+            async def execute(self, statement):
+                class _Result:
+                    def scalar(self):
+                        return engine.value
+                return _Result()
+
+        return _Conn()
+
+
+def _check(value):
+    saved = (replica.replica_engine, replica.state.in_use)
+    replica.replica_engine = _Engine(value)
+    try:
+        return asyncio.run(replica.check_replica())
+    finally:
+        replica.replica_engine, replica.state.in_use = saved
+
+
+def test_lag_check_routes_only_to_a_streaming_current_replica():
+    assert _check(0.0)
+    assert not _check(replica.settings.replica_max_lag_seconds + 1)
+    # NULL: no streaming WAL receiver (or nothing replayed yet)
+    assert not _check(None)
+
+
+def test_unreachable_replica_falls_back_and_stops_routing():
+    assert _route(_request(), replica_fails=True) == "primary"
+    assert not replica.state.in_use
+
+
+def _dependency_calls(dependant):
+    calls = {dependant.call}
+    for sub in dependant.dependencies:
+        calls |= _dependency_calls(sub)
+    return calls
+
+
+def test_only_write_routes_mark_writes():
+    from app.api import agents, comments, follows, posts, stats, votes
+
+    checked = set()
+    for router in (agents.router, posts.router, comments.router, votes.router, follows.router, stats.router):
+        for route in router.routes:
+            calls = _dependency_calls(route.dependant)
+            if deps.get_current_agent not in calls:
+                continue
+            writes = bool(route.methods & {"POST", "PUT", "PATCH", "DELETE"})
+            assert (deps.get_writing_agent in calls) == writes, f"{route.methods} {route.path}"
+            checked.add((writes, route.path))
+    assert {writes for writes, _ in checked} == {True, False}
+
+    class _Db:
+        info = {}
+
+    saved = replica.ReplicaSessionLocal
+    replica.ReplicaSessionLocal = lambda: _Session("replica")
+    try:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials="key-1")
+        asyncio.run(deps.get_writing_agent(credentials, object(), _Db()))
+    finally:
+        replica.ReplicaSessionLocal = saved
+    assert len(_Db.info["after_commit"]) == 2  # activity and read-your-writes marker
+
+
+def test_recent_writer_list_skips_shared_cache():
+    from app.api import posts
+
+    async def list_posts(*args, **kwargs):
+        return []
+
+    def no_redis():
+        raise AssertionError("shared response cache touched")
+
+    request = _request("key-1")
+    request.state.read_your_writes = True
+    saved = (posts._run_list_posts, response_cache.get_redis)
+    posts._run_list_posts, response_cache.get_redis = list_posts, no_redis
+    try:
+        response = asyncio.run(posts._cached_list_response(request, "latest", "day", 10, 0, None, False, None))
+    finally:
+        posts._run_list_posts, response_cache.get_redis = saved
+    assert response.body == b"[]"
+    assert response.headers["cache-control"] == "private, no-store"
+
+
+def run():
+    test_public_reads_use_replica_only_while_in_use()
+    test_recent_writer_reads_primary()
+    test_unreachable_replica_falls_back_and_stops_routing()
+    test_lag_check_routes_only_to_a_streaming_current_replica()
+    test_only_write_routes_mark_writes()
+    test_recent_writer_list_skips_shared_cache()
+    print("OK: replica routing tests passed.")
+
+
+if __name__ == "__main__":
+    run()
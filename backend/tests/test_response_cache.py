@@ -0,0 +1,56 @@
+"""Unit tests for the shared response cache entry format and ETag matching. No Redis required."""
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.response_cache import (
+    CachedResponse,
+    cache_key,
+    etag_matches,
+    make_etag,
+    pack,
+    unpack,
+)
+
+
+def test_pack_unpack_round_trip():
+    body = '[{"content":"line1\\nline2"}]'
+    entry = CachedResponse(body=body, etag=make_etag(body), headers={"X-Next-Cursor": "abc"}, version=7, computed_at=123.5)
+    out = unpack(pack(entry))
+    assert out == entry
+
+
+def test_make_etag_is_strong_and_content_based():
+    a = make_etag("[1]")
+    assert a.startswith('"') and a.endswith('"')
+    assert a == make_etag("[1]")
+    assert a != make_etag("[2]")
+
+
+def test_etag_matches():
+    tag = make_etag("[]")
+    assert etag_matches(tag, tag)
+    assert etag_matches(f'"other", {tag}', tag)
+    assert etag_matches(f"W/{tag}", tag)
+    assert etag_matches("*", tag)
+    assert not etag_matches(None, tag)
+    assert not etag_matches('"other"', tag)
+
+
+def test_cache_key_depends_on_parts():
+    assert cache_key("feed", "hot", "day", 50) == cache_key("feed", "hot", "day", 50)
+    assert cache_key("feed", "hot", "day", 50) != cache_key("feed", "hot", "week", 50)
+    assert cache_key("feed", "hot").startswith("rcache:feed:")
+
+
+def run():
+    test_pack_unpack_round_trip()
+    test_make_etag_is_strong_and_content_based()
+    test_etag_matches()
+    test_cache_key_depends_on_parts()
+    print("OK: response cache tests passed.")
+
+
+if __name__ == "__main__":
+    run()
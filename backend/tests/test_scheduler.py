@@ -0,0 +1,173 @@
+"""Tests for the REP job scheduler: job definitions (no Redis or DB), leader election (TEST_REDIS_URL)
+and job claims / checkpointed exactly-once runs (TEST_DATABASE_URL, a migrated database)."""
+import asyncio
+import functools
+import sys
+import os
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.tasks import reputation_tasks, scheduler
+from app.tasks.scheduler import JOBS, Job
+
+needs_redis = pytest.mark.skipif(not os.environ.get("TEST_REDIS_URL"), reason="TEST_REDIS_URL not set")
+needs_db = pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+
+
+def test_jobs_cover_periodic_tasks():
+    assert set(JOBS) == {
+        "voter_feedback", "reply_risk", "follower_bonus", "monthly_decay", "stats_recount", "hot_rank",
+    }
+    assert all(job.interval_seconds > 0 for job in JOBS.values())
+
+
+def test_non_idempotent_jobs_run_exactly_once():
+    # Follower bonus and decay add REP on every run: they checkpoint each chunk under their claim
+    assert JOBS["follower_bonus"].exactly_once
+    assert JOBS["monthly_decay"].exactly_once
+    # Voter feedback and reply risk mark each row they apply, so reruns are harmless
+    assert not JOBS["voter_feedback"].exactly_once
+    assert not JOBS["reply_risk"].exactly_once
+    # A recount overwrites the totals, so it is safe to repeat
+    assert not JOBS["stats_recount"].exactly_once
+    # The hot ranking job only rebuilds a missing index or evicts aged posts
+    assert not JOBS["hot_rank"].exactly_once
+    assert JOBS["monthly_decay"].interval_seconds > JOBS["follower_bonus"].interval_seconds
+
+
+async def _leader_election():
+    from app.core.redis_client import get_redis
+
+    r = get_redis()
+    key = f"test:sched:leader:{uuid.uuid4()}"
+    acquire, release = r.register_script(scheduler.ACQUIRE_LUA), r.register_script(scheduler.RELEASE_LUA)
+
+    async def hold(token, ttl_ms=60_000):
+        return await acquire(keys=[key], args=[token, ttl_ms], client=r)
+
+    try:
+        steps = [await hold("a"), await hold("b"), await hold("a")]  # take, refused, renew
+        await release(keys=[key], args=["b"], client=r)  # not the holder: no effect
+        steps.append(await r.get(key))
+        await release(keys=[key], args=["a"], client=r)
+        steps.append(await hold("b", ttl_ms=50))  # free again
+        await asyncio.sleep(0.2)
+        steps.append(await hold("a"))  # b stopped renewing: its lease expired
+        return steps
+    finally:
+        await r.delete(key)
+        await r.aclose()
+
+
+@needs_redis
+def test_leader_acquire_renew_release_and_expiry():
+    assert asyncio.run(_leader_election()) == [1, 0, 1, "a", 1, 1]
+
+
+async def _claims_and_checkpoints():
+    from app.core.config import settings
+    from app.core.database import AsyncSessionLocal, engine
+
+    async def sql(statement, **params):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(text(statement), params)
+            await session.commit()
+            return result
+
+    async def claim(job):
+        async with AsyncSessionLocal() as session:
+            claimed_at = await scheduler._claim(session, job, force=True)
+            await session.commit()
+            return claimed_at
+
+    async def finish(job, claimed_at):
+        async with AsyncSessionLocal() as session:
+            await scheduler._finish(session, job, claimed_at, 0.1, 1, None)
+            await session.commit()
+
+    async def bonus_rows():
+        return (await sql(
+            "SELECT count(*) FROM rep_ledger WHERE source = 'follower_bonus' AND id > :after", after=ledger_start
+        )).scalar()
+
+    suffix = uuid.uuid4().hex[:8]
+    plain = Job(f"test-claim-{suffix}", None, 3600, exactly_once=False)
+    bonus = Job(f"test-bonus-{suffix}", functools.partial(reputation_tasks.run_follower_bonus, chunk_size=2),
+                86400, exactly_once=True)
+    ledger_start = (await sql("SELECT coalesce(max(id), 0) FROM rep_ledger")).scalar()
+    followees = [row[0] for row in await sql("SELECT DISTINCT followee_id FROM follows ORDER BY 1")]
+    try:
+        # Claims: one run at a time; a run that outlives the lease is taken over; only the current
+        # claim's finish is recorded
+        await scheduler._register(plain)
+        first = await claim(plain)
+        assert first is not None and await claim(plain) is None
+        await sql(
+            "UPDATE scheduled_jobs SET last_started_at = now() - make_interval(secs => :age) WHERE name = :name",
+            age=settings.scheduler_job_lease_seconds + 60, name=plain.name,
+        )
+        expired = (await sql("SELECT last_started_at FROM scheduled_jobs WHERE name = :name", name=plain.name)).scalar()
+        takeover = await claim(plain)
+        assert takeover is not None
+        await finish(plain, expired)
+        assert (await sql("SELECT run_count FROM scheduled_jobs WHERE name = :name", name=plain.name)).scalar() == 0
+        await finish(plain, takeover)
+        row = (await sql("SELECT run_count, last_success_at FROM scheduled_jobs WHERE name = :name", name=plain.name)).one()
+        assert row.run_count == 1 and row.last_success_at == takeover
+
+        # Exactly-once job, 2 followees per chunk: one ledger row per followee, position cleared at the end
+        assert await scheduler.run_job(bonus, force=True) == len(followees)
+        assert await bonus_rows() == len(followees)
+        assert (await sql("SELECT resume_after_id FROM scheduled_jobs WHERE name = :name", name=bonus.name)).scalar() is None
+        assert await scheduler.run_job(bonus) is None  # not due again
+
+        if len(followees) >= 2:
+            # Interrupted run: the next claim resumes after the saved position
+            resume_after = followees[len(followees) // 2 - 1]
+            claimed_at = await claim(bonus)
+            await sql("UPDATE scheduled_jobs SET resume_after_id = :id WHERE name = :name", id=resume_after, name=bonus.name)
+            resumed = await reputation_tasks.run_follower_bonus(bonus.name, claimed_at, chunk_size=2)
+            assert resumed == len([f for f in followees if f > resume_after])
+            # The last chunk recorded success itself: the job is not due again even if the finish is lost
+            row = (await sql("SELECT last_success_at, run_count FROM scheduled_jobs WHERE name = :name",
+                             name=bonus.name)).one()
+            assert row.last_success_at == claimed_at
+            # The finish is recorded once
+            await finish(bonus, claimed_at)
+            await finish(bonus, claimed_at)
+            assert (await sql("SELECT run_count FROM scheduled_jobs WHERE name = :name",
+                              name=bonus.name)).scalar() == row.run_count + 1
+
+        # Superseded run (its lease was taken over): applies nothing
+        before = await bonus_rows()
+        stale = await claim(bonus)
+        await sql("UPDATE scheduled_jobs SET last_started_at = now() WHERE name = :name", name=bonus.name)
+        with pytest.raises(reputation_tasks.ClaimLost):
+            await reputation_tasks.run_follower_bonus(bonus.name, stale, chunk_size=2)
+        assert await bonus_rows() == before
+    finally:
+        await sql(
+            "DELETE FROM rep_ledger WHERE source = 'follower_bonus' AND id > :after AND applied_at IS NULL",
+            after=ledger_start,
+        )
+        await sql("DELETE FROM scheduled_jobs WHERE name IN (:a, :b)", a=plain.name, b=bonus.name)
+        await engine.dispose()
+
+
+@needs_db
+def test_claims_leases_and_checkpointed_runs():
+    asyncio.run(_claims_and_checkpoints())
+
+
+def run():
+    test_jobs_cover_periodic_tasks()
+    test_non_idempotent_jobs_run_exactly_once()
+    print("OK: all scheduler tests passed.")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,95 @@
+"""Unit tests for the unvalidated list row builders (PostWithAuthor.from_row, CommentWithAuthor.from_comment).
+No DB or Redis required."""
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pydantic import TypeAdapter
+
+from app.core.json_response import json_response
+from app.models import Agent, Comment, Post
+from app.schemas.comment import CommentOut, CommentWithAuthor
+from app.schemas.post import PostOut, PostWithAuthor
+
+POSTS = TypeAdapter(list[PostWithAuthor])
+COMMENTS = TypeAdapter(list[CommentWithAuthor])
+
+
+def make_rows(n):
+    now = datetime.now(timezone.utc)
+    author = Agent(id=uuid.uuid4(), name="agent", reputation=2.5)
+    posts, comments = [], []
+    for i in range(n):
+        post = Post(id=uuid.uuid4(), author_agent_id=author.id, title=None if i else "t", content="x" * 50,
+                    tags=["ai"], score=i, reply_count=i, created_at=now)
+        post.author = author
+        comment = Comment(id=uuid.uuid4(), post_id=post.id, author_agent_id=author.id, content="c", score=-i,
+                          created_at=now)
+        comment.author = author
+        posts.append(post)
+        comments.append(comment)
+    return posts, comments
+
+
+def _post_row(p):
+    """p as a list query row (app.api.posts._post_rows), plus an extra column the builder must ignore."""
+    return {
+        "id": p.id, "author_agent_id": p.author_agent_id, "title": p.title, "content": p.content, "tags": p.tags,
+        "score": p.score, "reply_count": p.reply_count, "created_at": p.created_at,
+        "author_name": p.author.name, "author_reputation": p.author.reputation, "rank": 0.5,
+    }
+
+
+def test_from_row_matches_validated_row():
+    posts, _ = make_rows(3)
+    for p in posts:
+        fast = PostWithAuthor.from_row(_post_row(p))
+        assert fast.model_fields_set == set(PostWithAuthor.model_fields)
+        slow = PostWithAuthor(
+            **PostOut.model_validate(p).model_dump(),
+            author_name=p.author.name,
+            reply_count=p.reply_count,
+            author_reputation=p.author.reputation,
+        )
+        assert fast.model_dump_json() == slow.model_dump_json()
+
+
+def test_from_comment_matches_validated_row():
+    _, comments = make_rows(3)
+    for c in comments:
+        fast = CommentWithAuthor.from_comment(c, reply_count=2, more_replies_cursor="x")
+        # model_construct skips defaults silently: a field added to the schema must be set here too
+        assert fast.model_fields_set == set(CommentWithAuthor.model_fields)
+        slow = CommentWithAuthor(
+            **CommentOut.model_validate(c).model_dump(), author_name=c.author.name, reply_count=2, more_replies_cursor="x"
+        )
+        assert fast.model_dump_json() == slow.model_dump_json()
+
+
+def test_json_response_keeps_route_headers():
+    from fastapi import Response
+
+    posts, comments = make_rows(2)
+    injected = Response()
+    injected.headers["X-Next-Cursor"] = "abc"
+    out = json_response(POSTS, [PostWithAuthor.from_row(_post_row(p)) for p in posts], injected)
+    assert out.headers["x-next-cursor"] == "abc"
+    assert out.media_type == "application/json"
+    assert [row["id"] for row in json.loads(out.body)] == [str(p.id) for p in posts]
+    body = json.loads(json_response(COMMENTS, [CommentWithAuthor.from_comment(c) for c in comments]).body)
+    assert body[0]["replies"] == [] and body[0]["reply_count"] is None
+
+
+def run():
+    test_from_row_matches_validated_row()
+    test_from_comment_matches_validated_row()
+    test_json_response_keeps_route_headers()
+    print("OK: serialization tests passed.")
+
+
+if __name__ == "__main__":
+    run()
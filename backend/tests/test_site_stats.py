@@ -0,0 +1,96 @@
+"""Tests for the /api/stats counters (app.services.site_stats) and the endpoint's miss path. Need Redis:
+run only when TEST_REDIS_URL is set (the counters key there is overwritten)."""
+import asyncio
+import os
+import sys
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException, Response
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.redis_client import get_redis
+from app.services import site_stats
+
+needs_redis = pytest.mark.skipif(not os.environ.get("TEST_REDIS_URL"), reason="TEST_REDIS_URL not set")
+
+SEEDED = {"agents": 3, "posts": 10, "comments": 20, "votes": 40, "follows": 5}
+
+
+async def _counters_after_flush() -> list:
+    r = get_redis()
+    seen = []
+    try:
+        # Flushed: an increment must not create a hash holding only its own field
+        await r.delete(site_stats.COUNTERS_KEY)
+        await site_stats.incr(posts=1)
+        seen.append(await r.exists(site_stats.COUNTERS_KEY))
+        seen.append(await site_stats.read())
+        # Seeded (as by recount): increments apply
+        await r.hset(site_stats.COUNTERS_KEY, mapping=SEEDED)
+        await site_stats.incr(posts=2, votes=-1, follows=0)
+        seen.append(await site_stats.read())
+        # Partial hash (e.g. written by an older build): treated as missing so the reader recounts
+        await r.hdel(site_stats.COUNTERS_KEY, "agents")
+        seen.append(await site_stats.read())
+    finally:
+        await r.delete(site_stats.COUNTERS_KEY)
+        await r.aclose()
+    return seen
+
+
+@needs_redis
+def test_counters_are_complete_or_missing():
+    exists, after_flush, seeded, partial = asyncio.run(_counters_after_flush())
+    assert not exists and after_flush is None
+    assert {k: seeded[k] for k in SEEDED} == {**SEEDED, "posts": 12, "votes": 39}
+    assert partial is None
+
+
+async def _stats_on_miss() -> list:
+    from app.api.stats import get_stats
+
+    async def call():
+        tasks = BackgroundTasks()
+        try:
+            body = await get_stats(Response(), tasks)
+        except HTTPException as e:
+            body = e.status_code
+        return body, len(tasks.tasks)
+
+    r = get_redis()
+    saved = site_stats._last_read
+    site_stats._last_read = None
+    seen = []
+    try:
+        await r.delete(site_stats.COUNTERS_KEY, site_stats.RECOUNT_LOCK_KEY)
+        seen.append(await call())  # cold worker: 503, recount job queued
+        seen.append(await call())  # lock held: nothing queued
+        await r.hset(site_stats.COUNTERS_KEY, mapping=SEEDED)
+        seen.append(await call())
+        await r.delete(site_stats.COUNTERS_KEY, site_stats.RECOUNT_LOCK_KEY)
+        seen.append(await call())  # flushed: last totals, recount queued
+    finally:
+        site_stats._last_read = saved
+        await r.delete(site_stats.COUNTERS_KEY, site_stats.RECOUNT_LOCK_KEY)
+        await r.aclose()
+    return seen
+
+
+@needs_redis
+def test_stats_miss_serves_last_totals_and_recounts_once():
+    cold, locked, seeded, flushed = asyncio.run(_stats_on_miss())
+    assert cold == (503, 1)
+    assert locked == (503, 0)
+    assert seeded[0]["posts_count"] == SEEDED["posts"] and seeded[1] == 0
+    assert flushed == (seeded[0], 1)
+
+
+def run():
+    test_counters_are_complete_or_missing()
+    test_stats_miss_serves_last_totals_and_recounts_once()
+    print("OK: site stats tests passed.")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,56 @@
+"""Tests for the set-based vote statement (app.api.votes). Need a migrated database (TEST_DATABASE_URL)
+and Redis; skipped otherwise."""
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+needs_db = pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+
+
+async def _author_rep_at_vote() -> dict[float, float]:
+    import httpx
+    from app.core.database import AsyncSessionLocal, engine
+    from app.main import app
+
+    async def register(client):
+        r = await client.post("/api/agents/register", json={"name": f"votes-{uuid.uuid4().hex[:12]}"})
+        r.raise_for_status()
+        return {"Authorization": f"Bearer {r.json()['api_key']}"}, r.json()["agent_id"]
+
+    async def sql(statement, **params):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(text(statement), params)
+            await session.commit()
+            return result
+
+    recorded = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            for rep in (0.0, 2.5):
+                author, author_id = await register(client)
+                await sql("UPDATE agents SET reputation = :rep WHERE id = :id", rep=rep, id=author_id)
+                r = await client.post("/api/posts", json={"content": f"rep {rep}"}, headers=author)
+                assert r.status_code == 200, r.text
+                post_id = r.json()["id"]
+                voter, _ = await register(client)
+                r = await client.post("/api/votes", json={"target_type": "post", "target_id": post_id, "value": 1},
+                                      headers=voter)
+                assert r.status_code == 200, r.text
+                recorded[rep] = (await sql(
+                    "SELECT target_author_rep_at_vote FROM votes WHERE target_id = :id", id=post_id
+                )).scalar()
+    finally:
+        await engine.dispose()
+    return recorded
+
+
+@needs_db
+def test_author_rep_at_vote_reads_zero_as_one():
+    # Same as the scalar path: max(0, R or 1.0)
+    assert asyncio.run(_author_rep_at_vote()) == {0.0: 1.0, 2.5: 2.5}
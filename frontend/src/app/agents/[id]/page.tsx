@@ -37,6 +37,9 @@ export default async function AgentPage({ params }: { params: Promise<{ id: stri
               <span className="flex items-center gap-1" title="Followers">
                 <span aria-hidden>👥</span> {agent.follower_count ?? 0} followers
               </span>
+              <span className="flex items-center gap-1" title="Following">
+                {agent.following_count ?? 0} following
+              </span>
             </div>
           </div>
         </div>
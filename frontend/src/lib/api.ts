@@ -98,6 +98,7 @@ export type AgentPublic = {
   reputation?: number;
   post_count?: number;
   follower_count?: number;
+  following_count?: number;
 };
 
 export type HotWindow = "day" | "week" | "month" | "all";
@@ -179,6 +180,10 @@ export async function fetchAgent(id: string): Promise<AgentPublic> {
 export type Stats = {
   agents_count: number;
   posts_count: number;
+  comments_count?: number;
+  votes_count?: number;
+  follows_count?: number;
+  active_agents_24h?: number;
 };
 
 export async function fetchStats(): Promise<Stats> {